@@ -2,6 +2,7 @@ import tkinter as tk
 from tkinter import messagebox
 import psycopg2
 from option_gui import choice_gui  # Import the functions from the selection file
+from app_shell import session, app_root, run
 
 # Function to test the connection
 def test_connection():
@@ -22,52 +23,55 @@ def test_connection():
         )
         conn.close()
         messagebox.showinfo("Success", "Connection successful!")
+        session["db_params"] = {'dbname': dbname, 'user': user, 'password': password, 'host': host, 'port': port}
         root.withdraw()  # Hide the first window
         choice_gui(dbname, user, password, host, port)  # Pass credentials to the next GUI
     except Exception as e:
         messagebox.showerror("Error", f"Connection failed: {e}")
 
-# Create the first window for database login
-root = tk.Tk()
-root.title("Database Login")
+# Only when started as the application, so importing this module (e.g. from a worker process) opens no window
+if __name__ == "__main__":
+    # Create the first window for database login (the single root window of the application)
+    root = app_root()
+    root.title("Database Login")
 
-# Create and place the labels and entry fields
-label_dbname = tk.Label(root, text="Database Name:")
-label_dbname.grid(row=0, column=0, padx=10, pady=10)
+    # Create and place the labels and entry fields
+    label_dbname = tk.Label(root, text="Database Name:")
+    label_dbname.grid(row=0, column=0, padx=10, pady=10)
 
-entry_dbname = tk.Entry(root)
-entry_dbname.grid(row=0, column=1, padx=10, pady=10)
+    entry_dbname = tk.Entry(root)
+    entry_dbname.grid(row=0, column=1, padx=10, pady=10)
 
-label_user = tk.Label(root, text="Username:")
-label_user.grid(row=1, column=0, padx=10, pady=10)
+    label_user = tk.Label(root, text="Username:")
+    label_user.grid(row=1, column=0, padx=10, pady=10)
 
-entry_user = tk.Entry(root)
-entry_user.grid(row=1, column=1, padx=10, pady=10)
+    entry_user = tk.Entry(root)
+    entry_user.grid(row=1, column=1, padx=10, pady=10)
 
-label_password = tk.Label(root, text="Password:")
-label_password.grid(row=2, column=0, padx=10, pady=10)
+    label_password = tk.Label(root, text="Password:")
+    label_password.grid(row=2, column=0, padx=10, pady=10)
 
-entry_password = tk.Entry(root, show="*")
-entry_password.grid(row=2, column=1, padx=10, pady=10)
+    entry_password = tk.Entry(root, show="*")
+    entry_password.grid(row=2, column=1, padx=10, pady=10)
 
-label_host = tk.Label(root, text="Host:")
-label_host.grid(row=3, column=0, padx=10, pady=10)
+    label_host = tk.Label(root, text="Host:")
+    label_host.grid(row=3, column=0, padx=10, pady=10)
 
-entry_host = tk.Entry(root)
-entry_host.grid(row=3, column=1, padx=10, pady=10)
+    entry_host = tk.Entry(root)
+    entry_host.grid(row=3, column=1, padx=10, pady=10)
 
-label_port = tk.Label(root, text="Port:")
-label_port.grid(row=4, column=0, padx=10, pady=10)
+    label_port = tk.Label(root, text="Port:")
+    label_port.grid(row=4, column=0, padx=10, pady=10)
 
-entry_port = tk.Entry(root)
-entry_port.grid(row=4, column=1, padx=10, pady=10)
+    entry_port = tk.Entry(root)
+    entry_port.grid(row=4, column=1, padx=10, pady=10)
 
-# Create a button to test the connection
-test_button = tk.Button(root, text="Test Connection", command=test_connection)
-test_button.grid(row=5, column=0, columnspan=2, pady=20)
+    # Create a button to test the connection
+    test_button = tk.Button(root, text="Test Connection", command=test_connection)
+    test_button.grid(row=5, column=0, columnspan=2, pady=20)
 
-# Close the application when the window is closed
-root.protocol("WM_DELETE_WINDOW", root.destroy)
+    # Close the application when the window is closed
+    root.protocol("WM_DELETE_WINDOW", root.destroy)
 
-# Run the application
-root.mainloop()
\ No newline at end of file
+    # Run the application
+    run()
\ No newline at end of file
@@ -0,0 +1,58 @@
+import os
+import json
+import logging
+import threading
+from datetime import datetime
+
+log_directory = "logs"
+
+_lock = threading.Lock()
+_log_filename = None
+_json_filename = None
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per record, for loading the log into other tools"""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def setup_logging():
+    """
+    Configure the application log file on first use and return its path.
+    Later calls return the same file, so every screen can call this before it starts working.
+    """
+    global _log_filename
+    with _lock:
+        if _log_filename is None:
+            os.makedirs(log_directory, exist_ok=True)
+            _log_filename = os.path.join(log_directory, f"data_fixing_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log")
+            logging.basicConfig(
+                filename=_log_filename,
+                level=logging.INFO,
+                format='%(asctime)s - %(levelname)s - %(message)s'
+            )
+        return _log_filename
+
+
+def enable_json_lines():
+    """Also write every record as a JSON line next to the log file; returns that file's path"""
+    global _json_filename
+    log_filename = setup_logging()
+    with _lock:
+        if _json_filename is None:
+            _json_filename = os.path.splitext(log_filename)[0] + ".jsonl"
+            handler = logging.FileHandler(_json_filename, encoding="utf-8")
+            handler.setFormatter(JsonLinesFormatter())
+            logging.getLogger().addHandler(handler)
+        return _json_filename
@@ -0,0 +1,99 @@
+import tkinter as tk
+
+# Session state shared by every screen of the running application
+session = {
+    "db_params": None,  # Connection parameters entered at login
+    "table": None,      # Table opened in data management
+    "weeks": [],        # Week filter of data management
+    "bbox": None,       # Area filter of data management (min_x, min_y, max_x, max_y)
+    "photo_folder": None,  # Folder of the photo files, chosen in data fixing or photo preview
+}
+
+_root = None
+_running = False
+_screens = {}   # Cached screens by key, hidden instead of destroyed when closed
+_current = None
+
+
+def app_root():
+    """The single Tk instance of the application, created on first use"""
+    global _root
+    if _root is None:
+        _root = tk.Tk()
+    return _root
+
+
+def new_window(title, geometry=None):
+    """Create a window of the application (a Toplevel of the single root)"""
+    window = tk.Toplevel(app_root())
+    window.title(title)
+    if geometry:
+        window.geometry(geometry)
+    return window
+
+
+def show_screen(key, build):
+    """
+    Show the cached screen stored under key, or build it with build() -> window the first time.
+    Screens keep their widgets and state while hidden, so switching back to them is instant.
+    """
+    global _current
+    window = _screens.get(key)
+    if window is None or not window.winfo_exists():
+        window = build()
+        _screens[key] = window
+    else:
+        window.deiconify()
+    window.lift()
+    _current = window
+    return window
+
+
+def hide_screen(window):
+    """Hide a cached screen without destroying it"""
+    global _current
+    window.withdraw()
+    if _current is window:
+        _current = None
+
+
+def current_screen():
+    """The screen shown last (parent for dialogs), or the root"""
+    if _current is not None and _current.winfo_exists():
+        return _current
+    return app_root()
+
+
+def _quit_when_no_windows():
+    if _root is None:
+        return
+    if not any(isinstance(widget, tk.Toplevel) and widget.state() != "withdrawn" for widget in _root.winfo_children()):
+        quit_app()
+        return
+    _root.after(500, _quit_when_no_windows)
+
+
+def run():
+    """Run the application event loop, unless it is already running (screens opened from screens)"""
+    global _running
+    if _running:
+        return
+    root = app_root()
+    if all(isinstance(widget, tk.Toplevel) for widget in root.winfo_children()):
+        # A screen run on its own: the empty root stays hidden and the loop ends with the last window
+        root.withdraw()
+        root.after(500, _quit_when_no_windows)
+    _running = True
+    try:
+        root.mainloop()
+    finally:
+        _running = False
+
+
+def quit_app():
+    """Close every window and leave the event loop"""
+    global _root
+    if _root is not None:
+        _root.destroy()
+        _root = None
+    _screens.clear()
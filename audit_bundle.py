@@ -0,0 +1,288 @@
+import io
+import os
+import csv
+import time
+import logging
+import tarfile
+import zipfile
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import psycopg2
+import tkinter as tk
+from tkinter import filedialog, messagebox, ttk
+from app_shell import new_window, session
+from table_filters import filtered_source
+from table_export import export_columns, fetch_batches
+from photo_status import columns_to_check
+
+# Threads reading photo files ahead of the archive writer
+MAX_READ_THREADS = 8
+# Files read ahead per thread; with READ_AHEAD_MAX_BYTES this bounds the memory used
+READ_AHEAD_PER_THREAD = 2
+# Larger files are not read ahead but copied in blocks by the writer
+READ_AHEAD_MAX_BYTES = 16 * 1024 * 1024
+COPY_BLOCK_BYTES = 1024 * 1024
+
+TABLE_MEMBER = "{table}.csv"
+MISSING_MEMBER = "missing_photos.txt"
+PHOTOS_PREFIX = "photos/"
+
+
+def referenced_photo_paths(conn, table_name, weeks=None, bbox=None):
+    """Yield each distinct photo path of the table once, streamed through a server-side cursor"""
+    with conn.cursor(name="bundle_photo_paths") as cursor:
+        cursor.itersize = 10000
+        cursor.execute(f"""
+            SELECT DISTINCT s.path
+            FROM {filtered_source(table_name, weeks, bbox=bbox)}
+            CROSS JOIN LATERAL unnest(ARRAY[{', '.join(columns_to_check)}]) AS s(path)
+            WHERE s.path IS NOT NULL AND s.path != '' AND s.path NOT ILIKE '%Not Found%'
+            ORDER BY s.path
+        """)
+        for (path,) in cursor:
+            yield path
+
+
+def member_name(path):
+    """Name of a photo inside the bundle: its stored path under photos/, never outside it"""
+    parts = [part for part in path.replace("\\", "/").split("/") if part not in ("", ".", "..")]
+    return PHOTOS_PREFIX + "/".join(parts)
+
+
+def read_photo(full_path):
+    """Stat a photo and read it whole if it is small enough (runs in a reader thread)"""
+    try:
+        stat = os.stat(full_path)
+        if stat.st_size > READ_AHEAD_MAX_BYTES:
+            return stat, None
+        with open(full_path, "rb") as photo:
+            return stat, photo.read()
+    except OSError:
+        return None, None
+
+
+def read_ahead(items, max_workers=MAX_READ_THREADS):
+    """
+    Yield (item, full path, stat, data) in order, reading the next files in parallel while
+    the current one is written. Only a bounded window of files is in flight at any time.
+    """
+    window = deque()
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bundle-read") as executor:
+        for item, full_path in items:
+            window.append((item, full_path, executor.submit(read_photo, full_path)))
+            if len(window) >= max_workers * READ_AHEAD_PER_THREAD:
+                item, full_path, future = window.popleft()
+                yield (item, full_path) + future.result()
+        while window:
+            item, full_path, future = window.popleft()
+            yield (item, full_path) + future.result()
+
+
+class ZipBundle:
+    """Bundle written as a ZIP; the table is deflated, photos (already compressed) are stored"""
+
+    def __init__(self, path):
+        self.archive = zipfile.ZipFile(path, "w", allowZip64=True)
+
+    def add_table(self, name, write_rows):
+        info = zipfile.ZipInfo(name, time.localtime()[:6])
+        info.compress_type = zipfile.ZIP_DEFLATED
+        with self.archive.open(info, "w", force_zip64=True) as member:
+            with io.TextIOWrapper(member, encoding="utf-8", newline="") as text:
+                write_rows(text)
+
+    def add_photo(self, name, full_path, stat, data):
+        info = zipfile.ZipInfo(name, time.localtime(stat.st_mtime)[:6])
+        info.compress_type = zipfile.ZIP_STORED
+        if data is not None:
+            self.archive.writestr(info, data)
+        else:
+            with open(full_path, "rb") as photo, self.archive.open(info, "w", force_zip64=True) as member:
+                for block in iter(lambda: photo.read(COPY_BLOCK_BYTES), b""):
+                    member.write(block)
+
+    def add_file(self, name, fileobj):
+        info = zipfile.ZipInfo(name, time.localtime()[:6])
+        info.compress_type = zipfile.ZIP_DEFLATED
+        with self.archive.open(info, "w", force_zip64=True) as member:
+            for block in iter(lambda: fileobj.read(COPY_BLOCK_BYTES), b""):
+                member.write(block)
+
+    def close(self):
+        self.archive.close()
+
+
+class TarBundle:
+    """
+    Bundle written as a streamed tar. Tar headers need each member's size, so the table CSV
+    is spooled to a temporary file first; photos go straight from disk.
+    """
+
+    def __init__(self, path):
+        self.archive = tarfile.open(path, "w|", format=tarfile.PAX_FORMAT)
+
+    def _add(self, name, size, mtime, fileobj):
+        info = tarfile.TarInfo(name)
+        info.size = size
+        info.mtime = mtime
+        self.archive.addfile(info, fileobj)
+
+    def add_table(self, name, write_rows):
+        with tempfile.TemporaryFile() as spool:
+            text = io.TextIOWrapper(spool, encoding="utf-8", newline="")
+            write_rows(text)
+            text.detach()  # Flushes the text without closing the spool
+            size = spool.tell()
+            spool.seek(0)
+            self._add(name, size, time.time(), spool)
+
+    def add_photo(self, name, full_path, stat, data):
+        if data is not None:
+            self._add(name, len(data), stat.st_mtime, io.BytesIO(data))
+        else:
+            with open(full_path, "rb") as photo:
+                self._add(name, stat.st_size, stat.st_mtime, photo)
+
+    def add_file(self, name, fileobj):
+        size = fileobj.seek(0, io.SEEK_END)
+        fileobj.seek(0)
+        self._add(name, size, time.time(), fileobj)
+
+    def close(self):
+        self.archive.close()
+
+
+def build_bundle(conn, table_name, folder_path, archive_path, weeks=None, bbox=None, progress_callback=None):
+    """
+    Write the table as CSV and every existing photo it references into one ZIP or tar
+    archive (by extension). Rows and photo paths stream from the server, files are read ahead
+    in parallel, and a file referenced under several paths is written once. Paths whose file
+    is missing are listed in missing_photos.txt, spooled to a temporary file meanwhile.
+    On failure the incomplete archive is deleted. Returns a summary dict.
+    """
+    bundle = TarBundle(archive_path) if archive_path.lower().endswith(".tar") else ZipBundle(archive_path)
+    summary = {"rows": 0, "photos": 0, "bytes": 0, "duplicates": 0, "missing": 0}
+    missing = tempfile.TemporaryFile()
+    try:
+        try:
+            with conn.cursor() as cursor:
+                columns = export_columns(cursor, table_name)
+
+            def write_rows(text):
+                writer = csv.writer(text)
+                writer.writerow([name for name, _ in columns])
+                for rows in fetch_batches(conn, table_name, columns, weeks, bbox):
+                    writer.writerows(rows)
+                    summary["rows"] += len(rows)
+                    if progress_callback:
+                        progress_callback(f"{summary['rows']} rows written")
+
+            bundle.add_table(TABLE_MEMBER.format(table=table_name), write_rows)
+
+            seen_names = set()
+            seen_files = set()  # (device, inode): one copy of a file reached by several paths
+            paths = ((path, os.path.join(folder_path, path)) for path in referenced_photo_paths(conn, table_name, weeks, bbox))
+            for path, full_path, stat, data in read_ahead(paths):
+                name = member_name(path)
+                if stat is None:
+                    summary["missing"] += 1
+                    missing.write(path.encode("utf-8") + b"\n")
+                    continue
+                if name in seen_names or (stat.st_dev, stat.st_ino) in seen_files:
+                    summary["duplicates"] += 1
+                    continue
+                seen_names.add(name)
+                seen_files.add((stat.st_dev, stat.st_ino))
+                try:
+                    bundle.add_photo(name, full_path, stat, data)
+                except OSError:
+                    summary["missing"] += 1  # A large file removed since it was listed
+                    missing.write(path.encode("utf-8") + b"\n")
+                    continue
+                summary["photos"] += 1
+                summary["bytes"] += stat.st_size
+                if progress_callback and summary["photos"] % 50 == 0:
+                    progress_callback(f"{summary['rows']} rows, {summary['photos']} photos "
+                                      f"({summary['bytes'] / 1024 / 1024:.0f} MB) written")
+
+            if summary["missing"]:
+                missing.seek(0)
+                bundle.add_file(MISSING_MEMBER, missing)
+            conn.rollback()  # Closes the read transaction of the server-side cursors
+        finally:
+            missing.close()
+            bundle.close()
+    except BaseException:
+        # A truncated archive must not pass for a complete bundle
+        try:
+            os.remove(archive_path)
+        except OSError:
+            pass
+        raise
+    logging.info(f"Bundle {archive_path} of {table_name}: {summary}")
+    return summary
+
+
+def main(dbname, user, password, host, port, table_name, weeks=None, bbox=None):
+    folder_path = session.get("photo_folder") or filedialog.askdirectory(title="Select Folder Containing Image Files")
+    if not folder_path:
+        return
+    session["photo_folder"] = folder_path
+
+    archive_path = filedialog.asksaveasfilename(
+        defaultextension=".zip",
+        initialfile=f"{table_name}_bundle.zip",
+        filetypes=[("ZIP Archives", "*.zip"), ("Tar Archives", "*.tar")]
+    )
+    if not archive_path:
+        return  # User canceled the save dialog
+
+    window = new_window(f"Export Bundle - {table_name}", "460x130")
+    status_var = tk.StringVar(value=f"Exporting {table_name} with photos from {folder_path}...")
+    label_status = tk.Label(window, textvariable=status_var, wraplength=420, justify=tk.LEFT)
+    label_status.pack(padx=10, pady=(15, 10), anchor=tk.W)
+    progress_bar = ttk.Progressbar(window, mode="indeterminate", length=420)
+    progress_bar.pack(padx=10)
+    progress_bar.start(15)
+    window.protocol("WM_DELETE_WINDOW", lambda: None)  # Stays open until the archive is complete
+
+    # The bundle is written in a thread; the window only shows its progress
+    state = {"message": None}
+
+    def worker():
+        try:
+            conn = psycopg2.connect(dbname=dbname, user=user, password=password, host=host, port=port)
+            try:
+                state["summary"] = build_bundle(conn, table_name, folder_path, archive_path, weeks, bbox,
+                                                lambda message: state.update(message=message))
+            finally:
+                conn.close()
+        except Exception as e:
+            logging.error(f"Bundle export failed: {str(e)}")
+            state["error"] = e
+
+    def poll():
+        if not window.winfo_exists():
+            return
+        if state["message"]:
+            status_var.set(state["message"])
+        if "summary" in state or "error" in state:
+            progress_bar.stop()
+            window.destroy()
+            if "error" in state:
+                messagebox.showerror("Export Error", str(state["error"]))
+                return
+            summary = state["summary"]
+            messagebox.showinfo(
+                "Success",
+                f"Bundle saved to {archive_path}\n\n{summary['rows']} rows, {summary['photos']} photos "
+                f"({summary['bytes'] / 1024 / 1024:.1f} MB)\n{summary['duplicates']} duplicate references skipped, "
+                f"{summary['missing']} photos missing (listed in {MISSING_MEMBER})"
+            )
+            return
+        window.after(200, poll)
+
+    threading.Thread(target=worker, name="bundle-export", daemon=True).start()
+    window.after(200, poll)
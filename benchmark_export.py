@@ -0,0 +1,86 @@
+"""
+Benchmark of the table export formats.
+
+Writes the same rows as CSV, Parquet and Arrow and prints, for each format, the wall time, the
+file size and the peak Python memory used while writing. Without a database the rows are generated to look like a
+survey table (53 text columns with repeated codes, dates and photo paths); with connection
+parameters the given table is exported for real, through the server-side cursor. Run from the
+repository folder:
+
+    python benchmark_export.py [rows]
+    python benchmark_export.py dbname user password host port table
+"""
+import os
+import sys
+import time
+import random
+import datetime
+import tempfile
+import tracemalloc
+import table_export
+from table_creation import TABLE_COLUMNS
+
+
+def synthetic_batches(rows, batch_rows=table_export.EXPORT_BATCH_ROWS):
+    """Batches of rows shaped like a survey table"""
+    generator = random.Random(0)
+    codes = [f"C{number:03d}" for number in range(200)]
+    for start in range(0, rows, batch_rows):
+        batch = []
+        for row_number in range(start, min(rows, start + batch_rows)):
+            row = []
+            for name, data_type in TABLE_COLUMNS:
+                if data_type == "DATE":
+                    row.append(datetime.date(2024, generator.randint(1, 12), generator.randint(1, 28)))
+                elif name in table_export.columns_to_check:
+                    row.append(f"DCIM/{generator.choice(codes)}/IMG_{row_number:07d}_{name}.jpg")
+                else:
+                    row.append(generator.choice(codes) if generator.random() < 0.9 else None)
+            batch.append(tuple(row))
+        yield batch
+
+
+def measure(write, *args):
+    """Wall seconds, peak traced memory in bytes, and the writer's result; memory is traced in a
+    second run, since tracing slows Python code down"""
+    start = time.perf_counter()
+    result = write(*args)
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    write(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak, result
+
+
+def main():
+    formats = [".csv"] + ([".parquet", ".arrow"] if table_export.arrow_available() else [])
+    if not table_export.arrow_available():
+        print("pyarrow is not installed: only CSV is measured\n")
+    live = len(sys.argv) > 6
+    if live:
+        import psycopg2
+        dbname, user, password, host, port, table_name = sys.argv[1:7]
+        conn = psycopg2.connect(dbname=dbname, user=user, password=password, host=host, port=port)
+        print(f"Exporting table {table_name}")
+    else:
+        rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+        batches = list(synthetic_batches(rows))  # Generated once, outside the measures
+        columns = [(name, "date" if data_type == "DATE" else "text") for name, data_type in TABLE_COLUMNS]
+        print(f"Exporting {rows} generated rows of {len(columns)} columns")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for extension in formats:
+            file_path = os.path.join(directory, "export" + extension)
+            if live:
+                seconds, peak, count = measure(table_export.export_table, conn, table_name, file_path)
+            else:
+                seconds, peak, count = measure(table_export.WRITERS[extension], batches, columns, file_path)
+            size = os.path.getsize(file_path)
+            print(f"  {extension[1:]:8} {seconds:7.2f} s  {size / 1024 / 1024:8.1f} MB  peak memory {peak / 1024 / 1024:6.1f} MB  ({count} rows)")
+    if live:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Benchmark of the change journal (needs a PostgreSQL database).
+
+Runs the fixing queries on two identical scratch tables of generated survey rows, one plain
+and one journaled, and prints the wall time of each, the number of updates and the size of
+the journal. Every photo column gets values hit by the fixing rules (empty, double
+extension, missing extension, missing '/', files/ instead of DCIM/), one row in eight clean.
+The scratch tables and the benchmark's journal entries are dropped afterwards. Run from the
+repository folder:
+
+    python benchmark_journal.py dbname user password host port [rows] [repeats]
+"""
+import sys
+import time
+import statistics
+import psycopg2
+from table_creation import TABLE_COLUMNS
+from data_fixing_final import columns_to_check, execute_fixing_queries
+from change_journal import ROW_ID_COLUMN, JOURNAL_TABLE, RUNS_TABLE, start_run, journal_size
+
+TEMPLATE_TABLE = "benchmark_journal_template"
+RUN_TABLE = "benchmark_journal_rows"
+
+# Photo path of generated row n, by n % 8
+PHOTO_VALUE = """CASE n % 8
+    WHEN 0 THEN ''
+    WHEN 1 THEN 'DCIM/IMG_' || n || '.jpg.jpg'
+    WHEN 2 THEN 'DCIM/qfield_' || n
+    WHEN 3 THEN 'DCIM/IMG_' || n || '.heic'
+    WHEN 4 THEN 'DCIM/IMG_' || n
+    WHEN 5 THEN 'DCIMIMG_' || n || '.jpg'
+    WHEN 6 THEN 'files/IMG_' || n || '.jpg'
+    ELSE 'DCIM/IMG_' || n || '.jpg'
+END"""
+
+
+def generated_value(name, data_type):
+    if data_type == "DATE":
+        return "DATE '2024-01-01' + (n % 365)"
+    if name == "id":
+        return "n::text"
+    if name in columns_to_check:
+        return PHOTO_VALUE
+    return "'C' || (n % 200)"
+
+
+def create_template(conn, rows):
+    """Fill the template table once; every measured run starts from a copy of it"""
+    with conn.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {TEMPLATE_TABLE}")
+        cursor.execute(f"CREATE TABLE {TEMPLATE_TABLE} ({', '.join(f'{name} {data_type}' for name, data_type in TABLE_COLUMNS)})")
+        cursor.execute(
+            f"INSERT INTO {TEMPLATE_TABLE} SELECT {', '.join(generated_value(name, data_type) for name, data_type in TABLE_COLUMNS)} "
+            f"FROM generate_series(1, %s) AS n",
+            (rows,)
+        )
+        # The row key exists before the runs, so only the journal itself is measured
+        cursor.execute(f"ALTER TABLE {TEMPLATE_TABLE} ADD COLUMN {ROW_ID_COLUMN} BIGSERIAL")
+    conn.commit()
+
+
+def fresh_copy(conn):
+    with conn.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {RUN_TABLE}")
+        cursor.execute(f"CREATE TABLE {RUN_TABLE} AS TABLE {TEMPLATE_TABLE}")
+        cursor.execute(f"ANALYZE {RUN_TABLE}")
+    conn.commit()
+
+
+def measure(conn, journaled):
+    """Seconds, updates and journal (entries, bytes) of one fixing run on a fresh copy"""
+    fresh_copy(conn)
+    run_id = start_run(conn, RUN_TABLE) if journaled else None
+    start = time.perf_counter()
+    updates = execute_fixing_queries(conn, RUN_TABLE, journal_run_id=run_id)
+    seconds = time.perf_counter() - start
+    return seconds, updates, journal_size(conn, run_id) if journaled else (0, 0)
+
+
+def clean_up(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s)", (RUNS_TABLE,))
+        if cursor.fetchone()[0] is not None:
+            cursor.execute(f"DELETE FROM {JOURNAL_TABLE} WHERE run_id IN (SELECT run_id FROM {RUNS_TABLE} WHERE table_name = %s)",
+                           (RUN_TABLE,))
+            cursor.execute(f"DELETE FROM {RUNS_TABLE} WHERE table_name = %s", (RUN_TABLE,))
+        cursor.execute(f"DROP TABLE IF EXISTS {RUN_TABLE}, {TEMPLATE_TABLE}")
+    conn.commit()
+
+
+def main():
+    if len(sys.argv) < 6:
+        print(__doc__)
+        sys.exit(1)
+    dbname, user, password, host, port = sys.argv[1:6]
+    rows = int(sys.argv[6]) if len(sys.argv) > 6 else 100000
+    repeats = int(sys.argv[7]) if len(sys.argv) > 7 else 3
+    conn = psycopg2.connect(dbname=dbname, user=user, password=password, host=host, port=port)
+    try:
+        create_template(conn, rows)
+        print(f"Fixing {rows} generated rows, {len(columns_to_check)} photo columns, median of {repeats} runs")
+        results = {}
+        for journaled in (False, True):
+            runs = [measure(conn, journaled) for _ in range(repeats)]
+            seconds = statistics.median(run[0] for run in runs)
+            updates, (entries, size) = runs[-1][1], runs[-1][2]
+            results[journaled] = seconds
+            print(f"  {'journaled' if journaled else 'plain':10} {seconds:7.2f} s  {updates} updates  "
+                  f"journal {entries} entries, {size / 1024 / 1024:.1f} MB")
+        overhead = results[True] - results[False]
+        print(f"Journal overhead: {overhead:+.2f} s ({overhead / results[False] * 100:+.0f}%)")
+    finally:
+        clean_up(conn)
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
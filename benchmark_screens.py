@@ -0,0 +1,70 @@
+"""
+Screen-switch benchmark of the application shell (needs a display, no database).
+
+Switches N times between the data management screens of two tables and reports the median
+switch latency and the growth of the process memory (RSS), for two strategies:
+
+    legacy  a new Tk interpreter per screen, as every screen used to create its own tk.Tk()
+    shell   one root, screens built once as Toplevels and then hidden / shown from the cache
+
+    python benchmark_screens.py [switches]
+"""
+import statistics
+import sys
+import time
+import tkinter as tk
+
+import app_shell
+from data_managment import build_data_management
+
+DB_ARGS = ("dbname", "user", "password", "localhost", "5432")
+
+
+def rss_mb():
+    """Resident memory of this process in MB (Linux)"""
+    with open("/proc/self/statm") as statm:
+        pages = int(statm.read().split()[1])
+    return pages * 4096 / (1024 * 1024)
+
+
+def switch_legacy(table, state):
+    """Destroy the previous interpreter and build the screen in a fresh one"""
+    if state.get("root") is not None:
+        state["root"].destroy()
+    state["root"] = app_shell._root = tk.Tk()
+    state["root"].withdraw()
+    window = build_data_management(*DB_ARGS, table)
+    window.update()
+
+
+def switch_shell(table, state):
+    """Hide the current screen and show the cached screen of the table"""
+    if state.get("window") is not None:
+        app_shell.hide_screen(state["window"])
+    state["window"] = app_shell.show_screen(("data_management", table), lambda: build_data_management(*DB_ARGS, table))
+    state["window"].update()
+
+
+def measure(switch, switches):
+    state = {}
+    switch("warmup", state)
+    start_rss = rss_mb()
+    timings = []
+    for number in range(switches):
+        started = time.perf_counter()
+        switch(f"table_{number % 2}", state)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), max(timings), rss_mb() - start_rss
+
+
+def main():
+    switches = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    for label, switch in [("legacy", switch_legacy), ("shell", switch_shell)]:
+        median_ms, worst_ms, rss_growth = measure(switch, switches)
+        print(f"{label:6}  median switch {median_ms:7.1f} ms  worst {worst_ms:7.1f} ms  "
+              f"RSS growth {rss_growth:6.1f} MB over {switches} switches")
+        app_shell.quit_app()
+
+
+if __name__ == "__main__":
+    main()
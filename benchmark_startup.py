@@ -0,0 +1,71 @@
+"""
+Import-time benchmark of the application startup.
+
+Imports the modules loaded before the login window opens (and, for comparison, every screen)
+in fresh interpreters, several times, and prints the median wall time and the slowest modules
+reported by python -X importtime. Run from the repository folder:
+
+    python benchmark_startup.py [runs]
+"""
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+# Modules imported by Login_db.py before its window opens (Login_db starts the GUI when run as a script)
+STARTUP_MODULES = ["tkinter", "tkinter.messagebox", "psycopg2", "option_gui"]
+
+# Every screen of the application, loaded when the user opens it
+ALL_SCREENS = ["table_creation", "selection_gui", "data_managment", "quick_report", "full_report",
+               "data_fixing_final", "quality_rollup", "table_optimization", "photo_status", "week_partitions"]
+
+# Modules that should not be loaded at startup
+HEAVY_MODULES = ["docx", "data_fixing_final", "quick_report", "full_report", "data_managment"]
+
+
+def time_imports(modules, runs):
+    """Median milliseconds to import the modules in a fresh interpreter, and the modules left loaded"""
+    code = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        f"for name in {modules!r}: __import__(name)\n"
+        "print((time.perf_counter() - start) * 1000)\n"
+        f"print(','.join(name for name in {HEAVY_MODULES!r} if name in sys.modules))\n"
+    )
+    timings = []
+    loaded = ""
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.splitlines()
+        timings.append(float(output[0]))
+        loaded = output[1] if len(output) > 1 else ""
+    return statistics.median(timings), loaded
+
+
+def slowest_modules(modules, count=10):
+    """Modules with the largest cumulative import time, from python -X importtime"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"for name in {modules!r}: __import__(name)"],
+                            capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    top_level = []
+    for line in result.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package", nested imports are indented further
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|( +)(\S+)", line)
+        if match and len(match.group(2)) == 1:
+            top_level.append((int(match.group(1)), match.group(3)))
+    return sorted(top_level, reverse=True)[:count]
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    for label, modules in [("Startup (login window)", STARTUP_MODULES), ("All screens", STARTUP_MODULES + ALL_SCREENS)]:
+        median_ms, loaded = time_imports(modules, runs)
+        print(f"{label}: median {median_ms:.1f} ms over {runs} runs")
+        print(f"  heavy modules loaded: {loaded or 'none'}")
+        for cumulative_us, name in slowest_modules(modules):
+            print(f"    {cumulative_us / 1000:8.1f} ms  {name}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
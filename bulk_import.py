@@ -0,0 +1,220 @@
+import psycopg2
+import tkinter as tk
+from tkinter import ttk
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
+import glob
+import csv
+import os
+import logging
+import time
+from table_optimization import index_name
+from week_partitions import is_partitioned, ensure_week_partitions
+from merge_import import MERGE_MODES, merge_import
+
+# Upper bound of connections opened for one bulk import, so the server is not overloaded
+MAX_IMPORT_CONNECTIONS = 4
+
+
+def expand_sources(path):
+    """Return the CSV files of a folder, or the files matching a glob pattern, sorted by name"""
+    if os.path.isdir(path):
+        path = os.path.join(path, "*.csv")
+    return sorted(file for file in glob.glob(path) if os.path.isfile(file))
+
+
+def is_bulk_source(path):
+    """True if the path names a folder or a glob pattern rather than a single file"""
+    return os.path.isdir(path) or glob.has_magic(path)
+
+
+class ProgressReader:
+    """File wrapper counting the bytes COPY has read, shared by all workers"""
+
+    def __init__(self, file, progress):
+        self.file = file
+        self.progress = progress
+
+    def read(self, size=-1):
+        data = self.file.read(size)
+        self.progress.advance(len(data))
+        return data
+
+    def readline(self, size=-1):
+        data = self.file.readline(size)
+        self.progress.advance(len(data))
+        return data
+
+
+class ImportProgress:
+    """Thread-safe byte counter polled by the progress view"""
+
+    def __init__(self, total_bytes):
+        self.total_bytes = max(total_bytes, 1)
+        self.done_bytes = 0
+        self.lock = threading.Lock()
+
+    def advance(self, amount):
+        with self.lock:
+            self.done_bytes += amount
+
+    def percent(self):
+        with self.lock:
+            return min(100.0, self.done_bytes * 100 / self.total_bytes)
+
+
+def collect_weeks(files, columns):
+    """Weeks present in the files, so partitions can be created before the parallel load"""
+    week_index = [name for name, _ in columns].index("week")
+    weeks = set()
+    for file in files:
+        try:
+            with open(file, newline='', encoding='utf-8') as csvfile:
+                reader = csv.reader(csvfile)
+                next(reader, None)  # Skip the header row
+                weeks.update(row[week_index] for row in reader if len(row) > week_index)
+        except (OSError, UnicodeDecodeError) as e:
+            logging.warning(f"Could not scan weeks of {file}: {str(e)}")  # The import of that file reports it
+    return weeks
+
+
+def prepare_partitions(db_params, table_name, files, columns):
+    """Create the week partitions of all files serially, so concurrent loads never race on DDL"""
+    conn = psycopg2.connect(**db_params)
+    try:
+        with conn.cursor() as cursor:
+            if is_partitioned(cursor, table_name):
+                ensure_week_partitions(cursor, table_name, collect_weeks(files, columns))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def import_file(db_params, table_name, file, columns, mode, progress, file_number):
+    """Load one file over its own connection in its own transaction; returns its summary"""
+    started = time.time()
+    summary = {"file": file, "ok": False, "rows": 0, "message": ""}
+    conn = None
+    try:
+        conn = psycopg2.connect(**db_params)
+        with open(file, newline='', encoding='utf-8') as csvfile:
+            reader = ProgressReader(csvfile, progress)
+            if mode in MERGE_MODES:
+                result = merge_import(conn, table_name, reader, columns, mode,
+                                      staging=index_name(table_name, f"staging_{file_number}"))
+                summary["rows"] = result["inserted"] + result["updated"]
+                summary["message"] = (f"{result['inserted']} inserted, {result['updated']} updated, "
+                                      f"{result['skipped']} skipped, {result['rejected']} rejected (no id)")
+            else:
+                with conn.cursor() as cursor:
+                    cursor.copy_expert(
+                        f"COPY {table_name} ({', '.join(name for name, _ in columns)}) FROM STDIN WITH (FORMAT csv, HEADER true)",
+                        reader
+                    )
+                    summary["rows"] = cursor.rowcount
+                conn.commit()
+                summary["message"] = f"{summary['rows']} rows copied"
+        summary["ok"] = True
+    except Exception as e:
+        if conn is not None:
+            conn.rollback()
+        summary["message"] = str(e).strip().splitlines()[0] if str(e).strip() else type(e).__name__
+        logging.error(f"Error importing {file} into {table_name}: {str(e)}")
+    finally:
+        if conn is not None:
+            conn.close()
+    summary["seconds"] = time.time() - started
+    return summary
+
+
+def import_files(db_params, table_name, files, columns, mode="append", progress=None,
+                 on_file_done=None, max_workers=MAX_IMPORT_CONNECTIONS):
+    """
+    Load the files concurrently over a small pool of connections, one transaction per file,
+    so a bad file fails alone. Returns the per-file summaries in the order of files.
+    """
+    progress = progress or ImportProgress(sum(os.path.getsize(file) for file in files))
+    prepare_partitions(db_params, table_name, files, columns)
+
+    summaries = {}
+    workers = max(1, min(max_workers, len(files)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="import") as executor:
+        futures = {
+            executor.submit(import_file, db_params, table_name, file, columns, mode, progress, number): file
+            for number, file in enumerate(files)
+        }
+        for future in as_completed(futures):
+            summary = future.result()
+            summaries[futures[future]] = summary
+            if on_file_done:
+                on_file_done(summary)
+    failed = sum(1 for summary in summaries.values() if not summary["ok"])
+    logging.info(f"Bulk import into {table_name}: {len(files) - failed} files loaded, {failed} failed")
+    return [summaries[file] for file in files]
+
+
+def bulk_import_gui(parent, db_params, table_name, files, columns, mode, on_finished):
+    """
+    Progress view of a bulk import: overall progress bar and one line per file, filled in as
+    files finish. on_finished(summaries) is called on the Tk thread when every file is done.
+    """
+    window = tk.Toplevel(parent)
+    window.title(f"Bulk Import - {table_name}")
+    window.geometry("800x450")
+
+    progress = ImportProgress(sum(os.path.getsize(file) for file in files))
+    progress_var = tk.DoubleVar(master=window)
+    progress_bar = ttk.Progressbar(window, variable=progress_var, maximum=100)
+    progress_bar.pack(fill=tk.X, padx=10, pady=(10, 5))
+    status_var = tk.StringVar(master=window, value=f"Importing {len(files)} files...")
+    status_label = tk.Label(window, textvariable=status_var, anchor="w")
+    status_label.pack(fill=tk.X, padx=10)
+
+    tree = ttk.Treeview(window, columns=("status", "rows", "seconds", "message"), show="tree headings")
+    tree.heading("#0", text="File")
+    tree.column("#0", width=250)
+    for name, heading, width in [("status", "Status", 70), ("rows", "Rows", 80),
+                                 ("seconds", "Seconds", 70), ("message", "Message", 300)]:
+        tree.heading(name, text=heading)
+        tree.column(name, width=width, anchor=tk.E if name in ("rows", "seconds") else tk.W)
+    scrollbar = tk.Scrollbar(window, command=tree.yview)
+    tree.configure(yscrollcommand=scrollbar.set)
+    scrollbar.pack(side=tk.RIGHT, fill=tk.Y, pady=10)
+    tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+    items = {file: tree.insert("", tk.END, text=os.path.basename(file), values=("waiting", "", "", "")) for file in files}
+    finished = []
+    done = {}
+
+    def worker():
+        try:
+            done["summaries"] = import_files(db_params, table_name, files, columns, mode, progress,
+                                             on_file_done=finished.append)
+        except Exception as e:
+            done["error"] = e
+
+    def poll():
+        # Tk widgets are only touched here, on the Tk thread
+        while finished:
+            summary = finished.pop(0)
+            tree.item(items[summary["file"]], values=("OK" if summary["ok"] else "FAILED", summary["rows"],
+                                                      f"{summary['seconds']:.1f}", summary["message"]))
+        progress_var.set(progress.percent())
+        if "summaries" in done or "error" in done:
+            if "error" in done:
+                status_var.set(f"Import failed: {done['error']}")
+                on_finished(None)
+                return
+            summaries = done["summaries"]
+            failed = sum(1 for summary in summaries if not summary["ok"])
+            progress_var.set(100)
+            status_var.set(f"{len(summaries) - failed} of {len(summaries)} files imported, "
+                           f"{sum(summary['rows'] for summary in summaries)} rows" +
+                           (f", {failed} failed" if failed else ""))
+            on_finished(summaries)
+            return
+        window.after(200, poll)
+
+    threading.Thread(target=worker, name="bulk-import", daemon=True).start()
+    window.after(200, poll)
+    return window
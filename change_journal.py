@@ -0,0 +1,173 @@
+import logging
+
+# Stable row key used by the journal (ctid changes on every update)
+ROW_ID_COLUMN = "fix_row_id"
+
+JOURNAL_TABLE = "data_fixing_journal"
+RUNS_TABLE = "data_fixing_runs"
+
+
+def ensure_journal_tables(cursor, table_name):
+    """Create the journal tables and the row key column of the table if needed"""
+    cursor.execute(f"""
+    CREATE TABLE IF NOT EXISTS {RUNS_TABLE} (
+        run_id BIGSERIAL PRIMARY KEY,
+        table_name TEXT NOT NULL,
+        started_at TIMESTAMP NOT NULL DEFAULT now(),
+        undone_at TIMESTAMP
+    );
+    CREATE TABLE IF NOT EXISTS {JOURNAL_TABLE} (
+        entry_id BIGSERIAL,
+        run_id BIGINT NOT NULL,
+        row_id BIGINT NOT NULL,
+        column_name TEXT NOT NULL,
+        old_value TEXT
+    );
+    CREATE INDEX IF NOT EXISTS {JOURNAL_TABLE}_run_idx ON {JOURNAL_TABLE} (run_id);
+    """)
+    cursor.execute(
+        "SELECT 1 FROM pg_attribute WHERE attrelid = to_regclass(%s) AND attname = %s AND NOT attisdropped",
+        (table_name, ROW_ID_COLUMN)
+    )
+    if cursor.fetchone() is None:
+        # Numbers every existing row; new rows get their key from the sequence default
+        cursor.execute(f"ALTER TABLE {table_name} ADD COLUMN {ROW_ID_COLUMN} BIGSERIAL")
+
+
+def start_run(conn, table_name):
+    """Register a new journaled run and return its id"""
+    try:
+        with conn.cursor() as cursor:
+            ensure_journal_tables(cursor, table_name)
+            cursor.execute(f"INSERT INTO {RUNS_TABLE} (table_name) VALUES (%s) RETURNING run_id", (table_name,))
+            run_id = cursor.fetchone()[0]
+        conn.commit()
+        logging.info(f"Journaling changes of {table_name} as run {run_id}")
+        return run_id
+    except Exception as e:
+        conn.rollback()
+        logging.error(f"Error starting journaled run: {str(e)}")
+        raise e
+
+
+def journaled_update_sql(table_name, column, new_value, condition, run_id):
+    """
+    Compose an UPDATE that also records (row key, column, old value) of every changed row
+    in the journal, in the same statement. new_value and condition are SQL templates on {col}.
+    The statement's row count is the number of rows changed.
+    The old values are read in the same statement and snapshot as the update, so the rows are
+    matched on their physical address (partition and ctid, a TID lookup) rather than on the
+    unindexed row key.
+    """
+    return f"""
+    WITH changed AS (
+        UPDATE {table_name} AS t
+        SET {column} = {new_value.format(col='o.old_value')}
+        FROM (
+            SELECT tableoid, ctid, {column} AS old_value
+            FROM {table_name}
+            WHERE {condition.format(col=column)}
+        ) AS o
+        WHERE t.tableoid = o.tableoid AND t.ctid = o.ctid
+        RETURNING t.{ROW_ID_COLUMN}, o.old_value
+    )
+    INSERT INTO {JOURNAL_TABLE} (run_id, row_id, column_name, old_value)
+    SELECT {int(run_id)}, {ROW_ID_COLUMN}, '{column}', old_value FROM changed;
+    """
+
+
+def journal_size(conn, run_id):
+    """Return (entries, bytes) journaled for a run"""
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f"SELECT COUNT(*), COALESCE(SUM(pg_column_size({JOURNAL_TABLE}.*)), 0) FROM {JOURNAL_TABLE} WHERE run_id = %s",
+            (run_id,)
+        )
+        entries, size = cursor.fetchone()
+    conn.rollback()
+    return entries, size
+
+
+def discard_empty_run(conn, run_id):
+    """
+    Delete a run that journaled nothing (it failed early or changed no row). The uncommitted
+    work of the connection is rolled back first. Returns True if the run was deleted.
+    """
+    try:
+        conn.rollback()
+        with conn.cursor() as cursor:
+            cursor.execute(
+                f"""
+                DELETE FROM {RUNS_TABLE} AS r
+                WHERE r.run_id = %s AND NOT EXISTS (SELECT 1 FROM {JOURNAL_TABLE} AS j WHERE j.run_id = r.run_id)
+                """,
+                (run_id,)
+            )
+            deleted = cursor.rowcount == 1
+        conn.commit()
+        return deleted
+    except Exception as e:
+        # last_run() skips empty runs anyway
+        logging.warning(f"Could not discard empty run {run_id}: {str(e)}")
+        return False
+
+
+def last_run(cursor, table_name):
+    """Return (run_id, started_at) of the most recent run of the table that changed rows and was not undone"""
+    cursor.execute("SELECT to_regclass(%s)", (RUNS_TABLE,))
+    if cursor.fetchone()[0] is None:
+        return None
+    cursor.execute(
+        f"""
+        SELECT r.run_id, r.started_at FROM {RUNS_TABLE} AS r
+        WHERE r.table_name = %s AND r.undone_at IS NULL
+          AND EXISTS (SELECT 1 FROM {JOURNAL_TABLE} AS j WHERE j.run_id = r.run_id)
+        ORDER BY r.run_id DESC LIMIT 1
+        """,
+        (table_name,)
+    )
+    return cursor.fetchone()
+
+
+def undo_last_run(conn, table_name, columns):
+    """
+    Restore the values changed by the last run with a single join update.
+    When a run changed the same cell several times, the first journaled value is the original.
+    Returns (run_id, rows restored), or None if there is nothing to undo.
+    """
+    try:
+        with conn.cursor() as cursor:
+            run = last_run(cursor, table_name)
+            if run is None:
+                return None
+            run_id = run[0]
+            pivot = ",\n".join(
+                f"bool_or(column_name = '{col}') AS {col}_hit, "
+                f"(array_agg(old_value ORDER BY entry_id) FILTER (WHERE column_name = '{col}'))[1] AS {col}"
+                for col in columns
+            )
+            assignments = ", ".join(f"{col} = CASE WHEN j.{col}_hit THEN j.{col} ELSE t.{col} END" for col in columns)
+            cursor.execute(
+                f"""
+                UPDATE {table_name} AS t
+                SET {assignments}
+                FROM (
+                    SELECT row_id, {pivot}
+                    FROM {JOURNAL_TABLE}
+                    WHERE run_id = %s
+                    GROUP BY row_id
+                ) AS j
+                WHERE t.{ROW_ID_COLUMN} = j.row_id
+                """,
+                (run_id,)
+            )
+            rows_restored = cursor.rowcount
+            cursor.execute(f"UPDATE {RUNS_TABLE} SET undone_at = now() WHERE run_id = %s", (run_id,))
+            cursor.execute(f"DELETE FROM {JOURNAL_TABLE} WHERE run_id = %s", (run_id,))
+        conn.commit()
+        logging.info(f"Undid run {run_id} of {table_name}: {rows_restored} rows restored")
+        return run_id, rows_restored
+    except Exception as e:
+        conn.rollback()
+        logging.error(f"Error undoing last run: {str(e)}")
+        raise e
@@ -2,97 +2,153 @@ import psycopg2
 import tkinter as tk
 from tkinter import messagebox, filedialog, ttk
 import os
+import re
+import csv
 import logging
-from datetime import datetime
-from full_report import main as full_report_gui
-
-# Setup logging
-log_directory = "logs"
-os.makedirs(log_directory, exist_ok=True)
-log_filename = os.path.join(log_directory, f"data_fixing_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log")
-logging.basicConfig(
-    filename=log_filename,
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+import time
+from folder_watch import FolderWatcher, inotify_available
+from report_cache import note_table_changed
+from table_filters import scope_clause
+from change_journal import journaled_update_sql, start_run, journal_size, undo_last_run, discard_empty_run
+from app_logging import setup_logging, enable_json_lines
+from log_pipeline import TextLogView
+from app_shell import current_screen, run, session
+from duplicate_photos import find_duplicate_photos, display_duplicates_gui
+from run_history import RunRecorder
 
 # List of columns to check for data fixing
 columns_to_check = ["c_pano_av", "syno", "pht_mas_a", "pht_mas_b", "pht_mas_c", "pht_mas_d", 
                    "ch_fer_apr", "c_ouv_ap2", "c_pano_apr", "pho_fer_av", "c_ouv_av_1"]
 
-# SQL queries for data fixing
-SQL_FIXING_QUERIES = [
-    r"""
-    -- UPDATE column empty text into NULL
-    UPDATE {table}
-    SET {col} = 'Link Not Found'
-    WHERE {col} IS NULL OR {col} = '';
-    """,
-    r"""
-    -- UPDATE column with double extension by deleting BOTH extensions
-    UPDATE {table}
-    SET {col} = REGEXP_REPLACE({col}, '\.[a-zA-Z0-9]+$', '')
-    WHERE {col} ~* '\.(jpg|jpeg|png|gif|heic|tiff|bmp)\.(jpg|jpeg|png|gif|heic|tiff|bmp)$';
-    """,
-    r"""
-    -- UPDATE column with valid extension .jpeg if missing for qfield images
-    UPDATE {table}
-    SET {col} = {col} ||'.jpeg'
-    WHERE {col} NOT ILIKE '%.%' AND {col} ILIKE '%qfield%';
-    """,
-    r"""
-    -- UPDATE column with invalid extension like .heic
-    UPDATE {table}
-    SET {col} = REGEXP_REPLACE({col}, '\.[a-zA-Z0-9]+$', '.jpg')
-    WHERE {col} NOT ILIKE '%.jpg' AND {col} NOT ILIKE '%.jpeg' AND {col} ILIKE '%.%';
-    """,
-    r"""
-    -- UPDATE column with valid extension .jpg if missing
-    UPDATE {table}
-    SET {col} = {col} ||'.jpg'
-    WHERE {col} NOT ILIKE '%.jpg' AND {col} NOT ILIKE '%.%';
-    """,
-    r"""
-    -- UPDATE column missing '/' next to files or next to DCIM
-    UPDATE {table}
-    SET {col} = CASE
+# Data fixing rules, applied in order to every column: (description, new value, condition)
+FIXING_RULES = [
+    ("UPDATE column empty text into NULL",
+     r"'Link Not Found'",
+     r"{col} IS NULL OR {col} = ''"),
+    ("UPDATE column with double extension by deleting BOTH extensions",
+     r"REGEXP_REPLACE({col}, '\.[a-zA-Z0-9]+$', '')",
+     r"{col} ~* '\.(jpg|jpeg|png|gif|heic|tiff|bmp)\.(jpg|jpeg|png|gif|heic|tiff|bmp)$'"),
+    ("UPDATE column with valid extension .jpeg if missing for qfield images",
+     r"{col} ||'.jpeg'",
+     r"{col} NOT ILIKE '%.%' AND {col} ILIKE '%qfield%'"),
+    ("UPDATE column with invalid extension like .heic",
+     r"REGEXP_REPLACE({col}, '\.[a-zA-Z0-9]+$', '.jpg')",
+     r"{col} NOT ILIKE '%.jpg' AND {col} NOT ILIKE '%.jpeg' AND {col} ILIKE '%.%'"),
+    ("UPDATE column with valid extension .jpg if missing",
+     r"{col} ||'.jpg'",
+     r"{col} NOT ILIKE '%.jpg' AND {col} NOT ILIKE '%.%'"),
+    ("UPDATE column missing '/' next to files or next to DCIM",
+     r"""CASE
                   WHEN {col} ILIKE 'files%' AND NOT {col} ILIKE 'files/%' THEN REGEXP_REPLACE({col}, 'files', 'files/')
                   WHEN {col} ILIKE 'DCIM%' AND NOT {col} ILIKE 'DCIM/%' THEN REGEXP_REPLACE({col}, 'DCIM', 'DCIM/')
                   ELSE {col}
-               END
-    WHERE ({col} ILIKE 'files%' AND NOT {col} ILIKE 'files/%') OR ({col} ILIKE 'DCIM%' AND NOT {col} ILIKE 'DCIM/%');
-    """,
-    r"""
-    -- UPDATE column from files/% to DCIM/%
-    UPDATE {table}
-    SET {col} = REGEXP_REPLACE({col}, 'files/', 'DCIM/')
-    WHERE {col} ILIKE 'files/%';
-    """
+               END""",
+     r"({col} ILIKE 'files%' AND NOT {col} ILIKE 'files/%') OR ({col} ILIKE 'DCIM%' AND NOT {col} ILIKE 'DCIM/%')"),
+    ("UPDATE column from files/% to DCIM/%",
+     r"REGEXP_REPLACE({col}, 'files/', 'DCIM/')",
+     r"{col} ILIKE 'files/%'"),
 ]
+# A value marked 'File Not Found' keeps its path after the marker until the file arrives;
+# no rule may rewrite it, or the restore would no longer find the file
+FIXING_RULES = [(description, new_value, f"({condition}) AND COALESCE({{col}}, '') NOT ILIKE 'File Not Found%'")
+                for description, new_value, condition in FIXING_RULES]
+
+
+def build_fixing_query(rule, table_name, column, scope="", journal_run_id=None):
+    """
+    Compose the UPDATE statement of a fixing rule for one column.
+    With a journal run id the old values are recorded in the change journal as well.
+    """
+    description, new_value, condition = rule
+    if journal_run_id is not None:
+        return journaled_update_sql(table_name, column, new_value, f"({condition}){scope}", journal_run_id)
+    return f"""
+    -- {description}
+    UPDATE {table_name}
+    SET {column} = {new_value.format(col=column)}
+    WHERE ({condition.format(col=column)}){scope};
+    """
+
+# Per-row watermark: hash of the photo columns as they were after the last successful run
+ROW_HASH_COLUMN = "fix_row_hash"
+ROW_HASH_EXPRESSION = f"md5(ROW({', '.join(columns_to_check)})::text)"
+
+
+def ensure_row_hash_column(cursor, table_name):
+    """
+    Add the watermark column to the table if it does not exist yet.
+    """
+    cursor.execute(f"ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS {ROW_HASH_COLUMN} TEXT")
+
+
+def build_scope_clause(incremental=False, weeks=None, bbox=None):
+    """
+    Build the extra predicate appended to the fixing and checking queries.
+    In incremental mode only rows added or changed since the last successful run are processed.
+    A week filter restricts the run to those weeks (and partitions), an area to the rows
+    inside its bounding box (through the GPS index).
+    """
+    scope = scope_clause(weeks, bbox)
+    if incremental:
+        scope += f" AND {ROW_HASH_COLUMN} IS DISTINCT FROM {ROW_HASH_EXPRESSION}"
+    return scope
 
 
-def execute_fixing_queries(conn, table_name, progress_callback=None):
+def advance_watermark(conn, table_name, weeks=None, bbox=None):
+    """
+    Record the current state of every processed row, so the next incremental run skips it.
+    Only the weeks and area the run was restricted to are recorded.
+    """
+    try:
+        with conn.cursor() as cursor:
+            ensure_row_hash_column(cursor, table_name)
+            cursor.execute(
+                f"UPDATE {table_name} SET {ROW_HASH_COLUMN} = {ROW_HASH_EXPRESSION} "
+                f"WHERE {ROW_HASH_COLUMN} IS DISTINCT FROM {ROW_HASH_EXPRESSION}{scope_clause(weeks, bbox)}"
+            )
+            rows_marked = cursor.rowcount
+        conn.commit()
+        logging.info(f"Watermark advanced for {rows_marked} rows")
+        return rows_marked
+    except Exception as e:
+        conn.rollback()
+        logging.error(f"Error advancing watermark: {str(e)}")
+        raise e
+
+
+def execute_fixing_queries(conn, table_name, progress_callback=None, incremental=False, journal_run_id=None,
+                           weeks=None, bbox=None, column_updates=None):
     """
     Execute all data fixing queries on the specified table.
+    With incremental=True only rows changed since the last successful run are fixed.
+    With weeks or a bounding box only the rows of those weeks or that area are fixed.
+    With a journal run id (see change_journal.start_run) every change can be undone.
+    A column_updates dict receives the number of updates of each column.
     """
     try:
         with conn.cursor() as cursor:
+            if incremental:
+                ensure_row_hash_column(cursor, table_name)
+            scope = build_scope_clause(incremental, weeks, bbox)
+            
             # Counter for tracking total updates
             total_updates = 0
-            total_steps = len(columns_to_check) * len(SQL_FIXING_QUERIES)
+            total_steps = len(columns_to_check) * len(FIXING_RULES)
             current_step = 0
             
             # Loop through each column
             for column in columns_to_check:
                 # Execute each query for this column
-                for query_index, query in enumerate(SQL_FIXING_QUERIES):
+                for query_index, rule in enumerate(FIXING_RULES):
                     query_name = f"Query {query_index+1} on column {column}"
                     logging.info(f"Executing {query_name}")
                     
-                    formatted_query = query.format(col=column, table=table_name)
+                    formatted_query = build_fixing_query(rule, table_name, column, scope, journal_run_id)
                     cursor.execute(formatted_query)
                     rows_affected = cursor.rowcount
                     total_updates += rows_affected
+                    if column_updates is not None:
+                        column_updates[column] = column_updates.get(column, 0) + rows_affected
                     
                     logging.info(f"Completed {query_name}: {rows_affected} rows affected")
                     
@@ -104,6 +160,7 @@ def execute_fixing_queries(conn, table_name, progress_callback=None):
             
             # Commit the changes
             conn.commit()
+            note_table_changed(conn, table_name)
             logging.info(f"All fixing queries completed successfully. Total updates: {total_updates}")
             
             return total_updates
@@ -114,59 +171,235 @@ def execute_fixing_queries(conn, table_name, progress_callback=None):
         raise e
 
 
-def check_file_existence(conn, table_name, folder_path, progress_callback=None):
+def row_hash_column_exists(cursor, table_name):
+    """Return True if the table already carries the watermark column"""
+    cursor.execute(
+        "SELECT 1 FROM pg_attribute WHERE attrelid = to_regclass(%s) AND attname = %s AND NOT attisdropped",
+        (table_name, ROW_HASH_COLUMN)
+    )
+    return cursor.fetchone() is not None
+
+
+def preview_fixing_queries(conn, table_name, incremental=False, weeks=None, bbox=None):
+    """
+    Compute what execute_fixing_queries would change without writing anything.
+    All rules are chained per column with LATERAL subqueries built from the same rule
+    expressions, so the whole preview is one read-only scan of the table.
+    Returns a list of {column, rule, rows, samples} where samples holds up to two
+    (before, after) pairs (the smallest and largest changed values).
+    """
+    selects = []
+    laterals = []
+    cells = []
+    for col_index, column in enumerate(columns_to_check):
+        previous = column
+        for rule_index, (description, new_value, condition) in enumerate(FIXING_RULES):
+            alias = f"p{col_index}_{rule_index}"
+            laterals.append(f"""
+            CROSS JOIN LATERAL (
+                SELECT ({condition.format(col=previous)}) IS TRUE AS hit,
+                       CASE WHEN {condition.format(col=previous)} THEN {new_value.format(col=previous)} ELSE {previous} END AS value,
+                       {previous} AS before
+            ) AS {alias}""")
+            selects.append(f"COUNT(*) FILTER (WHERE {alias}.hit)")
+            selects.append(f"MIN(ARRAY[{alias}.before, {alias}.value]) FILTER (WHERE {alias}.hit)")
+            selects.append(f"MAX(ARRAY[{alias}.before, {alias}.value]) FILTER (WHERE {alias}.hit)")
+            cells.append((column, description))
+            previous = f"{alias}.value"
+
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SET TRANSACTION READ ONLY")
+            # Without a watermark column every row is pending, exactly as in the real run
+            scope = build_scope_clause(incremental and row_hash_column_exists(cursor, table_name), weeks, bbox)
+            cursor.execute(f"SELECT {', '.join(selects)} FROM {table_name} {''.join(laterals)} WHERE TRUE{scope}")
+            values = cursor.fetchone()
+    finally:
+        conn.rollback()
+
+    preview = []
+    for cell_index, (column, description) in enumerate(cells):
+        rows, lowest, highest = values[cell_index * 3:cell_index * 3 + 3]
+        samples = [tuple(pair) for pair in (lowest, highest) if pair]
+        if len(samples) == 2 and samples[0] == samples[1]:
+            samples = samples[:1]
+        preview.append({"column": column, "rule": description, "rows": rows, "samples": samples})
+    logging.info(f"Preview computed: {sum(item['rows'] for item in preview)} changes pending")
+    return preview
+
+
+# rsync --list-only line: permissions, size, date, time, path
+RSYNC_LIST_PATTERN = re.compile(r"^([-dlcbps])[rwxsStT-]{9}\S*\s+[\d,.]+\s+\d{4}/\d{2}/\d{2}\s+\d{2}:\d{2}:\d{2}\s+(.+)$")
+
+
+def normalize_manifest_path(path):
+    """
+    Normalize a relative file path so manifest entries and database values compare equal.
+    """
+    path = path.strip().replace("\\", "/")
+    while path.startswith("./"):
+        path = path[2:]
+    return path.lstrip("/")
+
+
+def load_file_manifest(manifest_path):
+    """
+    Load a file manifest produced on the storage host into a hashed index of relative paths.
+    Accepted formats: one path per line (`find . -type f`), tab separated lines whose first
+    field is the path (`find -printf '%P\\t%s\\t%T@\\n'`), `rsync --list-only` output and,
+    for files named *.csv only, CSV rows whose first column is the path (optional header,
+    size/mtime columns). Other files are never split on commas, which file names may contain.
+    Extra fields are ignored.
+    """
+    entries = set()
+    with open(manifest_path, newline='', encoding='utf-8') as manifest_file:
+        is_csv = manifest_path.lower().endswith(".csv")
+        reader = csv.reader(manifest_file) if is_csv else manifest_file
+        for line in reader:
+            if is_csv:
+                path = line[0] if line else ""
+                if path.strip().lower() == "path":
+                    continue  # Skip the header row
+            else:
+                line = line.rstrip("\r\n")
+                rsync_match = RSYNC_LIST_PATTERN.match(line)
+                if rsync_match:
+                    if rsync_match.group(1) != "-":
+                        continue  # Only regular files can be referenced by a photo column
+                    path = rsync_match.group(2)
+                else:
+                    path = line.split("\t", 1)[0]
+            path = normalize_manifest_path(path)
+            if path:
+                entries.add(path)
+    logging.info(f"Loaded {len(entries)} entries from manifest {manifest_path}")
+    return frozenset(entries)
+
+
+# Missing files keep their original path after the marker, so they can be restored once the file arrives
+FILE_NOT_FOUND_PREFIX = "File Not Found: "
+
+
+def file_exists_in_store(file_path, folder_path, manifest=None):
+    """
+    Check a single referenced path against the manifest or the photo folder.
+    Returns (exists, full_path) where full_path is only used for logging.
+    """
+    if manifest is not None:
+        return normalize_manifest_path(file_path) in manifest, file_path
+    full_path = os.path.join(folder_path, file_path)
+    return os.path.isfile(full_path), full_path
+
+
+def journaled_execute(cursor, table_name, column, new_value, condition, params, journal_run_id=None):
+    """
+    Run an UPDATE of one column given as templates on {col}, journaling it if requested.
+    """
+    if journal_run_id is not None:
+        query = journaled_update_sql(table_name, column, new_value, condition, journal_run_id)
+    else:
+        query = f"UPDATE {table_name} SET {column} = {new_value.format(col=column)} WHERE {condition.format(col=column)}"
+    cursor.execute(query, params)
+    return cursor.rowcount
+
+
+def mark_missing_files(cursor, table_name, column, file_paths, journal_run_id=None, row_filter=""):
+    """
+    Mark every row of the column referencing one of the given paths as 'File Not Found'.
+    row_filter is an extra ' AND ...' predicate such as a week filter.
+    """
+    if not file_paths:
+        return 0
+    return journaled_execute(
+        cursor, table_name, column, "%s || {col}", "{col} = ANY(%s)" + row_filter.replace("%", "%%"),
+        (FILE_NOT_FOUND_PREFIX, list(file_paths)), journal_run_id
+    )
+
+
+def restore_found_files(cursor, table_name, column, file_paths, journal_run_id=None, row_filter=""):
+    """
+    Restore the original path of rows previously marked 'File Not Found' for the given paths.
+    row_filter is an extra ' AND ...' predicate such as a week filter.
+    """
+    if not file_paths:
+        return 0
+    return journaled_execute(
+        cursor, table_name, column, "substr({col}, %s)", "{col} = ANY(%s)" + row_filter.replace("%", "%%"),
+        (len(FILE_NOT_FOUND_PREFIX) + 1, [FILE_NOT_FOUND_PREFIX + path for path in file_paths]), journal_run_id
+    )
+
+
+def check_file_existence(conn, table_name, folder_path, progress_callback=None, manifest=None, incremental=False,
+                         journal_run_id=None, weeks=None, bbox=None, column_missing=None):
     """
     Check if files referenced in the database actually exist in the specified folder path.
-    Update database records if files don't exist.
+    When a manifest (see load_file_manifest) is given, lookups are done against it instead
+    of the filesystem, so remote photo stores are never walked.
+    Update database records if files don't exist, and restore rows marked 'File Not Found'
+    whose file has appeared since the last check.
+    With incremental=True only paths of rows changed since the last successful run are checked.
+    With weeks or a bounding box only the rows of those weeks or that area are checked and updated.
+    With a journal run id (see change_journal.start_run) every change can be undone.
+    A column_missing dict receives the number of rows marked missing in each column.
     """
     try:
         total_updates = 0
+        total_restored = 0
         with conn.cursor() as cursor:
-            # First, count total rows to process for progress calculation
-            cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-            total_rows = cursor.fetchone()[0] * len(columns_to_check)
-            processed_rows = 0
+            if incremental:
+                ensure_row_hash_column(cursor, table_name)
+            scope = build_scope_clause(incremental, weeks, bbox)
+            row_filter = scope_clause(weeks, bbox)
             
             # For each column we want to check
-            for column in columns_to_check:
+            for column_index, column in enumerate(columns_to_check):
                 logging.info(f"Checking file existence for column {column}")
                 
-                # Get the values from this column
-                cursor.execute(f"SELECT {column} FROM {table_name}")
+                # Each distinct path only needs to be checked once
+                cursor.execute(f"SELECT DISTINCT {column} FROM {table_name} WHERE {column} IS NOT NULL{scope}")
                 rows = cursor.fetchall()
+                missing_paths = []
+                found_paths = []
                 
-                for row in rows:
+                for processed_rows, row in enumerate(rows, start=1):
                     file_path = row[0]
-                    processed_rows += 1
                     
-                    # Skip null values or already labeled as not found
-                    if file_path.startswith('Link Not Found') or file_path.startswith('File Not Found'):
+                    # Skip empty values and missing links; re-check files previously not found
+                    marked_missing = file_path.startswith(FILE_NOT_FOUND_PREFIX)
+                    if marked_missing:
+                        file_path = file_path[len(FILE_NOT_FOUND_PREFIX):]
+                    if not file_path or file_path.startswith('Link Not Found') or file_path.startswith('File Not Found'):
                         continue
                     
-                    # Check if the file exists in the specified folder
+                    # Check if the file exists in the manifest or the specified folder
                     try:
-                        full_path = os.path.join(folder_path, file_path)
-                        file_exists = os.path.isfile(full_path)
+                        file_exists, full_path = file_exists_in_store(file_path, folder_path, manifest)
                         
-                        if not file_exists:
+                        if marked_missing and file_exists:
+                            logging.info(f"File found again: {full_path}")
+                            found_paths.append(file_path)
+                        elif not marked_missing and not file_exists:
                             logging.info(f"File not found: {full_path}")
-                            # Update the database if file doesn't exist
-                            cursor.execute(
-                                f"UPDATE {table_name} SET {column} = %s WHERE {column} = %s",
-                                ('File Not Found', file_path)
-                            )
-                            total_updates += cursor.rowcount
+                            missing_paths.append(file_path)
                     except Exception as file_check_error:
                         logging.warning(f"Error checking file {file_path}: {str(file_check_error)}")
                     
                     # Update progress if callback is provided
                     if progress_callback and processed_rows % 10 == 0:  # Update every 10 rows to reduce overhead
-                        progress_percent = (processed_rows / total_rows) * 100
-                        progress_callback(progress_percent, f"Checking files in {column}: {processed_rows}/{total_rows}")
+                        progress_percent = (column_index + processed_rows / len(rows)) / len(columns_to_check) * 100
+                        progress_callback(progress_percent, f"Checking files in {column}: {processed_rows}/{len(rows)}")
+                
+                # Update the database once per column for all missing and reappeared files
+                column_marked = mark_missing_files(cursor, table_name, column, missing_paths, journal_run_id, row_filter)
+                total_updates += column_marked
+                if column_missing is not None:
+                    column_missing[column] = column_marked
+                total_restored += restore_found_files(cursor, table_name, column, found_paths, journal_run_id, row_filter)
             
             # Commit the changes
             conn.commit()
-            logging.info(f"File existence check completed. Total missing files: {total_updates}")
+            note_table_changed(conn, table_name)
+            logging.info(f"File existence check completed. Total missing files: {total_updates}, restored: {total_restored}")
             
             return total_updates
     except Exception as e:
@@ -176,8 +409,41 @@ def check_file_existence(conn, table_name, folder_path, progress_callback=None):
         raise e
 
 
+def apply_watch_batch(conn, table_name, arrived, removed, removed_dirs=()):
+    """
+    Apply one batch of filesystem events from folder_watch.FolderWatcher to the table.
+    Arrived paths clear their 'File Not Found' marker, removed paths (and every path
+    under a removed directory) get marked, using one set-based update per column.
+    """
+    try:
+        restored = 0
+        marked = 0
+        dir_patterns = [directory.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "/%"
+                        for directory in removed_dirs]
+        with conn.cursor() as cursor:
+            for column in columns_to_check:
+                restored += restore_found_files(cursor, table_name, column, arrived)
+                marked += mark_missing_files(cursor, table_name, column, removed)
+                if dir_patterns:
+                    cursor.execute(
+                        f"""UPDATE {table_name} SET {column} = %s || {column}
+                        WHERE {column} LIKE ANY(%s) AND {column} NOT LIKE 'File Not Found%%'""",
+                        (FILE_NOT_FOUND_PREFIX, dir_patterns)
+                    )
+                    marked += cursor.rowcount
+        conn.commit()
+        note_table_changed(conn, table_name)
+        logging.info(f"Watch batch applied: {len(arrived)} arrived, {len(removed)} removed, "
+                     f"{restored} rows restored, {marked} rows marked 'File Not Found'")
+        return restored, marked
+    except Exception as e:
+        conn.rollback()
+        logging.error(f"Error applying watch batch: {str(e)}")
+        raise e
+
+
 class EnhancedDataFixingDialog:
-    def __init__(self, parent, dbname, user, password, host, port, table_name):
+    def __init__(self, parent, dbname, user, password, host, port, table_name, weeks=None, bbox=None):
         self.parent = parent
         self.db_params = {
             'dbname': dbname,
@@ -187,15 +453,23 @@ class EnhancedDataFixingDialog:
             'port': port
         }
         self.table_name = table_name
+        self.weeks = weeks or []
+        self.bbox = bbox
+        self.log_filename = setup_logging()
         self.folder_path = None
+        self.manifest_path = None
+        self.watcher = None
+        self.watch_conn = None
         
         # Create a new top-level window
         self.dialog = tk.Toplevel(parent)
-        self.dialog.title("Enhanced Data Fixing Tool")
+        self.dialog.title("Enhanced Data Fixing Tool" + (f" - weeks {', '.join(self.weeks)}" if self.weeks else "")
+                          + (" - area filter" if self.bbox else ""))
         self.dialog.geometry("800x600")
         
-        # Make the dialog modal
-        self.dialog.transient(parent)
+        # Make the dialog modal (a transient of a hidden window would be hidden too)
+        if parent.winfo_viewable():
+            self.dialog.transient(parent)
         self.dialog.grab_set()
         
         # Create widgets
@@ -224,6 +498,9 @@ class EnhancedDataFixingDialog:
         path_entry = tk.Entry(path_frame, textvariable=self.path_var, width=40, state='readonly')
         path_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 5))
         
+        manifest_button = tk.Button(path_frame, text="Manifest...", command=self.browse_manifest)
+        manifest_button.pack(side=tk.RIGHT, padx=(5, 0))
+        
         browse_button = tk.Button(path_frame, text="Browse...", command=self.browse_folder)
         browse_button.pack(side=tk.RIGHT)
         
@@ -242,6 +519,26 @@ class EnhancedDataFixingDialog:
                                            variable=self.check_existence_var)
         check_existence_cb.pack(anchor=tk.W, pady=2)
         
+        self.force_full_run_var = tk.BooleanVar(value=False)
+        force_full_run_cb = tk.Checkbutton(options_frame, text="Force full run (ignore rows unchanged since last run)", 
+                                           variable=self.force_full_run_var)
+        force_full_run_cb.pack(anchor=tk.W, pady=2)
+        
+        self.journal_var = tk.BooleanVar(value=True)
+        journal_cb = tk.Checkbutton(options_frame, text="Journal changes (enables Undo Last Run)", 
+                                    variable=self.journal_var)
+        journal_cb.pack(anchor=tk.W, pady=2)
+        
+        self.duplicates_var = tk.BooleanVar(value=False)
+        duplicates_cb = tk.Checkbutton(options_frame, text="Detect duplicate photos (hashes the files of the folder)", 
+                                       variable=self.duplicates_var)
+        duplicates_cb.pack(anchor=tk.W, pady=2)
+        
+        self.json_log_var = tk.BooleanVar(value=False)
+        json_log_cb = tk.Checkbutton(options_frame, text="Also write a JSON lines log", 
+                                     variable=self.json_log_var)
+        json_log_cb.pack(anchor=tk.W, pady=2)
+        
         self.launch_report_var = tk.BooleanVar(value=True)
         launch_report_cb = tk.Checkbutton(options_frame, text="Launch full report after completion", 
                                          variable=self.launch_report_var)
@@ -281,70 +578,207 @@ class EnhancedDataFixingDialog:
                                      width=10)
         self.start_button.pack(side=tk.RIGHT, padx=(5, 0))
         
-        cancel_button = tk.Button(button_frame, text="Cancel", command=self.dialog.destroy, 
+        preview_button = tk.Button(button_frame, text="Preview", command=self.show_preview,
+                                   width=10)
+        preview_button.pack(side=tk.RIGHT, padx=(5, 0))
+        
+        undo_button = tk.Button(button_frame, text="Undo Last Run", command=self.undo_last_run,
+                                width=12)
+        undo_button.pack(side=tk.LEFT, padx=(5, 0))
+        
+        cancel_button = tk.Button(button_frame, text="Cancel", command=self.close, 
                                  width=10)
         cancel_button.pack(side=tk.RIGHT, padx=(5, 0))
         
+        self.watch_button = tk.Button(button_frame, text="Watch Folder", command=self.toggle_watch,
+                                      width=12)
+        self.watch_button.pack(side=tk.LEFT)
+        
+        self.dialog.protocol("WM_DELETE_WINDOW", self.close)
+        
         # Create a custom logger handler to display logs in the text widget
         self.setup_log_handler()
     
     def setup_log_handler(self):
-        """Set up a custom handler to display logs in the text widget"""
-        class TextHandler(logging.Handler):
-            def __init__(self, text_widget):
-                logging.Handler.__init__(self)
-                self.text_widget = text_widget
-            
-            def emit(self, record):
-                msg = self.format(record)
-                def append():
-                    self.text_widget.configure(state='normal')
-                    self.text_widget.insert(tk.END, msg + '\n')
-                    self.text_widget.configure(state='disabled')
-                    self.text_widget.see(tk.END)
-                # Schedule to be executed in the main thread
-                self.text_widget.after(0, append)
-        
-        # Configure the handler
-        text_handler = TextHandler(self.log_text)
-        text_handler.setFormatter(logging.Formatter('%(levelname)s: %(message)s'))
-        
-        # Add the handler to the logger
-        logger = logging.getLogger()
-        logger.addHandler(text_handler)
+        """Show the log in the text widget, in timed batches and bounded to the last lines"""
+        self.log_view = TextLogView(self.log_text)
     
     def browse_folder(self):
         """Open a file dialog to select the DCIM folder"""
         folder_selected = filedialog.askdirectory(title="Select Folder Containing Image Files")
         if folder_selected:
             self.folder_path = folder_selected
+            self.manifest_path = None
             self.path_var.set(folder_selected)
+            session["photo_folder"] = folder_selected
             logging.info(f"Selected folder: {folder_selected}")
     
+    def browse_manifest(self):
+        """Open a file dialog to select a file manifest listing the remote photo store"""
+        manifest_selected = filedialog.askopenfilename(
+            title="Select File Manifest",
+            filetypes=[("Manifest files", "*.txt *.csv *.lst"), ("All files", "*.*")]
+        )
+        if manifest_selected:
+            self.manifest_path = manifest_selected
+            self.folder_path = None
+            self.path_var.set(f"Manifest: {manifest_selected}")
+            logging.info(f"Selected manifest: {manifest_selected}")
+    
+    def show_preview(self):
+        """Show how many rows each fixing rule would change, without touching the table"""
+        recorder = RunRecorder("test", self.db_params, self.table_name, self.weeks, self.bbox)
+        try:
+            self.update_progress(0, "Computing preview...")
+            conn = psycopg2.connect(**self.db_params)
+            try:
+                with recorder.phase("preview"):
+                    preview = preview_fixing_queries(conn, self.table_name, incremental=not self.force_full_run_var.get(),
+                                                     weeks=self.weeks, bbox=self.bbox)
+            finally:
+                conn.close()
+        except Exception as e:
+            logging.error(f"Error computing preview: {str(e)}")
+            messagebox.showerror("Error", f"Could not compute the preview:\n\n{str(e)}")
+            self.update_progress(0, "Preview failed")
+            return
+        total_rows = sum(item["rows"] for item in preview)
+        self.update_progress(0, f"Preview: {total_rows} updates would be made")
+        recorder.metrics["rows_updated"] = total_rows
+        for item in preview:
+            column_rows = recorder.column_metrics.get(item["column"], {}).get("rows_updated", 0)
+            recorder.add_column_metrics(item["column"], {"rows_updated": column_rows + item["rows"]})
+        recorder.save()
+        
+        preview_window = tk.Toplevel(self.dialog)
+        preview_window.title(f"Fixing Preview - {self.table_name}")
+        preview_window.geometry("900x500")
+        
+        tree = ttk.Treeview(preview_window, columns=("column", "rule", "rows", "sample"), show="headings")
+        for name, heading, width in [("column", "Column", 100), ("rule", "Rule", 330),
+                                     ("rows", "Rows", 70), ("sample", "Sample before -> after", 380)]:
+            tree.heading(name, text=heading)
+            tree.column(name, width=width, anchor=tk.E if name == "rows" else tk.W)
+        scrollbar = tk.Scrollbar(preview_window, command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        for item in preview:
+            if not item["rows"]:
+                continue
+            sample = "   |   ".join(f"{before} -> {after}" for before, after in item["samples"])
+            tree.insert("", tk.END, values=(item["column"], item["rule"].replace("UPDATE column ", ""), item["rows"], sample))
+        
+        summary = tk.Label(preview_window, text=f"Total updates: {total_rows} (file existence marking is not previewed)")
+        summary.pack(pady=(0, 10))
+    
+    def undo_last_run(self):
+        """Restore the values changed by the last journaled run of this table"""
+        if not messagebox.askyesno("Undo Last Run", f"Restore the values changed by the last run on {self.table_name}?"):
+            return
+        try:
+            conn = psycopg2.connect(**self.db_params)
+            try:
+                result = undo_last_run(conn, self.table_name, columns_to_check)
+                if result:
+                    note_table_changed(conn, self.table_name)
+            finally:
+                conn.close()
+        except Exception as e:
+            messagebox.showerror("Error", f"Could not undo the last run:\n\n{str(e)}")
+            return
+        if result is None:
+            messagebox.showinfo("Undo Last Run", "There is no journaled run to undo.")
+        else:
+            messagebox.showinfo("Undo Last Run", f"Run {result[0]} undone: {result[1]} rows restored.")
+    
+    def toggle_watch(self):
+        """Start or stop live watching of the selected folder for arriving and deleted photos"""
+        if self.watcher and self.watcher.is_running():
+            self.stop_watch()
+            return
+        if not self.folder_path:
+            messagebox.showwarning("Warning", "Please select a folder to watch.")
+            return
+        if not inotify_available():
+            messagebox.showwarning("Warning", "Folder watching is only available on Linux.")
+            return
+        try:
+            self.watch_conn = psycopg2.connect(**self.db_params)
+            self.watcher = FolderWatcher(self.folder_path, self.on_watch_batch, self.on_watch_overflow)
+            self.watcher.start()
+        except Exception as e:
+            logging.error(f"Could not start folder watch: {str(e)}")
+            messagebox.showerror("Error", f"Could not start folder watch:\n\n{str(e)}")
+            self.stop_watch()
+            return
+        self.watch_button.config(text="Stop Watch")
+        self.status_var.set(f"Watching {self.folder_path} for changes...")
+    
+    def stop_watch(self):
+        """Stop the folder watcher and close its database connection"""
+        if self.watcher:
+            self.watcher.stop()
+            self.watcher = None
+        if self.watch_conn:
+            self.watch_conn.close()
+            self.watch_conn = None
+            logging.info("Folder watch stopped.")
+        self.watch_button.config(text="Watch Folder")
+    
+    def on_watch_batch(self, arrived, removed, removed_dirs):
+        """Called from the watcher thread with a batch of filesystem changes"""
+        apply_watch_batch(self.watch_conn, self.table_name, arrived, removed, removed_dirs)
+    
+    def on_watch_overflow(self):
+        """Events were lost, so fall back to one full existence check"""
+        check_file_existence(self.watch_conn, self.table_name, self.folder_path)
+    
+    def close(self):
+        """Stop any running folder watch, detach the log view and close the dialog"""
+        self.stop_watch()
+        self.log_view.close()
+        self.dialog.destroy()
+        logging.info("Data fixing tool closed.")
+    
     def update_progress(self, value, message):
         """Update the progress bar and status message"""
         self.progress_var.set(value)
         self.status_var.set(message)
+        self.log_view.flush()
         self.dialog.update_idletasks()
     
     def run_data_fixing(self):
         """Execute the selected data fixing operations"""
         # Check if folder is required and selected
-        if self.check_existence_var.get() and not self.folder_path:
-            messagebox.showwarning("Warning", "Please select a folder for file existence check.")
+        if self.check_existence_var.get() and not (self.folder_path or self.manifest_path):
+            messagebox.showwarning("Warning", "Please select a folder or a manifest for file existence check.")
             return
         
         # Disable the start button to prevent multiple executions
         self.start_button.config(state=tk.DISABLED)
         
+        # Structured metrics of the run, kept in the run history next to the free-text log
+        recorder = RunRecorder("fix", self.db_params, self.table_name, self.weeks, self.bbox)
         try:
             # Log the start of operations
+            if self.json_log_var.get():
+                logging.info(f"Writing JSON lines log to: {enable_json_lines()}")
             logging.info(f"Starting data fixing operations on table: {self.table_name}")
+            if self.weeks:
+                logging.info(f"Restricted to weeks: {', '.join(self.weeks)}")
+            if self.bbox:
+                logging.info(f"Restricted to area: {self.bbox}")
             self.update_progress(0, "Starting operations...")
             
             # Initialize counters
             fixing_updates = 0
             existence_updates = 0
+            journal_run_id = None
+            incremental = not self.force_full_run_var.get()
+            if incremental:
+                logging.info("Incremental run: only rows added or changed since the last run are processed.")
             
             # Connect to the database
             try:
@@ -354,16 +788,33 @@ class EnhancedDataFixingDialog:
             except Exception as db_error:
                 raise Exception(f"Failed to connect to database: {str(db_error)}")
             
+            # Register the run in the change journal if requested
+            journal_run_id = start_run(conn, self.table_name) if self.journal_var.get() else None
+            fixing_seconds = 0.0
+            existence_seconds = 0.0
+            
             # Execute path fixing if selected
             if self.fix_paths_var.get():
                 logging.info("Starting path format fixing...")
                 self.update_progress(10, "Fixing path formats...")
                 
+                phase_start = time.perf_counter()
+                column_updates = {}
                 fixing_updates = execute_fixing_queries(
                     conn, 
                     self.table_name, 
-                    lambda percent, msg: self.update_progress(10 + percent * 0.4, msg)
+                    lambda percent, msg: self.update_progress(10 + percent * 0.4, msg),
+                    incremental=incremental,
+                    journal_run_id=journal_run_id,
+                    weeks=self.weeks,
+                    bbox=self.bbox,
+                    column_updates=column_updates
                 )
+                fixing_seconds = time.perf_counter() - phase_start
+                recorder.phases["fixing"] = fixing_seconds
+                recorder.metrics["rows_updated"] = fixing_updates
+                for column, updates in column_updates.items():
+                    recorder.add_column_metrics(column, {"rows_updated": updates})
                 
                 logging.info(f"Path fixing completed: {fixing_updates} updates made")
                 self.update_progress(50, f"Path fixing completed: {fixing_updates} updates")
@@ -373,19 +824,76 @@ class EnhancedDataFixingDialog:
                 logging.info("Starting file existence check...")
                 self.update_progress(50, "Checking file existence...")
                 
+                manifest = None
+                if self.manifest_path:
+                    manifest = load_file_manifest(self.manifest_path)
+                
+                phase_start = time.perf_counter()
+                column_missing = {}
                 existence_updates = check_file_existence(
                     conn, 
                     self.table_name, 
                     self.folder_path,
-                    lambda percent, msg: self.update_progress(50 + percent * 0.4, msg)
+                    lambda percent, msg: self.update_progress(50 + percent * 0.4, msg),
+                    manifest=manifest,
+                    incremental=incremental,
+                    journal_run_id=journal_run_id,
+                    weeks=self.weeks,
+                    bbox=self.bbox,
+                    column_missing=column_missing
                 )
+                existence_seconds = time.perf_counter() - phase_start
+                recorder.phases["file_check"] = existence_seconds
+                recorder.metrics["missing_files"] = existence_updates
+                for column, missing in column_missing.items():
+                    recorder.add_column_metrics(column, {"missing_files": missing})
                 
                 logging.info(f"File existence check completed: {existence_updates} files not found")
                 self.update_progress(90, f"File check completed: {existence_updates} missing files")
             
+            # Look for rows whose photos have identical content
+            duplicates = None
+            duplicates_seconds = 0.0
+            if self.duplicates_var.get():
+                if self.folder_path:
+                    logging.info("Starting duplicate photo detection...")
+                    self.update_progress(90, "Detecting duplicate photos...")
+                    phase_start = time.perf_counter()
+                    duplicates = find_duplicate_photos(
+                        conn,
+                        self.table_name,
+                        self.folder_path,
+                        lambda percent, msg: self.update_progress(90 + percent * 0.05, msg),
+                        weeks=self.weeks,
+                        bbox=self.bbox
+                    )
+                    duplicates_seconds = time.perf_counter() - phase_start
+                    recorder.phases["duplicates"] = duplicates_seconds
+                    recorder.metrics["duplicate_groups"] = len(duplicates)
+                else:
+                    logging.warning("Duplicate detection skipped: it needs a photo folder, not a manifest.")
+            
+            # Only a run that both fixed and checked the rows moves the watermark forward
+            if self.fix_paths_var.get() and self.check_existence_var.get():
+                advance_watermark(conn, self.table_name, self.weeks, self.bbox)
+            
+            # Report the journaling cost next to the phase timings, so it can be compared with unjournaled runs
+            journal_summary = "- Journal: disabled\n"
+            if journal_run_id is not None:
+                journal_entries, journal_bytes = journal_size(conn, journal_run_id)
+                journal_summary = f"- Journal: run {journal_run_id}, {journal_entries} entries ({journal_bytes / 1024:.1f} kB)\n"
+                recorder.metrics["journal_entries"] = journal_entries
+                # A run without changes has nothing to undo; Undo must reach the run before it
+                if journal_entries == 0 and discard_empty_run(conn, journal_run_id):
+                    journal_summary = "- Journal: no changes to record\n"
+            logging.info(f"Phase timings: fixing {fixing_seconds:.2f} s, file check {existence_seconds:.2f} s; "
+                         f"{journal_summary.strip('- ').strip()}")
+            
             # Close the database connection
             conn.close()
             logging.info("Database connection closed.")
+            recorder.metrics["incremental"] = int(incremental)
+            recorder.save()
             
             # Complete the progress bar
             self.update_progress(100, "All operations completed successfully!")
@@ -396,33 +904,47 @@ class EnhancedDataFixingDialog:
                 f"Data fixing operations completed successfully!\n\n"
                 f"- Format fixing updates: {fixing_updates}\n"
                 f"- Missing file updates: {existence_updates}\n"
-                f"- Total updates: {fixing_updates + existence_updates}\n\n"
-                f"Detailed log saved to: {log_filename}"
+                f"- Total updates: {fixing_updates + existence_updates}\n"
+                f"- Timings: fixing {fixing_seconds:.1f} s, file check {existence_seconds:.1f} s\n"
+                + (f"- Duplicate photos: {len(duplicates)} groups ({duplicates_seconds:.1f} s)\n" if duplicates is not None else "")
+                + f"{journal_summary}\n"
+                f"Detailed log saved to: {self.log_filename}"
             )
             
+            # Show the duplicate photos over the data management screen, so they outlive this dialog
+            if duplicates:
+                display_duplicates_gui(self.parent, self.table_name, duplicates)
+            
             # Launch the full report GUI if selected
             if self.launch_report_var.get():
                 logging.info("Launching full report...")
-                self.dialog.destroy()
+                self.close()
                 
+                from full_report import main as full_report_gui
                 full_report_gui(
                     self.db_params['dbname'], 
                     self.db_params['user'], 
                     self.db_params['password'], 
                     self.db_params['host'], 
                     self.db_params['port'], 
-                    self.table_name
+                    self.table_name,
+                    weeks=self.weeks,
+                    bbox=self.bbox
                 )
             
         except Exception as e:
             # Log the error
             logging.error(f"Error: {str(e)}")
+            recorder.save(status="failed")
+            # Changes committed before the failure stay undoable; a run that journaled nothing is dropped
+            if journal_run_id is not None:
+                discard_empty_run(conn, journal_run_id)
             
             # Show error message
             messagebox.showerror(
                 "Error", 
                 f"An error occurred during the operation:\n\n{str(e)}\n\n"
-                f"Please check the log file for details:\n{log_filename}"
+                f"Please check the log file for details:\n{self.log_filename}"
             )
             
             # Update status
@@ -432,32 +954,27 @@ class EnhancedDataFixingDialog:
             # Re-enable the start button
             self.start_button.config(state=tk.NORMAL)
 
-def main(dbname, user, password, host, port, table_name):
+def main(dbname, user, password, host, port, table_name, weeks=None, bbox=None):
     """
     Main function to connect to the database and open the enhanced data fixing GUI.
     """
     try:
         # Log the start of the application
+        setup_logging()
         logging.info(f"Starting Enhanced Data Fixing Tool for table: {table_name}")
         
-        # Create the root window
-        root = tk.Tk()
-        # Show the enhanced data fixing dialog
-        dialog = EnhancedDataFixingDialog(root, dbname, user, password, host, port, table_name)
-        
-        # Start the Tkinter main loop
-        root.mainloop()
+        # Show the enhanced data fixing dialog over the current screen
+        dialog = EnhancedDataFixingDialog(current_screen(), dbname, user, password, host, port, table_name, weeks, bbox)
         
-        logging.info("Application closed.")
+        # Start the Tkinter main loop when the tool is run on its own
+        run()
         
     except Exception as e:
         # Log any uncaught exceptions
         logging.critical(f"Uncaught exception: {str(e)}")
         
         # Show error message
-        if 'root' in locals():
-            messagebox.showerror("Critical Error", f"An unexpected error occurred:\n\n{str(e)}")
-            root.destroy()
+        messagebox.showerror("Critical Error", f"An unexpected error occurred:\n\n{str(e)}")
 
 if __name__ == "__main__":
     main("test_csv", "kamil", "123456", "localhost", "5432", "flop_flop")
\ No newline at end of file
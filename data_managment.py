@@ -1,75 +1,128 @@
-import psycopg2
 import tkinter as tk
-from quick_report import main
-from data_fixing_final import main as data_fixing_main
-from full_report import main as full_report_main
-import csv
-from tkinter import filedialog, messagebox
-
-# Function to export data as CSV
-def export_data_as_csv(dbname, user, password, host, port, table_name):
-    try:
-        conn = psycopg2.connect(
-            dbname=dbname,
-            user=user,
-            password=password,
-            host=host,
-            port=port
-        )
-        cursor = conn.cursor()
-        cursor.execute(f"SELECT * FROM {table_name}")
-        rows = cursor.fetchall()
-        columns = [desc[0] for desc in cursor.description]
-
-        file_path = filedialog.asksaveasfilename(
-            defaultextension=".csv",
-            filetypes=[("CSV Files", "*.csv")]
-        )
-
-        if not file_path:
-            return  # User canceled the save dialog
-
-        with open(file_path, mode='w', newline='', encoding='utf-8') as file:
-            writer = csv.writer(file)
-            writer.writerow(columns)
-            writer.writerows(rows)
-
-        messagebox.showinfo("Success", f"Data exported to {file_path}")
-        conn.close()
-    except Exception as e:
-        messagebox.showerror("Database Error", str(e))
+import importlib
+from table_filters import parse_weeks, parse_area
+from gps_index import area_filter_available
+from app_logging import setup_logging
+from app_shell import session, new_window, show_screen, hide_screen, run
+from tkinter import messagebox, simpledialog
 
-# Function to create the data management GUI
+
+# Screens are imported the first time they are opened, which keeps the application startup fast
+def lazy_main(module_name):
+    def run(*args, **kwargs):
+        return importlib.import_module(module_name).main(*args, **kwargs)
+    return run
+
+main = lazy_main("quick_report")
+data_fixing_main = lazy_main("data_fixing_final")
+full_report_main = lazy_main("full_report")
+quality_rollup_main = lazy_main("quality_rollup")
+optimize_table_main = lazy_main("table_optimization")
+photo_status_main = lazy_main("photo_status")
+archive_week_main = lazy_main("week_partitions")
+gps_index_main = lazy_main("gps_index")
+export_data_main = lazy_main("table_export")
+export_bundle_main = lazy_main("audit_bundle")
+run_history_main = lazy_main("run_history")
+
+# Function to ask for a sample size and open the estimated quick report
+def quick_estimate(dbname, user, password, host, port, table_name, weeks=None, bbox=None):
+    sample_percent = simpledialog.askfloat(
+        "Quick Estimate",
+        "Sample size (% of the table):",
+        initialvalue=1.0, minvalue=0.01, maxvalue=100.0
+    )
+    if not sample_percent:
+        return
+    # Page sampling reads only the sampled pages; row sampling still reads them all
+    fast = messagebox.askyesnocancel(
+        "Quick Estimate",
+        "Sample whole pages (SYSTEM)?\n\n"
+        "Yes: fastest, the ranges shown are approximate.\n"
+        "No: sample single rows (BERNOULLI), true 95% confidence intervals but the whole table is read."
+    )
+    if fast is None:
+        return
+    main(dbname, user, password, host, port, table_name, sample_percent=sample_percent, weeks=weeks, bbox=bbox,
+         sample_method="SYSTEM" if fast else "BERNOULLI")
+
+# Function to show the data management GUI (one cached screen per table)
 def data_management_gui(dbname, user, password, host, port, selected_table):
-    data_window = tk.Tk()
-    data_window.title("Data Management")
+    setup_logging()
+    session["table"] = selected_table
+    show_screen(("data_management", dbname, host, port, selected_table),
+                lambda: build_data_management(dbname, user, password, host, port, selected_table))
+    run()
 
-    # Set the window size
-    data_window.geometry("400x300")
+# Function to create the data management GUI
+def build_data_management(dbname, user, password, host, port, selected_table):
+    data_window = new_window(f"Data Management - {selected_table}", "440x580")
 
-    # Create and place the buttons
-    button_gathering = tk.Button(data_window, text="Quick Report", command= lambda: main(dbname, user, password, host, port, selected_table), width=20, height=2)
-    button_gathering.pack(pady=10)
+    # Week and area filters applied to the reports and the fixing tool
+    filter_frame = tk.LabelFrame(data_window, text="Filter", padx=10, pady=5)
+    filter_frame.pack(fill=tk.X, padx=10, pady=10)
+
+    label_weeks = tk.Label(filter_frame, text="Weeks (comma separated, empty = all):")
+    label_weeks.grid(row=0, column=0, sticky=tk.W)
 
-    button_formatting = tk.Button(data_window, text="Data FIX / TEST", command=lambda: data_fixing_main(dbname, user, password, host, port, selected_table), width=20, height=2)
-    button_formatting.pack(pady=10)
+    entry_weeks = tk.Entry(filter_frame, width=18)
+    entry_weeks.grid(row=0, column=1, padx=(5, 0))
 
-    button_fixing = tk.Button(data_window, text="Full Report", command=lambda: full_report_main(dbname, user, password, host, port, selected_table), width=20, height=2)
-    button_fixing.pack(pady=10)
+    label_area = tk.Label(filter_frame, text="Area (min_x, min_y, max_x, max_y or region):")
+    label_area.grid(row=1, column=0, sticky=tk.W)
 
-    button_export_csv = tk.Button(data_window, text="Export Data as CSV", command=lambda: export_data_as_csv(dbname, user, password, host, port, selected_table), width=20, height=2)
-    button_export_csv.pack(pady=10)
+    entry_area = tk.Entry(filter_frame, width=18)
+    entry_area.grid(row=1, column=1, padx=(5, 0), pady=(5, 0))
 
-    # Function to close the window
-    def close_window():
-        data_window.destroy()
-        exit()
+    # Run a screen with the current filters, or report a filter that cannot be parsed
+    def with_filters(screen):
+        def run_screen():
+            try:
+                session["weeks"] = parse_weeks(entry_weeks.get())
+                session["bbox"] = parse_area(entry_area.get())
+            except ValueError as e:
+                messagebox.showerror("Filter Error", str(e))
+                return
+            # The area filter reads the coordinate columns the GPS index adds
+            if session["bbox"] is not None:
+                db_params = dict(dbname=dbname, user=user, password=password, host=host, port=port)
+                try:
+                    available = area_filter_available(db_params, selected_table)
+                except Exception as e:
+                    messagebox.showerror("Database Error", str(e))
+                    return
+                if not available:
+                    messagebox.showerror("Filter Error", f"The area filter needs the GPS index of {selected_table}.\n\n"
+                                         "Create it with the GPS Index button first, or clear the area.")
+                    return
+            screen(dbname, user, password, host, port, selected_table, weeks=session["weeks"], bbox=session["bbox"])
+        return run_screen
+
+    # Create and place the buttons
+    button_frame = tk.Frame(data_window)
+    button_frame.pack()
 
-    # Close the window when the X icon is clicked
-    data_window.protocol("WM_DELETE_WINDOW", close_window)
+    buttons = [
+        ("Quick Report", with_filters(main)),
+        ("Quick Estimate (Sample)", with_filters(quick_estimate)),
+        ("Data FIX / TEST", with_filters(data_fixing_main)),
+        ("Full Report", with_filters(full_report_main)),
+        ("Quality Rollup", with_filters(quality_rollup_main)),
+        ("Export Data (CSV / Parquet)", with_filters(export_data_main)),
+        ("Export Bundle (with Photos)", with_filters(export_bundle_main)),
+        ("Run History", lambda: run_history_main(dbname, user, password, host, port, selected_table)),
+        ("Optimize Table", lambda: optimize_table_main(dbname, user, password, host, port, selected_table)),
+        ("Status Columns", lambda: photo_status_main(dbname, user, password, host, port, selected_table)),
+        ("Archive Week", lambda: archive_week_main(dbname, user, password, host, port, selected_table)),
+        ("GPS Index", lambda: gps_index_main(dbname, user, password, host, port, selected_table)),
+    ]
+    for index, (text, command) in enumerate(buttons):
+        button = tk.Button(button_frame, text=text, command=command, width=20, height=2)
+        button.grid(row=index // 2, column=index % 2, padx=5, pady=5)
 
-    # Run the GUI
-    data_window.mainloop()
+    # Hide the window when the X icon is clicked; it is shown again as it was when the table is reopened
+    data_window.protocol("WM_DELETE_WINDOW", lambda: hide_screen(data_window))
+    return data_window
 
 # Run the data management GUI when this file is executed
 if __name__ == "__main__":
@@ -0,0 +1,270 @@
+import os
+import csv
+import pickle
+import hashlib
+import logging
+import threading
+import tkinter as tk
+from tkinter import filedialog, messagebox, ttk
+from concurrent.futures import ThreadPoolExecutor
+from table_filters import scope_clause
+
+# List of photo columns compared
+columns_to_check = ["c_pano_av", "syno", "pht_mas_a", "pht_mas_b", "pht_mas_c", "pht_mas_d",
+                    "ch_fer_apr", "c_ouv_ap2", "c_pano_apr", "pho_fer_av", "c_ouv_av_1"]
+
+# Bytes read for the quick hash; files differing in size or first block are never fully hashed
+QUICK_HASH_BYTES = 64 * 1024
+READ_BLOCK_BYTES = 1024 * 1024
+# Upper bound of hashing threads; hashlib releases the GIL while it hashes large buffers
+MAX_HASH_THREADS = 4
+
+# Local cache of file hashes by (path, size, mtime), so unchanged photos are never read twice
+cache_directory = "cache"
+hash_cache_filename = os.path.join(cache_directory, "photo_hashes.pickle")
+
+_lock = threading.Lock()
+_hash_cache = None  # {(path, size, mtime_ns): {"quick": ..., "full": ...}}, loaded on first use
+
+
+def _load_hash_cache():
+    global _hash_cache
+    if _hash_cache is None:
+        try:
+            with open(hash_cache_filename, "rb") as cache_file:
+                _hash_cache = pickle.load(cache_file)
+        except FileNotFoundError:
+            _hash_cache = {}
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable hash cache {hash_cache_filename}: {str(e)}")
+            _hash_cache = {}
+    return _hash_cache
+
+
+def _save_hash_cache():
+    os.makedirs(cache_directory, exist_ok=True)
+    temp_filename = hash_cache_filename + ".tmp"
+    with open(temp_filename, "wb") as cache_file:
+        pickle.dump(_hash_cache, cache_file)
+    os.replace(temp_filename, hash_cache_filename)
+
+
+def quick_hash(full_path):
+    """Hash of the first block of a file (runs in a worker thread)"""
+    with open(full_path, "rb") as photo:
+        return hashlib.blake2b(photo.read(QUICK_HASH_BYTES), digest_size=16).hexdigest()
+
+
+def full_hash(full_path):
+    """SHA-256 of the whole file (runs in a worker thread)"""
+    digest = hashlib.sha256()
+    with open(full_path, "rb") as photo:
+        for block in iter(lambda: photo.read(READ_BLOCK_BYTES), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _safe(hash_function, full_path):
+    try:
+        return hash_function(full_path)
+    except OSError:
+        return None  # Deleted or unreadable since it was listed
+
+
+def safe_quick_hash(full_path):
+    return _safe(quick_hash, full_path)
+
+
+def safe_full_hash(full_path):
+    return _safe(full_hash, full_path)
+
+
+def fetch_photo_references(cursor, table_name, weeks=None, bbox=None):
+    """
+    Return {path: [(id, id_troncon, code, column), ...]} for every photo path of the table,
+    in one scan. Empty values and 'Not Found' markers are left out.
+    """
+    cursor.execute(f"""
+        SELECT id, id_troncon, code, s.col_index, s.path
+        FROM {table_name}
+        CROSS JOIN LATERAL unnest(ARRAY[{', '.join(columns_to_check)}]) WITH ORDINALITY AS s(path, col_index)
+        WHERE s.path IS NOT NULL AND s.path != '' AND s.path NOT ILIKE '%Not Found%'{scope_clause(weeks, bbox)}
+    """)
+    references = {}
+    for row_id, id_troncon, code, col_index, path in cursor.fetchall():
+        references.setdefault(path, []).append((row_id, id_troncon, code, columns_to_check[col_index - 1]))
+    return references
+
+
+def hash_files(full_paths, kind, progress_callback=None, max_workers=MAX_HASH_THREADS):
+    """
+    Return {full path: hash} for the given files, reusing cached hashes of unchanged files and
+    computing the others in a thread pool. kind is "quick" or "full".
+    """
+    hash_function = safe_quick_hash if kind == "quick" else safe_full_hash
+    hashes = {}
+    pending = []
+    with _lock:
+        cache = _load_hash_cache()
+        for full_path, size, mtime in full_paths:
+            cached = cache.get((full_path, size, mtime), {}).get(kind)
+            if cached:
+                hashes[full_path] = cached
+            else:
+                pending.append((full_path, size, mtime))
+    logging.info(f"{kind} hash: {len(hashes)} cached, {len(pending)} to compute")
+
+    if pending:
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hash") as executor:
+            paths = [full_path for full_path, _, _ in pending]
+            for done, value in enumerate(executor.map(hash_function, paths), start=1):
+                if value is not None:
+                    hashes[paths[done - 1]] = value
+                if progress_callback and done % 100 == 0:
+                    progress_callback(done / len(paths) * 100, f"{kind.capitalize()} hashing {done} / {len(paths)} files")
+        with _lock:
+            cache = _load_hash_cache()
+            for full_path, size, mtime in pending:
+                if full_path in hashes:
+                    cache.setdefault((full_path, size, mtime), {})[kind] = hashes[full_path]
+            try:
+                _save_hash_cache()
+            except OSError as e:
+                logging.warning(f"Could not save hash cache: {str(e)}")
+    return hashes
+
+
+def prune_hash_cache():
+    """Drop the cached hashes of files deleted or changed since they were hashed; returns how many"""
+    with _lock:
+        cache = _load_hash_cache()
+        stale = []
+        for key in cache:
+            full_path, size, mtime = key
+            try:
+                stat = os.stat(full_path)
+            except OSError:
+                stale.append(key)
+                continue
+            if (stat.st_size, stat.st_mtime_ns) != (size, mtime):
+                stale.append(key)
+        for key in stale:
+            del cache[key]
+        if stale:
+            try:
+                _save_hash_cache()
+            except OSError as e:
+                logging.warning(f"Could not save hash cache: {str(e)}")
+    return len(stale)
+
+
+def group_candidates(items, key):
+    """Keep the groups of items sharing the same key that have at least two members"""
+    groups = {}
+    for item in items:
+        value = key(item)
+        if value is not None:
+            groups.setdefault(value, []).append(item)
+    return [group for group in groups.values() if len(group) > 1]
+
+
+def find_duplicate_photos(conn, table_name, folder_path, progress_callback=None, weeks=None, bbox=None):
+    """
+    Find rows whose photo columns point to identical content: the same path used more than
+    once, or different files with the same bytes. Files are compared by size first, then by a
+    quick hash of their first block, and only the remaining candidates are fully hashed.
+    Returns a list of {"hash", "size", "references": [(id, id_troncon, code, column, path), ...]}.
+    """
+    with conn.cursor() as cursor:
+        references = fetch_photo_references(cursor, table_name, weeks, bbox)
+
+    # Stat every referenced file once
+    files = []
+    for path in references:
+        full_path = os.path.join(folder_path, path)
+        try:
+            stat = os.stat(full_path)
+        except OSError:
+            continue  # Missing files are the existence check's business
+        files.append((full_path, stat.st_size, stat.st_mtime_ns, path))
+    logging.info(f"Duplicate check: {len(references)} distinct paths, {len(files)} files found")
+
+    # Same size -> same first block -> same content
+    candidates = [file for group in group_candidates(files, lambda file: file[1]) for file in group]
+    quick = hash_files([file[:3] for file in candidates], "quick",
+                       lambda percent, msg: progress_callback(percent * 0.3, msg) if progress_callback else None)
+    candidates = [file for group in group_candidates(candidates, lambda file: (file[1], quick[file[0]]) if file[0] in quick else None)
+                  for file in group]
+    full = hash_files([file[:3] for file in candidates], "full",
+                      lambda percent, msg: progress_callback(30 + percent * 0.7, msg) if progress_callback else None)
+
+    # One group per content; a path that was not hashed is its own content
+    contents = {}
+    for full_path, size, mtime, path in files:
+        content = full.get(full_path) or f"path:{path}"
+        contents.setdefault(content, {"hash": full.get(full_path, ""), "size": size, "paths": []})["paths"].append(path)
+
+    duplicates = []
+    for content in contents.values():
+        group_references = [reference + (path,) for path in content["paths"] for reference in references[path]]
+        if len(group_references) > 1:
+            duplicates.append({"hash": content["hash"], "size": content["size"], "references": group_references})
+    duplicates.sort(key=lambda group: len(group["references"]), reverse=True)
+    pruned = prune_hash_cache()
+    if pruned:
+        logging.info(f"Duplicate check: {pruned} cached hashes of deleted or changed files pruned")
+    logging.info(f"Duplicate check: {len(duplicates)} groups of identical photos, "
+                 f"{sum(len(group['references']) for group in duplicates)} references")
+    return duplicates
+
+
+def display_duplicates_gui(parent, table_name, duplicates):
+    window = tk.Toplevel(parent)
+    window.title(f"Duplicate Photos - {table_name}")
+    window.geometry("900x500")
+
+    tree = ttk.Treeview(window, columns=("id", "id_troncon", "code", "column"), show="tree headings")
+    tree.heading("#0", text="Photo")
+    tree.column("#0", width=400)
+    for name, heading, width in [("id", "ID", 120), ("id_troncon", "ID Tronc", 120),
+                                 ("code", "Code", 100), ("column", "Column", 100)]:
+        tree.heading(name, text=heading)
+        tree.column(name, width=width)
+    scrollbar = tk.Scrollbar(window, command=tree.yview)
+    tree.configure(yscrollcommand=scrollbar.set)
+
+    button_frame = tk.Frame(window)
+    button_frame.pack(side=tk.BOTTOM, fill=tk.X, padx=10, pady=10)
+    save_button = tk.Button(button_frame, text="Save as CSV", command=lambda: save_duplicates(duplicates))
+    save_button.pack(side=tk.LEFT)
+    summary = tk.Label(button_frame, text=f"{len(duplicates)} groups of identical photos")
+    summary.pack(side=tk.RIGHT)
+
+    scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+    tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=(10, 0))
+
+    for group in duplicates:
+        paths = sorted({reference[4] for reference in group["references"]})
+        label = f"{len(group['references'])} uses of {paths[0]}" + (f" (+{len(paths) - 1} identical files)" if len(paths) > 1 else "")
+        parent_item = tree.insert("", tk.END, text=label, open=False)
+        for row_id, id_troncon, code, column, path in group["references"]:
+            tree.insert(parent_item, tk.END, text=path, values=(row_id, id_troncon, code, column))
+
+
+def save_duplicates(duplicates):
+    file_path = filedialog.asksaveasfilename(
+        defaultextension=".csv",
+        filetypes=[("CSV Files", "*.csv")]
+    )
+
+    if not file_path:
+        return  # User canceled the save dialog
+
+    with open(file_path, mode='w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(["group", "sha256", "size", "id", "id_troncon", "code", "column", "path"])
+        for number, group in enumerate(duplicates, start=1):
+            for reference in group["references"]:
+                writer.writerow([number, group["hash"], group["size"]] + list(reference))
+
+    messagebox.showinfo("Success", f"Duplicates saved to {file_path}")
@@ -0,0 +1,181 @@
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import threading
+import time
+
+# inotify event flags (see inotify(7))
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+
+# struct inotify_event { int wd; uint32_t mask; uint32_t cookie; uint32_t len; char name[]; }
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def inotify_available():
+    """Return True if the running system supports inotify (Linux only)"""
+    return os.name == "posix" and os.uname().sysname == "Linux" and ctypes.util.find_library("c") is not None
+
+
+class FolderWatcher:
+    """
+    Watch a photo folder recursively with inotify and report batches of changes.
+
+    on_batch(arrived, removed, removed_dirs) is called from the watcher thread with sets
+    of paths relative to the root (using '/' separators) at most every batch_interval
+    seconds. on_overflow() is called when the kernel queue overflowed and events were
+    lost, so the caller can fall back to a full check.
+    """
+
+    def __init__(self, root_path, on_batch, on_overflow=None, batch_interval=2.0):
+        if not inotify_available():
+            raise OSError("Folder watching requires Linux inotify support.")
+        self.root_path = os.path.abspath(root_path)
+        self.on_batch = on_batch
+        self.on_overflow = on_overflow
+        self.batch_interval = batch_interval
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._fd = None
+        self._watches = {}  # watch descriptor -> directory path relative to root
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._arrived = set()
+        self._removed = set()
+        self._removed_dirs = set()
+
+    def start(self):
+        """Start watching in a background thread"""
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._add_tree("")
+        logging.info(f"Watching {len(self._watches)} folders under {self.root_path}")
+        self._thread = threading.Thread(target=self._run, name="FolderWatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop watching and flush any pending events"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _add_watch(self, relative_dir):
+        full_path = os.path.join(self.root_path, relative_dir)
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(full_path), WATCH_MASK)
+        if wd < 0:
+            logging.warning(f"Cannot watch folder {full_path}: {os.strerror(ctypes.get_errno())}")
+            return
+        self._watches[wd] = relative_dir
+
+    def _add_tree(self, relative_dir, report_files=False):
+        """Watch a directory and all its subdirectories, optionally reporting files already inside"""
+        for dirpath, dirnames, filenames in os.walk(os.path.join(self.root_path, relative_dir)):
+            relative_dirpath = os.path.relpath(dirpath, self.root_path).replace(os.sep, "/")
+            relative_dirpath = "" if relative_dirpath == "." else relative_dirpath
+            self._add_watch(relative_dirpath)
+            if report_files:
+                # Files may have been written before the watch on a new folder was in place
+                for filename in filenames:
+                    self._arrived.add(self._join(relative_dirpath, filename))
+
+    def _remove_tree(self, relative_dir):
+        """Drop the watches of a directory moved out of the root, which would otherwise keep reporting"""
+        for wd, watched_dir in list(self._watches.items()):
+            if watched_dir == relative_dir or watched_dir.startswith(relative_dir + "/"):
+                self._libc.inotify_rm_watch(self._fd, wd)
+                del self._watches[wd]
+
+    @staticmethod
+    def _join(relative_dir, name):
+        return f"{relative_dir}/{name}" if relative_dir else name
+
+    def _run(self):
+        last_flush = time.monotonic()
+        try:
+            while not self._stop_event.is_set():
+                readable, _, _ = select.select([self._fd], [], [], 0.5)
+                if readable:
+                    self._read_events()
+                if time.monotonic() - last_flush >= self.batch_interval:
+                    self._flush()
+                    last_flush = time.monotonic()
+            self._flush()
+        except Exception as e:
+            logging.error(f"Folder watcher stopped: {str(e)}")
+        finally:
+            os.close(self._fd)
+            self._fd = None
+            self._watches.clear()
+
+    def _read_events(self):
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset < len(data):
+            wd, mask, _cookie, name_length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + name_length].rstrip(b"\0"))
+            offset += name_length
+            self._handle_event(wd, mask, name)
+
+    def _handle_event(self, wd, mask, name):
+        if mask & IN_Q_OVERFLOW:
+            logging.warning("Folder watch event queue overflowed, some changes were lost.")
+            if self.on_overflow:
+                try:
+                    self.on_overflow()
+                except Exception as e:
+                    logging.error(f"Error handling folder watch overflow: {str(e)}")
+            return
+        if mask & IN_IGNORED:
+            self._watches.pop(wd, None)
+            return
+        relative_dir = self._watches.get(wd)
+        if relative_dir is None or not name:
+            return
+        relative_path = self._join(relative_dir, name)
+
+        if mask & IN_ISDIR:
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                self._removed_dirs.discard(relative_path)
+                self._add_tree(relative_path, report_files=True)
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                self._removed_dirs.add(relative_path)
+                self._remove_tree(relative_path)
+        elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+            # A file is only complete once it has been closed after writing or moved in
+            self._removed.discard(relative_path)
+            self._arrived.add(relative_path)
+        elif mask & (IN_DELETE | IN_MOVED_FROM):
+            self._arrived.discard(relative_path)
+            self._removed.add(relative_path)
+
+    def _flush(self):
+        if not (self._arrived or self._removed or self._removed_dirs):
+            return
+        arrived, removed, removed_dirs = self._arrived, self._removed, self._removed_dirs
+        self._arrived, self._removed, self._removed_dirs = set(), set(), set()
+        try:
+            self.on_batch(arrived, removed, removed_dirs)
+        except Exception as e:
+            logging.error(f"Error handling folder changes: {str(e)}")
@@ -1,7 +1,14 @@
+import os
 import psycopg2
 import tkinter as tk
-from tkinter import messagebox, scrolledtext, filedialog
-from docx import Document
+from tkinter import messagebox, filedialog, ttk
+from report_cache import cached_report, connection_key
+from report_store import ReportStore, store_path
+from run_history import recorded
+from app_shell import new_window, run
+from report_executor import run_column_checks
+from table_filters import filtered_source
+from photo_status import status_columns_enabled, status_column, status_code_counts, count_with_status, codes_with_status
 
 
 # Example columns list (fill yours later)
@@ -50,85 +57,153 @@ SQL_QUERIES = {
     """
 }
 
-def gather_column_info(cursor, table_name, column_name):
+def spool_ids(cursor, store, column_name, ids_name, query, params=None):
+    # A server-side cursor streams the rows to the store, so they are never all held in memory
+    # (WITH HOLD, because the report connections run in autocommit mode)
+    with cursor.connection.cursor(name=f"full_report_{column_name}_{ids_name}", withhold=True) as ids_cursor:
+        ids_cursor.execute(query, params)
+        store.spool(ids_cursor, column_name, ids_name)
+
+def gather_column_info(cursor, table_name, column_name, store):
     column_info = {}
     # Get counts
     for check_name in ["total_count", "file_not_found_count", "link_not_found_count"]:
         cursor.execute(SQL_QUERIES[check_name].format(col=column_name, table=table_name))
         column_info[check_name] = cursor.fetchone()[0]
+    store.add_counts(column_name, columns_to_check.index(column_name), column_info)
     
-    # Get IDs for "File Not Found"
-    cursor.execute(SQL_QUERIES["file_not_found_ids"].format(col=column_name, table=table_name))
-    column_info["file_not_found_ids"] = cursor.fetchall()
-    
-    # Get IDs for "Link Not Found"
-    cursor.execute(SQL_QUERIES["link_not_found_ids"].format(col=column_name, table=table_name))
-    column_info["link_not_found_ids"] = cursor.fetchall()
-    
-    return column_info
+    # Spool the IDs for "File Not Found" and "Link Not Found"
+    for ids_name in ["file_not_found_ids", "link_not_found_ids"]:
+        spool_ids(cursor, store, column_name, ids_name, SQL_QUERIES[ids_name].format(col=column_name, table=table_name))
 
-def generate_report(conn, table_name):
-    report = {}
+def gather_column_info_from_status(cursor, table_name, column_name, code_counts, store):
+    column_info = {
+        "total_count": sum(code_counts.values()),
+        "file_not_found_count": count_with_status(code_counts, "file_not_found_count"),
+        "link_not_found_count": count_with_status(code_counts, "link_not_found_count"),
+    }
+    store.add_counts(column_name, columns_to_check.index(column_name), column_info)
+    # Fetch the IDs through the status column index
+    for ids_name, check_name in [("file_not_found_ids", "file_not_found_count"), ("link_not_found_ids", "link_not_found_count")]:
+        spool_ids(cursor, store, column_name, ids_name,
+                  f"SELECT id, id_troncon, code FROM {table_name} WHERE {status_column(column_name)} = ANY(%s)",
+                  (codes_with_status(code_counts, check_name),))
+
+def generate_report(conn, table_name, store, db_params=None, weeks=None, bbox=None):
+    # The results are written to the store (report_store.ReportStore) as they arrive
+    # With db_params the per-column queries are spread over a small pool of connections
+    # With weeks only those weeks (partitions) are scanned, with bbox only that area (GPS index)
+    source = filtered_source(table_name, weeks, bbox=bbox)
+    with conn.cursor() as cursor:
+        if status_columns_enabled(cursor, table_name):
+            code_counts = status_code_counts(cursor, source, columns_to_check)
+            for col in columns_to_check:
+                gather_column_info_from_status(cursor, source, col, code_counts[col], store)
+            return
+    if db_params:
+        run_column_checks(db_params, columns_to_check, lambda cursor, col: gather_column_info(cursor, source, col, store))
+        return
     with conn.cursor() as cursor:
         for col in columns_to_check:
-            report[col] = gather_column_info(cursor, table_name, col)
-    return report
-
-def display_report_gui(report):
-    window = tk.Tk()
-    window.title("File and Link Status Report")
-    window.geometry("800x600")
-
-    # Create a scrolled text area
-    text_area = scrolledtext.ScrolledText(window, wrap=tk.WORD, width=95, height=30, font=("Arial", 10))
-    text_area.pack(padx=10, pady=10, fill=tk.BOTH, expand=True)
-
-    # Define tags for formatting
-    text_area.tag_configure("bold", font=("Arial", 10, "bold"))
-    text_area.tag_configure("title", font=("Arial", 12, "bold"))
-    text_area.tag_configure("center", justify="center")
-    text_area.tag_configure("spacing", spacing1=5, spacing3=5)
-
-    # Add a title
-    text_area.insert(tk.END, "FILE AND LINK STATUS REPORT\n\n", ("title", "center", "spacing"))
-    
-    for column, data in report.items():
-        # Add column name (centered and bold)
+            gather_column_info(cursor, source, col, store)
+
+def compute_report_store(conn, table_name, path, db_params=None, weeks=None, bbox=None):
+    """Run the full report into a new store file and return its path"""
+    store = ReportStore.create(path)
+    try:
+        generate_report(conn, table_name, store, db_params, weeks, bbox)
+        store.finish()
+    finally:
+        store.close()
+    return path
+
+def store_columns(path):
+    """The (column, counts) pairs of a finished store"""
+    store = ReportStore.open(path)
+    try:
+        return store.columns()
+    finally:
+        store.close()
+
+# Offending rows listed at a time in the viewer
+VIEW_PAGE_ROWS = 500
+
+def display_report_gui(store, computed_at=None, db_params=None, table_name=None):
+    window = new_window("File and Link Status Report", "800x600")
+
+    title = tk.Label(window, text="FILE AND LINK STATUS REPORT", font=("Arial", 12, "bold"))
+    title.pack(pady=(10, 0))
+
+    # One row per column; the offending IDs are read from the store when a list is opened
+    tree_frame = tk.Frame(window)
+    tree_frame.pack(padx=10, pady=10, fill=tk.BOTH, expand=True)
+    tree = ttk.Treeview(tree_frame, columns=("total", "file_not_found", "link_not_found"), show="tree headings")
+    tree.heading("#0", text="Column")
+    tree.column("#0", width=440)
+    for name, heading in [("total", "Total Count"), ("file_not_found", "'File Not Found'"), ("link_not_found", "'Link Not Found'")]:
+        tree.heading(name, text=heading)
+        tree.column(name, width=100, anchor=tk.E)
+    scrollbar = tk.Scrollbar(tree_frame, command=tree.yview)
+    tree.configure(yscrollcommand=scrollbar.set)
+    scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+    tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+    offsets = {}  # {list item: offending rows shown}, for the lists opened so far
+    for column, data in store.columns():
         full_name = column_full_names.get(column, column)
-        text_area.insert(tk.END, f"Column: {column} ({full_name})\n", ("bold", "center", "spacing"))
-        
-        # Add counts
-        text_area.insert(tk.END, f"  Total Count: {data['total_count']}\n", "spacing")
-        text_area.insert(tk.END, f"  'File Not Found' Count: {data['file_not_found_count']}\n", "spacing")
-        text_area.insert(tk.END, f"  'Link Not Found' Count: {data['link_not_found_count']}\n", "spacing")
-        
-        # Add IDs for "File Not Found"
-        if data['file_not_found_ids']:
-            text_area.insert(tk.END, "\n  IDs with 'File Not Found':\n", "bold")
-            for row in data['file_not_found_ids']:
-                text_area.insert(tk.END, f"ID: {row[0]}, ID Tronc: {row[1]}, Code: {row[2]} \n")
-        
-        # Add IDs for "Link Not Found"
-        if data['link_not_found_ids']:
-            text_area.insert(tk.END, "\n  IDs with 'Link Not Found':\n", "bold")
-            for row in data['link_not_found_ids']:
-                text_area.insert(tk.END, f"ID: {row[0]}, ID Tronc: {row[1]}, Code: {row[2]} \n")
-                
-        text_area.insert(tk.END, "\n" + "-" * 80 + "\n\n", "spacing")
+        column_item = tree.insert("", tk.END, text=f"{column} ({full_name})",
+                                  values=(data['total_count'], data['file_not_found_count'], data['link_not_found_count']))
+        for ids_name, label in [("file_not_found_ids", "IDs with 'File Not Found'"), ("link_not_found_ids", "IDs with 'Link Not Found'")]:
+            count = store.offender_count(column, ids_name)
+            if count:
+                list_item = tree.insert(column_item, tk.END, iid=f"{column}|{ids_name}", text=f"{label} ({count})")
+                tree.insert(list_item, tk.END, text="...")  # Placeholder, so the list can be opened
+
+    def load_page(list_item):
+        column, ids_name = list_item.split("|")
+        offset = offsets.get(list_item, 0)
+        rows = store.offenders(column, ids_name, VIEW_PAGE_ROWS, offset)
+        for row in rows:
+            tree.insert(list_item, tk.END, text=f"ID: {row[0]}, ID Tronc: {row[1]}, Code: {row[2]}")
+        offsets[list_item] = offset + len(rows)
+        if len(rows) == VIEW_PAGE_ROWS:
+            tree.insert(list_item, tk.END, iid=f"more|{list_item}", text="Load more...")
+
+    def on_open(event):
+        item = tree.focus()
+        if "|" in item and not item.startswith("more|") and item not in offsets:
+            tree.delete(*tree.get_children(item))
+            load_page(item)
+
+    def on_select(event):
+        for item in tree.selection():
+            if item.startswith("more|"):
+                tree.delete(item)
+                load_page(item[len("more|"):])
 
-    # Disable editing
-    text_area.config(state=tk.DISABLED)
+    tree.bind("<<TreeviewOpen>>", on_open)
+    tree.bind("<<TreeviewSelect>>", on_select)
 
     # Add a save button
-    save_button = tk.Button(window, text="Save Report", command=lambda: save_report(report))
+    save_button = tk.Button(window, text="Save Report", command=lambda: save_report(store))
     save_button.pack(side=tk.LEFT, padx=10, pady=10)
+    if db_params:
+        def open_preview():
+            from photo_preview import open_photo_preview  # Pillow is loaded only when the pane is opened
+            open_photo_preview(store, db_params, table_name)
+        preview_button = tk.Button(window, text="Photo Preview", command=open_preview)
+        preview_button.pack(side=tk.LEFT, padx=10, pady=10)
+    if computed_at:
+        computed_label = tk.Label(window, text=f"Computed at {computed_at.strftime('%Y-%m-%d %H:%M:%S')}")
+        computed_label.pack(side=tk.RIGHT, padx=10, pady=10)
     
     def close_window():
         window.destroy()
+        store.close()
     window.protocol("WM_DELETE_WINDOW", close_window)  # Handle window close event
-    window.mainloop()
+    run()
 
-def save_report(report):
+def save_report(store):
     # Ask the user for the file path and type
     file_path = filedialog.asksaveasfilename(
         defaultextension=".txt",
@@ -138,41 +213,35 @@ def save_report(report):
     if not file_path:
         return  # User canceled the save dialog
 
-    # Generate the report text
-    report_text = "FILE AND LINK STATUS REPORT\n\n"
-    
-    for column, data in report.items():
-        full_name = column_full_names.get(column, column)
-        report_text += f"Column: {column} ({full_name})\n"
-        report_text += f"  Total Count: {data['total_count']}\n"
-        report_text += f"  'File Not Found' Count: {data['file_not_found_count']}\n"
-        report_text += f"  'Link Not Found' Count: {data['link_not_found_count']}\n"
-        
-        # Add IDs for "File Not Found"
-        if data['file_not_found_ids']:
-            report_text += "\n  IDs with 'File Not Found':\n"
-            for row in data['file_not_found_ids']:
-                report_text += f"ID: {row[0]}, ID Tronc: {row[1]}, Code: {row[2]} \n"
-        
-        # Add IDs for "Link Not Found"
-        if data['link_not_found_ids']:
-            report_text += "\n  IDs with 'Link Not Found':\n"
-            for row in data['link_not_found_ids']:
-                report_text += f"ID: {row[0]}, ID Tronc: {row[1]}, Code: {row[2]} \n"
-                
-        report_text += "\n" + "-" * 80 + "\n\n"
-
-    # Save the report
+    # Save the report, reading the IDs from the store as they are written
     if file_path.endswith(".txt"):
         with open(file_path, "w", encoding="utf-8") as file:
-            file.write(report_text)
+            file.write("FILE AND LINK STATUS REPORT\n\n")
+            for column, data in store.columns():
+                full_name = column_full_names.get(column, column)
+                file.write(f"Column: {column} ({full_name})\n")
+                file.write(f"  Total Count: {data['total_count']}\n")
+                file.write(f"  'File Not Found' Count: {data['file_not_found_count']}\n")
+                file.write(f"  'Link Not Found' Count: {data['link_not_found_count']}\n")
+                
+                # Add IDs for "File Not Found" and "Link Not Found"
+                for ids_name, heading in [("file_not_found_ids", "IDs with 'File Not Found'"), ("link_not_found_ids", "IDs with 'Link Not Found'")]:
+                    first = True
+                    for row in store.iter_offenders(column, ids_name):
+                        if first:
+                            file.write(f"\n  {heading}:\n")
+                            first = False
+                        file.write(f"ID: {row[0]}, ID Tronc: {row[1]}, Code: {row[2]} \n")
+                        
+                file.write("\n" + "-" * 80 + "\n\n")
     elif file_path.endswith(".docx"):
+        from docx import Document  # python-docx is slow to import and only needed here
         doc = Document()
         
         # Add title
         doc.add_heading("FILE AND LINK STATUS REPORT", level=1)
         
-        for column, data in report.items():
+        for column, data in store.columns():
             full_name = column_full_names.get(column, column)
             doc.add_heading(f"Column: {column} ({full_name})", level=2)
             
@@ -182,16 +251,13 @@ def save_report(report):
             p.add_run(f"'File Not Found' Count: {data['file_not_found_count']}\n")
             p.add_run(f"'Link Not Found' Count: {data['link_not_found_count']}\n")
             
-            # Add IDs for "File Not Found"
-            if data['file_not_found_ids']:
-                doc.add_heading("IDs with 'File Not Found':", level=3)
-                for row in data['file_not_found_ids']:
-                    doc.add_paragraph(f"ID: {row[0]}, ID Tronc: {row[1]}, Code: {row[2]}", style='List Bullet')
-            
-            # Add IDs for "Link Not Found"
-            if data['link_not_found_ids']:
-                doc.add_heading("IDs with 'Link Not Found':", level=3)
-                for row in data['link_not_found_ids']:
+            # Add IDs for "File Not Found" and "Link Not Found"
+            for ids_name, heading in [("file_not_found_ids", "IDs with 'File Not Found':"), ("link_not_found_ids", "IDs with 'Link Not Found':")]:
+                first = True
+                for row in store.iter_offenders(column, ids_name):
+                    if first:
+                        doc.add_heading(heading, level=3)
+                        first = False
                     doc.add_paragraph(f"ID: {row[0]}, ID Tronc: {row[1]}, Code: {row[2]}", style='List Bullet')
             
             doc.add_paragraph("-" * 80)
@@ -200,7 +266,7 @@ def save_report(report):
 
     messagebox.showinfo("Success", f"Report saved to {file_path}")
 
-def main(dbname, user, password, host, port, table_name):
+def main(dbname, user, password, host, port, table_name, weeks=None, bbox=None):
     try:
         # Connect to the database
         conn = psycopg2.connect(
@@ -210,11 +276,21 @@ def main(dbname, user, password, host, port, table_name):
             host=host,
             port=port
         )
-        # Generate the report
-        report = generate_report(conn, table_name)
-        # Display the report in a GUI
-        display_report_gui(report)
+        db_params = {'dbname': dbname, 'user': user, 'password': password, 'host': host, 'port': port}
+        # Generate the report into a local store, unless the table is unchanged since last time
+        # Each computation writes a new store file; the cache entry records which one
+        options = tuple(weeks or ()) + (bbox,)
+        path, computed_at = cached_report(
+            conn, "full", table_name,
+            recorded("full_report", db_params, table_name, weeks, bbox,
+                     lambda: compute_report_store(conn, table_name, store_path(connection_key(conn), table_name, options),
+                                                  db_params, weeks, bbox), store_columns),
+            options=options,
+            valid=lambda report: isinstance(report, str) and os.path.exists(report)
+        )
         conn.close()
+        # Display the report in a GUI
+        display_report_gui(ReportStore.open(path), computed_at, db_params, table_name)
     except Exception as e:
         messagebox.showerror("Database Error", str(e))
         return
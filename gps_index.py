@@ -0,0 +1,101 @@
+import psycopg2
+from tkinter import messagebox
+import logging
+
+# Numeric coordinates parsed from cod_gps_x / cod_gps_y (longitude / latitude)
+GPS_X_COLUMN = "gps_x"
+GPS_Y_COLUMN = "gps_y"
+GPS_SOURCE_COLUMNS = {GPS_X_COLUMN: "cod_gps_x", GPS_Y_COLUMN: "cod_gps_y"}
+
+
+def coordinate_expression(column):
+    """SQL expression parsing a TEXT coordinate (decimal point or comma); NULL when it is not a number"""
+    cleaned = f"btrim(replace({column}, ',', '.'))"
+    return f"CASE WHEN {cleaned} ~ '^[-+]?[0-9]+(\\.[0-9]+)?$' THEN {cleaned}::double precision END"
+
+
+def point_expression():
+    """Indexed point of a row, used by bounding box filters"""
+    return f"point({GPS_X_COLUMN}, {GPS_Y_COLUMN})"
+
+
+def gps_columns_enabled(cursor, table_name):
+    """Return True if the table has the numeric coordinate columns"""
+    cursor.execute(
+        """
+        SELECT COUNT(*) FROM pg_attribute
+        WHERE attrelid = to_regclass(%s) AND attname = ANY(%s) AND NOT attisdropped
+        """,
+        (table_name, list(GPS_SOURCE_COLUMNS))
+    )
+    return cursor.fetchone()[0] == len(GPS_SOURCE_COLUMNS)
+
+
+def area_filter_available(db_params, table_name):
+    """Return True if an area filter can run on the table, i.e. its GPS index was created"""
+    conn = psycopg2.connect(**db_params)
+    try:
+        with conn.cursor() as cursor:
+            return gps_columns_enabled(cursor, table_name)
+    finally:
+        conn.close()
+
+
+def enable_gps_index(cursor, table_name):
+    """
+    Add the numeric coordinate columns, kept current by PostgreSQL as generated columns,
+    and a GiST index on their point so bounding box filters read only the matching rows.
+    Core PostgreSQL geometry only, no PostGIS needed.
+    """
+    from table_optimization import index_name
+
+    for column, source in GPS_SOURCE_COLUMNS.items():
+        cursor.execute(
+            f"ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS {column} DOUBLE PRECISION "
+            f"GENERATED ALWAYS AS ({coordinate_expression(source)}) STORED"
+        )
+    cursor.execute(
+        f"CREATE INDEX IF NOT EXISTS {index_name(table_name, 'gps_idx')} "
+        f"ON {table_name} USING gist ({point_expression()})"
+    )
+    cursor.execute(f"ANALYZE {table_name}")
+    logging.info(f"GPS index enabled on {table_name}")
+
+
+def disable_gps_index(cursor, table_name):
+    """Drop the coordinate columns (the index goes with them)"""
+    for column in GPS_SOURCE_COLUMNS:
+        cursor.execute(f"ALTER TABLE {table_name} DROP COLUMN IF EXISTS {column}")
+    logging.info(f"GPS index removed from {table_name}")
+
+
+def main(dbname, user, password, host, port, table_name):
+    try:
+        conn = psycopg2.connect(
+            dbname=dbname,
+            user=user,
+            password=password,
+            host=host,
+            port=port
+        )
+        try:
+            with conn.cursor() as cursor:
+                enabled = gps_columns_enabled(cursor, table_name)
+                if enabled:
+                    if messagebox.askyesno("GPS Index", f"GPS coordinates of {table_name} are indexed.\n\nDrop the index and numeric columns?"):
+                        disable_gps_index(cursor, table_name)
+                        conn.commit()
+                        messagebox.showinfo("Success", "GPS index removed.")
+                elif messagebox.askyesno("GPS Index", f"Parse the GPS coordinates of {table_name} into indexed numeric columns?\n\n"
+                                         "This enables the Area filter."):
+                    enable_gps_index(cursor, table_name)
+                    conn.commit()
+                    messagebox.showinfo("Success", "GPS index enabled.")
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+    except Exception as e:
+        messagebox.showerror("Database Error", str(e))
+        return
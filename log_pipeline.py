@@ -0,0 +1,84 @@
+import logging
+import tkinter as tk
+from collections import deque
+
+# Lines kept in a log widget; older lines are dropped from the top
+MAX_LOG_LINES = 500
+# Milliseconds between two flushes of queued records into the widget
+FLUSH_INTERVAL_MS = 250
+
+
+class QueueLogHandler(logging.Handler):
+    """
+    Handler that only formats records into a bounded queue, from any thread.
+    When the widget falls behind, the oldest pending lines are dropped and counted.
+    """
+
+    def __init__(self, max_pending=MAX_LOG_LINES):
+        logging.Handler.__init__(self)
+        self.pending = deque(maxlen=max_pending)
+        self.received = 0
+
+    def emit(self, record):
+        try:
+            self.pending.append(self.format(record))
+            self.received += 1
+        except Exception:
+            self.handleError(record)
+
+    def drain(self):
+        """Return the queued lines and how many lines were dropped since the last drain"""
+        lines = []
+        while True:
+            try:
+                lines.append(self.pending.popleft())
+            except IndexError:
+                break
+        received, self.received = self.received, 0
+        return lines, max(0, received - len(lines))
+
+
+class TextLogView:
+    """
+    Shows the application log in a Text widget: records are queued by a QueueLogHandler and
+    inserted in batches every FLUSH_INTERVAL_MS, and the widget keeps at most max_lines lines.
+    The full log still goes to the log file. Call close() when the widget goes away.
+    """
+
+    def __init__(self, text_widget, max_lines=MAX_LOG_LINES, level=logging.INFO):
+        self.text_widget = text_widget
+        self.max_lines = max_lines
+        self.handler = QueueLogHandler(max_lines)
+        self.handler.setLevel(level)
+        self.handler.setFormatter(logging.Formatter('%(levelname)s: %(message)s'))
+        logging.getLogger().addHandler(self.handler)
+        self.after_id = self.text_widget.after(FLUSH_INTERVAL_MS, self._tick)
+
+    def _tick(self):
+        self.flush()
+        self.after_id = self.text_widget.after(FLUSH_INTERVAL_MS, self._tick)
+
+    def flush(self):
+        """Insert the queued lines now (Tk thread only), e.g. from a long operation on the Tk thread"""
+        lines, dropped = self.handler.drain()
+        if not lines and not dropped:
+            return
+        if dropped:
+            lines.insert(0, f"... {dropped} log lines skipped (see the log file)")
+        self.text_widget.configure(state='normal')
+        self.text_widget.insert(tk.END, "\n".join(lines) + "\n")
+        excess = int(self.text_widget.index("end-1c").split(".")[0]) - 1 - self.max_lines
+        if excess > 0:
+            self.text_widget.delete("1.0", f"{excess + 1}.0")
+        self.text_widget.configure(state='disabled')
+        self.text_widget.see(tk.END)
+
+    def close(self):
+        """Detach the handler from the root logger and stop flushing"""
+        logging.getLogger().removeHandler(self.handler)
+        if self.after_id is not None:
+            try:
+                self.text_widget.after_cancel(self.after_id)
+            except tk.TclError:
+                pass  # The widget is already destroyed
+            self.after_id = None
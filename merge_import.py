@@ -0,0 +1,100 @@
+import logging
+from table_optimization import index_name
+from week_partitions import is_partitioned, ensure_week_partitions
+
+# Merge modes: when an incoming row replaces an existing row with the same id
+MERGE_MODES = {
+    "upsert": "Upsert on id (incoming rows replace existing ones)",
+    "newest": "Newest date_viste wins",
+}
+
+
+def copy_csv_to_staging(cursor, table_name, csv_file, columns, staging=None):
+    """
+    COPY the CSV (header row skipped, columns in table order) into a fresh unlogged staging table.
+    csv_file is a path or an open file. Returns the name of the staging table.
+    """
+    staging = staging or index_name(table_name, "staging")
+    column_definitions = ", ".join(f"{name} {data_type}" for name, data_type in columns)
+    cursor.execute(f"DROP TABLE IF EXISTS {staging}")
+    cursor.execute(f"CREATE UNLOGGED TABLE {staging} ({column_definitions})")
+    copy_sql = f"COPY {staging} ({', '.join(name for name, _ in columns)}) FROM STDIN WITH (FORMAT csv, HEADER true)"
+    if isinstance(csv_file, str):
+        with open(csv_file, newline='', encoding='utf-8') as csvfile:
+            cursor.copy_expert(copy_sql, csvfile)
+    else:
+        cursor.copy_expert(copy_sql, csv_file)
+    cursor.execute(f"ANALYZE {staging}")
+    return staging
+
+
+def merge_sql(table_name, staging, columns, mode):
+    """
+    One statement merging the staging table into the table on id and returning
+    (staged rows, inserted, updated, rejected). Within the CSV the newest date_viste of an id
+    is kept. Unchanged rows are never rewritten; in 'newest' mode older incoming rows are
+    skipped. Rows without an id cannot be matched and are rejected, not merged.
+    """
+    names = [name for name, _ in columns]
+    assignments = ", ".join(f"{name} = i.{name}" for name in names)
+    replace_condition = f"({', '.join('t.' + name for name in names)}) IS DISTINCT FROM ({', '.join('i.' + name for name in names)})"
+    if mode == "newest":
+        replace_condition += " AND (t.date_viste IS NULL OR i.date_viste > t.date_viste)"
+    return f"""
+    WITH incoming AS (
+        SELECT DISTINCT ON (id) *
+        FROM {staging}
+        WHERE id IS NOT NULL
+        ORDER BY id, date_viste DESC NULLS LAST
+    ),
+    updated AS (
+        UPDATE {table_name} AS t
+        SET {assignments}
+        FROM incoming AS i
+        WHERE t.id = i.id AND {replace_condition}
+        RETURNING t.id
+    ),
+    inserted AS (
+        INSERT INTO {table_name} ({', '.join(names)})
+        SELECT {', '.join('i.' + name for name in names)}
+        FROM incoming AS i
+        WHERE NOT EXISTS (SELECT 1 FROM {table_name} AS t WHERE t.id = i.id)
+        RETURNING id
+    )
+    SELECT (SELECT COUNT(*) FROM {staging}),
+           (SELECT COUNT(*) FROM inserted),
+           (SELECT COUNT(DISTINCT id) FROM updated),
+           (SELECT COUNT(*) FROM {staging} WHERE id IS NULL);
+    """
+
+
+def merge_import(conn, table_name, csv_file, columns, mode="newest", staging=None):
+    """
+    Import a CSV without creating duplicate ids: COPY it into an unlogged staging table, then
+    merge it into the table with a single set-based statement. Concurrent merges into the same
+    table (each with its own staging name) are serialized after their COPY.
+    Returns {"inserted", "updated", "skipped", "rejected"}; skipped rows are unchanged, older or
+    repeated in the CSV, rejected rows have no id.
+    """
+    try:
+        with conn.cursor() as cursor:
+            staging = copy_csv_to_staging(cursor, table_name, csv_file, columns, staging)
+            # Two files carrying the same new id must not both insert it
+            cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (table_name,))
+            if is_partitioned(cursor, table_name):
+                cursor.execute(f"SELECT DISTINCT week FROM {staging}")
+                ensure_week_partitions(cursor, table_name, [row[0] for row in cursor.fetchall()])
+            cursor.execute(merge_sql(table_name, staging, columns, mode))
+            staged, inserted, updated, rejected = cursor.fetchone()
+            cursor.execute(f"DROP TABLE {staging}")
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        logging.error(f"Error merging {csv_file} into {table_name}: {str(e)}")
+        raise e
+    result = {"inserted": inserted, "updated": updated, "skipped": staged - inserted - updated - rejected,
+              "rejected": rejected}
+    logging.info(f"Merged {csv_file} into {table_name}: {result}")
+    if rejected:
+        logging.warning(f"{rejected} rows of {csv_file} have no id and were not imported")
+    return result
@@ -1,12 +1,25 @@
 import tkinter as tk
-from table_creation import create_table_gui
-from selection_gui import select_existing_table
-# Function to create the main GUI after login
+from app_shell import new_window, show_screen, quit_app, run
+
+
+# The next screens are imported when chosen, so the login window opens quickly
+def create_table_gui(dbname, user, password, host, port):
+    from table_creation import create_table_gui
+    create_table_gui(dbname, user, password, host, port)
+
+def select_existing_table(dbname, user, password, host, port):
+    from selection_gui import select_existing_table
+    select_existing_table(dbname, user, password, host, port)
+
+# Function to show the main GUI after login
 def choice_gui(dbname, user, password, host, port):
+    show_screen("choice", lambda: build_choice(dbname, user, password, host, port))
+    run()
+
+# Function to create the main GUI
+def build_choice(dbname, user, password, host, port):
     # Create the main window
-    main_window = tk.Tk()
-    main_window.title("Table Selection")
-    main_window.geometry("300x250")
+    main_window = new_window("Table Selection", "300x250")
 
     # Create and place the buttons
     button_create_table = tk.Button(main_window, text="Create New Table", command=lambda: create_table_gui(dbname, user, password, host, port), width=20, height=2)
@@ -15,10 +28,6 @@ def choice_gui(dbname, user, password, host, port):
     button_select_table = tk.Button(main_window, text="Select Existing Table", command=lambda: select_existing_table(dbname, user, password, host, port), width=20, height=2)
     button_select_table.pack(pady=10)
 
-    def close_window():
-        main_window.destroy()
-        exit()
-    
-    main_window.protocol("WM_DELETE_WINDOW", close_window)
-    # Run the main window
-    main_window.mainloop()
\ No newline at end of file
+    # Closing the main window closes the application
+    main_window.protocol("WM_DELETE_WINDOW", quit_app)
+    return main_window
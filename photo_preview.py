@@ -0,0 +1,235 @@
+import os
+import base64
+import logging
+import psycopg2
+import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import filedialog, messagebox, ttk
+from app_shell import new_window, session
+from full_report import columns_to_check, column_full_names
+from report_store import ReportStore
+from thumbnail_cache import ThumbnailCache, thumbnails_available, THUMBNAIL_SIZE
+
+# Rows listed at a time, read from the report store (a multiple of PAGE_ROWS)
+LIST_PAGE_ROWS = 500
+# Rows whose photo paths are read in one query
+PAGE_ROWS = 50
+# Rows after the selected one whose thumbnails are made ahead of time
+PREFETCH_ROWS = 5
+POLL_INTERVAL_MS = 100
+GRID_COLUMNS = 4
+
+
+def is_photo_path(value):
+    return bool(value) and "not found" not in value.lower()
+
+
+class PhotoPreviewWindow:
+    """Offender rows of a full report next to thumbnails of the selected row's photo columns"""
+
+    def __init__(self, db_params, table_name, store, row_count, folder_path):
+        self.table_name = table_name
+        self.store = store
+        self.row_count = row_count
+        self.rows = []          # Rows listed so far, LIST_PAGE_ROWS more each time the list is extended
+        self.folder_path = folder_path
+        self.pages = {}         # {page: Future of {row id: {column: value}}}, read by the query thread
+        self.shown = None       # Index of the row whose photos are shown
+        self.wanted = None      # Index of the row whose thumbnails were requested
+        self.images = {}        # PhotoImages on screen; Tk drops images nothing references
+        self.poll_job = None
+        self.cache = ThumbnailCache()
+        self.conn = psycopg2.connect(**db_params)
+        # One thread runs the page queries, so a slow query never blocks the window
+        self.query_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="photo-preview")
+
+        self.window = new_window(f"Photo Preview - {table_name}", "1150x650")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+        list_frame = tk.Frame(self.window)
+        list_frame.pack(side=tk.LEFT, fill=tk.Y, padx=10, pady=10)
+        self.tree = ttk.Treeview(list_frame, columns=("id_troncon", "code", "columns"), show="tree headings",
+                                 selectmode="browse")
+        self.tree.heading("#0", text="ID")
+        self.tree.column("#0", width=90)
+        for name, heading, width in [("id_troncon", "ID Tronc", 90), ("code", "Code", 70), ("columns", "Flagged", 120)]:
+            self.tree.heading(name, text=heading)
+            self.tree.column(name, width=width)
+        scrollbar = tk.Scrollbar(list_frame, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(side=tk.LEFT, fill=tk.Y)
+        self.load_rows()
+        self.tree.bind("<<TreeviewSelect>>", self.on_select)
+
+        preview_frame = tk.Frame(self.window)
+        preview_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(0, 10), pady=10)
+        notice = f"{row_count} rows - photos from {folder_path}"
+        if not thumbnails_available():
+            notice += "\nInstall Pillow (pip install pillow) to see thumbnails; only file names are shown."
+        tk.Label(preview_frame, text=notice, justify=tk.LEFT).grid(row=0, column=0, columnspan=GRID_COLUMNS, sticky="w")
+
+        # One cell per photo column, reused for every row; the blank image keeps cells at thumbnail size
+        self.blank = tk.PhotoImage(width=THUMBNAIL_SIZE[0], height=THUMBNAIL_SIZE[1])
+        self.cells = {}
+        for index, column in enumerate(columns_to_check):
+            cell = tk.Frame(preview_frame, bd=1, relief=tk.GROOVE)
+            cell.grid(row=1 + index // GRID_COLUMNS, column=index % GRID_COLUMNS, padx=3, pady=3, sticky="nsew")
+            image_label = tk.Label(cell, image=self.blank, compound=tk.CENTER)
+            image_label.pack()
+            tk.Label(cell, text=column_full_names.get(column, column), font=("Arial", 8, "bold"), wraplength=170).pack()
+            path_label = tk.Label(cell, font=("Arial", 8), wraplength=170)
+            path_label.pack()
+            self.cells[column] = (image_label, path_label)
+
+        if self.rows:
+            self.tree.selection_set("0")
+            self.tree.focus("0")
+
+    def load_rows(self):
+        """List the next page of rows of the report store, with a "Load more..." item while rows remain"""
+        start = len(self.rows)
+        for index, (row_id, id_troncon, code, columns) in enumerate(self.store.offender_rows(start, LIST_PAGE_ROWS), start):
+            self.rows.append((row_id, id_troncon, code, columns))
+            self.tree.insert("", tk.END, iid=str(index), text="(no id)" if row_id is None else row_id,
+                             values=(id_troncon, code, ", ".join(columns)))
+        if len(self.rows) < self.row_count:
+            self.tree.insert("", tk.END, iid="more", text="Load more...")
+        return start
+
+    def read_paths(self, ids):
+        """Return {row id: {column: value}} of the given ids (runs in the query thread)"""
+        try:
+            with self.conn.cursor() as cursor:
+                cursor.execute(f"SELECT id, {', '.join(columns_to_check)} FROM {self.table_name} WHERE id = ANY(%s)", (ids,))
+                return {record[0]: dict(zip(columns_to_check, record[1:])) for record in cursor.fetchall()}
+        finally:
+            self.conn.rollback()  # Ends the read-only transaction, so it never holds locks while idle
+
+    def request_page(self, page):
+        """Start reading the photo paths of one page of rows, once"""
+        if page in self.pages or page * PAGE_ROWS >= len(self.rows):
+            return
+        # Rows without an id cannot be looked up; they are shown as such
+        ids = [row[0] for row in self.rows[page * PAGE_ROWS:(page + 1) * PAGE_ROWS] if row[0] is not None]
+        self.pages[page] = self.query_executor.submit(self.read_paths, ids)
+
+    def row_paths(self, index):
+        """Photo column values of a row, or None while its page is being read"""
+        future = self.pages.get(index // PAGE_ROWS)
+        if future is None or not future.done() or future.exception() is not None:
+            return None
+        return future.result().get(self.rows[index][0], {})
+
+    def full_paths(self, index):
+        values = self.row_paths(index) or {}
+        return [os.path.join(self.folder_path, value) for value in values.values() if is_photo_path(value)]
+
+    def on_select(self, event=None):
+        selection = self.tree.selection()
+        if not selection:
+            return
+        if selection[0] == "more":
+            self.tree.delete("more")
+            start = self.load_rows()
+            if start < len(self.rows):
+                self.tree.selection_set(str(start))
+                self.tree.see(str(start))
+            return
+        self.shown = int(selection[0])
+        # The selected row's page, and the next one before it is reached
+        self.request_page(self.shown // PAGE_ROWS)
+        self.request_page(self.shown // PAGE_ROWS + 1)
+        self.wanted = None
+        if self.poll_job:
+            self.window.after_cancel(self.poll_job)
+        self.images.clear()
+        for image_label, path_label in self.cells.values():
+            image_label.config(image=self.blank, text="")
+        self.refresh()
+
+    def show_message(self, text):
+        for image_label, path_label in self.cells.values():
+            path_label.config(text=text)
+
+    def refresh(self):
+        """
+        Fill the cells of the shown row; polls again while its page is being read or its
+        thumbnails are still being made
+        """
+        self.poll_job = None
+        if self.rows[self.shown][0] is None:
+            self.show_message("(row has no id: its photos cannot be looked up)")
+            return
+        page = self.shown // PAGE_ROWS
+        future = self.pages[page]
+        if not future.done():
+            self.show_message("Loading...")
+            self.poll_job = self.window.after(POLL_INTERVAL_MS, self.refresh)
+            return
+        if future.exception() is not None:
+            del self.pages[page]  # Read again the next time a row of the page is selected
+            logging.error(f"Photo preview query failed: {str(future.exception())}")
+            self.show_message("")
+            messagebox.showerror("Database Error", str(future.exception()), parent=self.window)
+            return
+        if self.wanted != self.shown:
+            # Thumbnails of the shown row first, then of the next rows whose paths are read
+            self.wanted = self.shown
+            next_rows = range(self.shown + 1, min(len(self.rows), self.shown + 1 + PREFETCH_ROWS))
+            self.cache.want(self.full_paths(self.shown),
+                            [full_path for index in next_rows for full_path in self.full_paths(index)])
+        waiting = False
+        values = self.row_paths(self.shown)
+        for column, (image_label, path_label) in self.cells.items():
+            value = values.get(column)
+            path_label.config(text=value or "(empty)")
+            if not is_photo_path(value) or column in self.images:
+                continue
+            full_path = os.path.join(self.folder_path, value)
+            if not thumbnails_available():
+                image_label.config(text="" if os.path.exists(full_path) else "Missing file")
+                continue
+            png = self.cache.cached(full_path)
+            if png is not None:
+                self.images[column] = tk.PhotoImage(data=base64.b64encode(png))
+                image_label.config(image=self.images[column], text="")
+            elif self.cache.failed(full_path):
+                image_label.config(text="No preview" if os.path.exists(full_path) else "Missing file")
+            else:
+                image_label.config(text="Loading...")
+                waiting = True
+        if waiting:
+            self.poll_job = self.window.after(POLL_INTERVAL_MS, self.refresh)
+
+    def close(self):
+        if self.poll_job:
+            self.window.after_cancel(self.poll_job)
+        self.cache.close()
+        for future in self.pages.values():
+            future.cancel()
+        # Closed by the query thread once a running query is done
+        self.query_executor.submit(self.conn.close)
+        self.query_executor.shutdown(wait=False)
+        self.store.close()
+        self.window.destroy()
+
+
+def open_photo_preview(store, db_params, table_name):
+    # The preview reads the store over its own connection, so it outlives the report window
+    preview_store = ReportStore.open(store.path)
+    row_count = preview_store.offender_row_count()
+    if not row_count:
+        preview_store.close()
+        messagebox.showinfo("Photo Preview", "The report lists no rows with missing photos.")
+        return
+    folder_path = session.get("photo_folder") or filedialog.askdirectory(title="Select Folder Containing Image Files")
+    if not folder_path:
+        preview_store.close()
+        return
+    session["photo_folder"] = folder_path
+    try:
+        PhotoPreviewWindow(db_params, table_name, preview_store, row_count, folder_path)
+    except Exception as e:
+        preview_store.close()
+        messagebox.showerror("Database Error", str(e))
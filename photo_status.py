@@ -0,0 +1,175 @@
+import psycopg2
+from tkinter import messagebox
+import logging
+
+# List of photo columns carrying a materialized status
+columns_to_check = ["c_pano_av", "syno", "pht_mas_a", "pht_mas_b", "pht_mas_c", "pht_mas_d",
+                    "ch_fer_apr", "c_ouv_ap2", "c_pano_apr", "pho_fer_av", "c_ouv_av_1"]
+
+# Status bits, one per report check. A value can match several checks (e.g. a .jpg under files/),
+# so the status is a bitmask; NULL values keep a NULL status, matching COUNT({col}) in the reports.
+# The predicates are those of the quick report queries: a 'File Not Found: <path>' value counts as
+# the bare marker did, under no slash and missing extension only.
+STATUS_BITS = {
+    "no_slash_and_not_empty": (1, "({col} NOT LIKE '%/%' OR {col} ILIKE 'File Not Found%') AND {col} != ''"),
+    "empty_or_null_count": (2, "{col} = ''"),
+    "jpg_count": (4, "{col} ILIKE '%.jpg' AND {col} NOT ILIKE 'File Not Found%'"),
+    "jpeg_count": (8, "{col} ILIKE '%.jpeg' AND {col} NOT ILIKE 'File Not Found%'"),
+    "other_extension_count": (16, "{col} NOT ILIKE '%.jpg' AND {col} NOT ILIKE '%.jpeg' AND {col} ILIKE '%.%' "
+                                  "AND {col} NOT ILIKE 'File Not Found%'"),
+    "missing_extension_rows": (32, "({col} NOT ILIKE '%.%' OR {col} ILIKE 'File Not Found%') AND {col} != ''"),
+    "double_extension_rows": (64, "{col} ~* '\\.(jpg|jpeg|png|gif|heic|tiff|bmp)\\.(jpg|jpeg|png|gif|heic|tiff|bmp)$' "
+                                  "AND {col} NOT ILIKE 'File Not Found%'"),
+    "wrong_path_count": (128, "{col} ILIKE 'files/%'"),
+    "file_not_found_count": (256, "{col} ILIKE 'File Not Found%'"),
+    "link_not_found_count": (512, "{col} ILIKE 'Link Not Found%'"),
+}
+
+
+def status_column(column):
+    """Name of the status column materialized for a photo column"""
+    return f"{column}_st"
+
+
+def status_expression(value):
+    """SQL expression computing the status bitmask of a value (a column or NEW.column)"""
+    bits = " + ".join(
+        f"CASE WHEN {predicate.format(col=value)} THEN {bit} ELSE 0 END"
+        for bit, predicate in STATUS_BITS.values()
+    )
+    return f"CASE WHEN {value} IS NULL THEN NULL ELSE ({bits})::smallint END"
+
+
+def status_columns_enabled(cursor, table_name):
+    """Return True if every photo column of the table has its status column"""
+    cursor.execute(
+        """
+        SELECT COUNT(*) FROM pg_attribute
+        WHERE attrelid = to_regclass(%s) AND attname = ANY(%s) AND NOT attisdropped
+        """,
+        (table_name, [status_column(col) for col in columns_to_check])
+    )
+    return cursor.fetchone()[0] == len(columns_to_check)
+
+
+def enable_status_columns(conn, table_name):
+    """
+    Add the status columns, the trigger keeping them current, fill them and index them.
+    Safe to run again to rebuild everything.
+    """
+    from table_optimization import index_name
+
+    try:
+        with conn.cursor() as cursor:
+            for col in columns_to_check:
+                cursor.execute(f"ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS {status_column(col)} SMALLINT")
+
+            assignments = "\n".join(
+                f"    NEW.{status_column(col)} := {status_expression('NEW.' + col)};"
+                for col in columns_to_check
+            )
+            cursor.execute(f"""
+            CREATE OR REPLACE FUNCTION {table_name}_photo_status() RETURNS trigger AS $$
+            BEGIN
+            {assignments}
+                RETURN NEW;
+            END;
+            $$ LANGUAGE plpgsql;
+            """)
+            cursor.execute(f"DROP TRIGGER IF EXISTS {table_name}_photo_status ON {table_name}")
+            cursor.execute(f"""
+            CREATE TRIGGER {table_name}_photo_status
+            BEFORE INSERT OR UPDATE OF {', '.join(columns_to_check)} ON {table_name}
+            FOR EACH ROW EXECUTE FUNCTION {table_name}_photo_status()
+            """)
+
+            # Fill the existing rows in one pass
+            cursor.execute(f"UPDATE {table_name} SET " + ", ".join(
+                f"{status_column(col)} = {status_expression(col)}" for col in columns_to_check
+            ))
+            logging.info(f"Status columns filled for {cursor.rowcount} rows of {table_name}")
+
+            for col in columns_to_check:
+                cursor.execute(
+                    f"CREATE INDEX IF NOT EXISTS {index_name(table_name, status_column(col) + '_idx')} "
+                    f"ON {table_name} ({status_column(col)})"
+                )
+            cursor.execute(f"ANALYZE {table_name}")
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        logging.error(f"Error enabling status columns: {str(e)}")
+        raise e
+
+
+def disable_status_columns(conn, table_name):
+    """Drop the trigger and the status columns (their indexes go with them)"""
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {table_name}_photo_status ON {table_name}")
+            cursor.execute(f"DROP FUNCTION IF EXISTS {table_name}_photo_status()")
+            for col in columns_to_check:
+                cursor.execute(f"ALTER TABLE {table_name} DROP COLUMN IF EXISTS {status_column(col)}")
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        logging.error(f"Error disabling status columns: {str(e)}")
+        raise e
+
+
+def status_code_counts(cursor, table_name, columns):
+    """
+    Count rows per status code for every column in a single scan.
+    Returns {column: {status code: row count}}.
+    """
+    cursor.execute(f"""
+        SELECT s.col_index, s.status, COUNT(*)
+        FROM {table_name}
+        CROSS JOIN LATERAL unnest(ARRAY[{', '.join(status_column(col) for col in columns)}])
+            WITH ORDINALITY AS s(status, col_index)
+        WHERE s.status IS NOT NULL
+        GROUP BY s.col_index, s.status;
+    """)
+    counts = {col: {} for col in columns}
+    for col_index, status, count in cursor.fetchall():
+        counts[columns[col_index - 1]][status] = count
+    return counts
+
+
+def count_with_status(code_counts, check_name):
+    """Number of rows whose status has the bit of the given check set"""
+    bit = STATUS_BITS[check_name][0]
+    return sum(count for code, count in code_counts.items() if code & bit)
+
+
+def codes_with_status(code_counts, check_name):
+    """Status codes present in the column that have the bit of the given check set"""
+    bit = STATUS_BITS[check_name][0]
+    return [code for code in code_counts if code & bit]
+
+
+def main(dbname, user, password, host, port, table_name):
+    try:
+        conn = psycopg2.connect(
+            dbname=dbname,
+            user=user,
+            password=password,
+            host=host,
+            port=port
+        )
+        with conn.cursor() as cursor:
+            enabled = status_columns_enabled(cursor, table_name)
+        conn.rollback()
+
+        if enabled:
+            if messagebox.askyesno("Status Columns", f"Status columns are enabled on {table_name}.\n\nDisable and drop them?"):
+                disable_status_columns(conn, table_name)
+                messagebox.showinfo("Success", "Status columns removed.")
+        elif messagebox.askyesno("Status Columns", f"Add status columns maintained by a trigger to {table_name}?\n\n"
+                                 "Reports become much faster, imports and fixes slightly slower."):
+            enable_status_columns(conn, table_name)
+            messagebox.showinfo("Success", "Status columns enabled.")
+        conn.close()
+    except Exception as e:
+        messagebox.showerror("Database Error", str(e))
+        return
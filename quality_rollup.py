@@ -0,0 +1,288 @@
+import psycopg2
+import tkinter as tk
+from tkinter import messagebox, filedialog, ttk
+from datetime import datetime
+import csv
+import logging
+from report_cache import cached_report
+from app_shell import new_window, run
+from table_filters import filtered_source
+from table_optimization import index_name
+
+# List of photo columns rolled up
+columns_to_check = ["c_pano_av", "syno", "pht_mas_a", "pht_mas_b", "pht_mas_c", "pht_mas_d",
+                    "ch_fer_apr", "c_ouv_ap2", "c_pano_apr", "pho_fer_av", "c_ouv_av_1"]
+
+# Checks counted per photo column: name and SQL condition on {col}
+ROLLUP_CHECKS = {
+    "missing": "{col} IS NULL OR {col} = ''",
+    "broken": "{col} ILIKE 'File Not Found%' OR {col} ILIKE 'Link Not Found%' "
+              "OR ({col} != '' AND ({col} NOT LIKE '%/%' OR {col} NOT ILIKE '%.%'))",
+}
+
+# GROUPING(week, nom_techni) of each grouping set
+DETAIL_LEVEL = 0      # one week, one technician
+WEEK_LEVEL = 1        # one week, all technicians
+TECHNICIAN_LEVEL = 2  # one technician, all weeks
+TOTAL_LEVEL = 3       # everything
+
+
+def rollup_view_name(table_name):
+    """Name of the optional materialized view holding the rollup of a table"""
+    return index_name(table_name, "quality_rollup")
+
+
+def rollup_query(source):
+    """
+    Single scan computing row counts and per-column check counts for every (week, technician),
+    every week, every technician and the whole table, using GROUPING SETS.
+    NULL weeks and technicians are grouped with empty ones, so the keys are never NULL.
+    """
+    aggregates = ",\n".join(
+        f"COUNT(*) FILTER (WHERE {condition.format(col=col)}) AS {col}_{check}"
+        for col in columns_to_check
+        for check, condition in ROLLUP_CHECKS.items()
+    )
+    return f"""
+    SELECT GROUPING(week, nom_techni) AS grouping_level,
+           COALESCE(week, '') AS week,
+           COALESCE(nom_techni, '') AS nom_techni,
+           COUNT(*) AS row_count,
+           {aggregates}
+    FROM (
+        SELECT COALESCE(week, '') AS week, COALESCE(nom_techni, '') AS nom_techni, {', '.join(columns_to_check)}
+        FROM {source}
+    ) AS s
+    GROUP BY GROUPING SETS ((week, nom_techni), (week), (nom_techni), ())
+    """
+
+
+def rows_to_report(cursor):
+    """Turn the fetched rollup rows into a list of dicts"""
+    names = [desc[0] for desc in cursor.description]
+    report = []
+    for values in cursor.fetchall():
+        row = dict(zip(names, values))
+        report.append({
+            "level": row["grouping_level"],
+            "week": row["week"],
+            "technician": row["nom_techni"],
+            "rows": row["row_count"],
+            "columns": {col: {check: row[f"{col}_{check}"] for check in ROLLUP_CHECKS} for col in columns_to_check},
+        })
+    report.sort(key=lambda item: (item["level"], item["week"], item["technician"]))
+    return report
+
+
+def rollup_view_refreshed_at(cursor, table_name):
+    """Return the last refresh time of the materialized view, or None if it does not exist"""
+    cursor.execute("SELECT obj_description(to_regclass(%s), 'pg_class')", (rollup_view_name(table_name),))
+    row = cursor.fetchone()
+    if row is None or row[0] is None:
+        return None
+    return datetime.strptime(row[0].replace("refreshed at ", ""), "%Y-%m-%d %H:%M:%S")
+
+
+def generate_rollup(conn, table_name, weeks=None, bbox=None):
+    """Compute the rollup with one scan of the table (only the given weeks and area when filtered)"""
+    with conn.cursor() as cursor:
+        cursor.execute(rollup_query(filtered_source(table_name, weeks, bbox=bbox)))
+        return rows_to_report(cursor)
+
+
+def read_rollup_view(conn, table_name):
+    """Read the rollup from the materialized view, or return None if the view does not exist"""
+    with conn.cursor() as cursor:
+        refreshed_at = rollup_view_refreshed_at(cursor, table_name)
+        if refreshed_at is None:
+            return None
+        cursor.execute(f"SELECT * FROM {rollup_view_name(table_name)}")
+        return rows_to_report(cursor), refreshed_at
+
+
+def refresh_rollup_view(conn, table_name):
+    """
+    Create the materialized view, or refresh it concurrently so the rollup stays readable
+    during the refresh (this needs the unique index on the grouping keys).
+    """
+    view = rollup_view_name(table_name)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT to_regclass(%s)", (view,))
+            if cursor.fetchone()[0] is None:
+                cursor.execute(f"CREATE MATERIALIZED VIEW {view} AS {rollup_query(table_name)}")
+                cursor.execute(f"CREATE UNIQUE INDEX {index_name(view, 'key')} ON {view} (grouping_level, week, nom_techni)")
+            else:
+                cursor.execute(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view}")
+            cursor.execute(f"COMMENT ON MATERIALIZED VIEW {view} IS 'refreshed at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}'")
+        conn.commit()
+        logging.info(f"Quality rollup view {view} refreshed")
+    except Exception as e:
+        conn.rollback()
+        logging.error(f"Error refreshing quality rollup view: {str(e)}")
+        raise e
+
+
+def drop_rollup_view(conn, table_name):
+    """Drop the materialized view; the rollup is then computed from the table again"""
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP MATERIALIZED VIEW IF EXISTS {rollup_view_name(table_name)}")
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        logging.error(f"Error dropping quality rollup view: {str(e)}")
+        raise e
+
+
+def load_rollup(conn, table_name, weeks=None, bbox=None):
+    """
+    Return (report, description of where it came from). The materialized view is used when it
+    exists and no filter is set; otherwise the table is scanned (cached until it changes).
+    """
+    if not weeks and not bbox:
+        from_view = read_rollup_view(conn, table_name)
+        if from_view:
+            report, refreshed_at = from_view
+            return report, f"From materialized view refreshed at {refreshed_at.strftime('%Y-%m-%d %H:%M:%S')}"
+    report, computed_at = cached_report(
+        conn, "rollup", table_name,
+        lambda: generate_rollup(conn, table_name, weeks, bbox),
+        options=tuple(weeks or ()) + (bbox,)
+    )
+    return report, f"Computed at {computed_at.strftime('%Y-%m-%d %H:%M:%S')}"
+
+
+def summarize(item):
+    """Total missing and broken photos of a rollup row, and the column with the most broken photos"""
+    missing = sum(counts["missing"] for counts in item["columns"].values())
+    broken = sum(counts["broken"] for counts in item["columns"].values())
+    worst = max(columns_to_check, key=lambda col: item["columns"][col]["broken"])
+    return missing, broken, worst if item["columns"][worst]["broken"] else ""
+
+
+def display_rollup_gui(report, source_label, db_params, table_name, weeks=None, bbox=None):
+    window = new_window(f"Quality Rollup - {table_name}", "850x550")
+
+    tree = ttk.Treeview(window, columns=("rows", "missing", "broken", "worst"), show="tree headings")
+    tree.heading("#0", text="Week / Technician")
+    tree.column("#0", width=300)
+    for name, heading, width in [("rows", "Rows", 90), ("missing", "Missing photos", 120),
+                                 ("broken", "Broken photos", 120), ("worst", "Most broken column", 160)]:
+        tree.heading(name, text=heading)
+        tree.column(name, width=width, anchor=tk.W if name == "worst" else tk.E)
+    scrollbar = tk.Scrollbar(window, command=tree.yview)
+    tree.configure(yscrollcommand=scrollbar.set)
+
+    button_frame = tk.Frame(window)
+    button_frame.pack(side=tk.BOTTOM, fill=tk.X, padx=10, pady=10)
+    source_var = tk.StringVar(master=window, value=source_label)
+    source_label_widget = tk.Label(button_frame, textvariable=source_var)
+    source_label_widget.pack(side=tk.RIGHT)
+
+    scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+    tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=(10, 0))
+
+    current = {"report": report}
+
+    def fill_tree():
+        tree.delete(*tree.get_children())
+        by_week = tree.insert("", tk.END, text="By week", open=True)
+        by_technician = tree.insert("", tk.END, text="By technician (all weeks)", open=False)
+        week_nodes = {}
+        for item in current["report"]:
+            values = (item["rows"],) + summarize(item)
+            if item["level"] == TOTAL_LEVEL:
+                tree.insert("", 0, text="All rows", values=values)
+            elif item["level"] == WEEK_LEVEL:
+                week_nodes[item["week"]] = tree.insert(by_week, tk.END, text=item["week"] or "(no week)", values=values)
+            elif item["level"] == TECHNICIAN_LEVEL:
+                tree.insert(by_technician, tk.END, text=item["technician"] or "(no technician)", values=values)
+        for item in current["report"]:
+            if item["level"] == DETAIL_LEVEL:
+                tree.insert(week_nodes[item["week"]], tk.END, text=item["technician"] or "(no technician)",
+                            values=(item["rows"],) + summarize(item))
+
+    def refresh_view():
+        try:
+            conn = psycopg2.connect(**db_params)
+            try:
+                refresh_rollup_view(conn, table_name)
+                current["report"], label = load_rollup(conn, table_name, weeks, bbox)
+            finally:
+                conn.close()
+        except Exception as e:
+            messagebox.showerror("Database Error", str(e))
+            return
+        source_var.set(label)
+        fill_tree()
+
+    def drop_view():
+        if not messagebox.askyesno("Drop View", "Drop the materialized view? The rollup will be computed from the table."):
+            return
+        try:
+            conn = psycopg2.connect(**db_params)
+            try:
+                drop_rollup_view(conn, table_name)
+                current["report"], label = load_rollup(conn, table_name, weeks, bbox)
+            finally:
+                conn.close()
+        except Exception as e:
+            messagebox.showerror("Database Error", str(e))
+            return
+        source_var.set(label)
+        fill_tree()
+
+    save_button = tk.Button(button_frame, text="Save as CSV", command=lambda: save_rollup(current["report"]))
+    save_button.pack(side=tk.LEFT)
+    refresh_button = tk.Button(button_frame, text="Create / Refresh View", command=refresh_view)
+    refresh_button.pack(side=tk.LEFT, padx=10)
+    drop_button = tk.Button(button_frame, text="Drop View", command=drop_view)
+    drop_button.pack(side=tk.LEFT)
+
+    fill_tree()
+
+    def close_window():
+        window.destroy()
+
+    window.protocol("WM_DELETE_WINDOW", close_window)  # Handle window close event
+    run()
+
+
+def save_rollup(report):
+    file_path = filedialog.asksaveasfilename(
+        defaultextension=".csv",
+        filetypes=[("CSV Files", "*.csv")]
+    )
+
+    if not file_path:
+        return  # User canceled the save dialog
+
+    level_names = {DETAIL_LEVEL: "week+technician", WEEK_LEVEL: "week", TECHNICIAN_LEVEL: "technician", TOTAL_LEVEL: "total"}
+    with open(file_path, mode='w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(["level", "week", "nom_techni", "rows"] +
+                        [f"{col}_{check}" for col in columns_to_check for check in ROLLUP_CHECKS])
+        for item in report:
+            writer.writerow([level_names[item["level"]], item["week"], item["technician"], item["rows"]] +
+                            [item["columns"][col][check] for col in columns_to_check for check in ROLLUP_CHECKS])
+
+    messagebox.showinfo("Success", f"Rollup saved to {file_path}")
+
+
+def main(dbname, user, password, host, port, table_name, weeks=None, bbox=None):
+    try:
+        conn = psycopg2.connect(
+            dbname=dbname,
+            user=user,
+            password=password,
+            host=host,
+            port=port
+        )
+        db_params = {'dbname': dbname, 'user': user, 'password': password, 'host': host, 'port': port}
+        report, source_label = load_rollup(conn, table_name, weeks, bbox)
+        conn.close()
+        display_rollup_gui(report, source_label, db_params, table_name, weeks, bbox)
+    except Exception as e:
+        messagebox.showerror("Database Error", str(e))
+        return
@@ -1,7 +1,13 @@
 import psycopg2
 import tkinter as tk
 from tkinter import messagebox, scrolledtext, filedialog
-from docx import Document
+import math
+from report_cache import cached_report
+from run_history import recorded
+from app_shell import new_window, run
+from report_executor import run_column_checks
+from table_filters import filtered_source
+from photo_status import status_columns_enabled, status_code_counts, count_with_status
 
 
 #columns list 
@@ -23,70 +29,156 @@ column_full_names = {
     
 
 }
-# Full SQL Queries Dictionary
-SQL_QUERIES = {
-    "no_slash_and_not_empty": """
-        SELECT COUNT({col})
-        FROM {table}
-        WHERE {col} NOT LIKE '%/%' AND {col} != '' AND {col} IS NOT NULL;
-    """,
-    "empty_or_null_count": """
-        SELECT COUNT({col})
-        FROM {table}
-        WHERE {col} = '' OR {col} IS NULL;
-    """,
-    "jpg_count": """
-        SELECT COUNT({col})
-        FROM {table}
-        WHERE {col} ILIKE '%.jpg';
-    """,
-    "jpeg_count": """
-        SELECT COUNT({col})
-        FROM {table}
-        WHERE {col} ILIKE '%.jpeg';
-    """,
-    "other_extension_count": """
-        SELECT COUNT({col})
-        FROM {table}
-        WHERE {col} NOT ILIKE '%.jpg'
+# Report checks: the condition a value must meet to be counted (NULL values never are)
+# A value marked 'File Not Found: <path>' counts as the bare marker did: no slash, no extension
+CHECK_CONDITIONS = {
+    "no_slash_and_not_empty": "({col} NOT LIKE '%/%' OR {col} ILIKE 'File Not Found%') AND {col} != ''",
+    "empty_or_null_count": "{col} = '' OR {col} IS NULL",
+    "jpg_count": "{col} ILIKE '%.jpg' AND {col} NOT ILIKE 'File Not Found%'",
+    "jpeg_count": "{col} ILIKE '%.jpeg' AND {col} NOT ILIKE 'File Not Found%'",
+    "other_extension_count": """{col} NOT ILIKE '%.jpg'
           AND {col} NOT ILIKE '%.jpeg'
-          AND {col} ILIKE '%.%';
-    """,
-    "missing_extension_rows": """
-        SELECT count({col})
-        FROM {table}
-        WHERE {col} NOT ILIKE '%.%' AND {col} != '';
-    """,
-    "double_extension_rows": """
-        SELECT count({col})
-        FROM {table}
-        WHERE {col} ~* '\\.(jpg|jpeg|png|gif|heic|tiff|bmp)\\.(jpg|jpeg|png|gif|heic|tiff|bmp)$';
-    """,
-    "wrong_path_count": """
-        SELECT COUNT({col})
-        FROM {table}
-        WHERE {col} ILIKE 'files/%';
+          AND {col} ILIKE '%.%'
+          AND {col} NOT ILIKE 'File Not Found%'""",
+    "missing_extension_rows": "({col} NOT ILIKE '%.%' OR {col} ILIKE 'File Not Found%') AND {col} != ''",
+    "double_extension_rows": """{col} ~* '\\.(jpg|jpeg|png|gif|heic|tiff|bmp)\\.(jpg|jpeg|png|gif|heic|tiff|bmp)$'
+          AND {col} NOT ILIKE 'File Not Found%'""",
+    "wrong_path_count": "{col} ILIKE 'files/%'",
+}
+
+# Full SQL Queries Dictionary: one count per check (benchmarked by table_optimization)
+SQL_QUERIES = {
+    check_name: f"""
+        SELECT COUNT({{col}})
+        FROM {{table}}
+        WHERE {condition};
     """
+    for check_name, condition in CHECK_CONDITIONS.items()
 }
 
+# Report lines: label and the SQL_QUERIES key holding the figure
+REPORT_LINES = [
+    ("Row count missing slash & not empty", "no_slash_and_not_empty"),
+    ("Row count Empty or NULL", "empty_or_null_count"),
+    (".jpg count", "jpg_count"),
+    (".jpeg count", "jpeg_count"),
+    ("Other extension count", "other_extension_count"),
+    ("Missing extension row count", "missing_extension_rows"),
+    ("Double extension count", "double_extension_rows"),
+    ("Wrong path (files/%) count", "wrong_path_count"),
+]
+
+# z-score of the 95% confidence interval shown next to sampled figures
+CONFIDENCE_Z = 1.96
+# Row sampling: its Wilson intervals are true confidence intervals (SYSTEM samples whole pages)
+SAMPLE_METHOD = "BERNOULLI"
+
+def check_counts(columns):
+    """Aggregates counting every check of every column, in column then CHECK_CONDITIONS order"""
+    return [f"COUNT({col}) FILTER (WHERE {condition.format(col=col)})"
+            for col in columns for condition in CHECK_CONDITIONS.values()]
+
+def gather_report_info(cursor, source, columns):
+    """Count every check of the columns in a single scan of source; returns (row count, report)"""
+    cursor.execute(f"SELECT COUNT(*), {', '.join(check_counts(columns))} FROM {source}")
+    row = cursor.fetchone()
+    counts = iter(row[1:])
+    report = {col: {check_name: next(counts) for check_name in CHECK_CONDITIONS} for col in columns}
+    return row[0], report
+
 def gather_column_info(cursor, table_name, column_name):
-    column_info = {}
-    for check_name, query in SQL_QUERIES.items():
-        cursor.execute(query.format(col=column_name, table=table_name))
-        column_info[check_name] = cursor.fetchone()[0]  # Always fetch a single value
-    return column_info
+    return gather_report_info(cursor, table_name, [column_name])[1][column_name]
 
-def generate_report(conn, table_name):
+def generate_report(conn, table_name, db_params=None, weeks=None, sample_clause="", bbox=None):
+    # With db_params the per-column scans are spread over a small pool of connections
+    # With weeks only those weeks (partitions) are scanned, with bbox only that area (GPS index)
+    # sample_clause is a TABLESAMPLE clause
     report = {}
+    source = filtered_source(table_name, weeks, sample_clause, bbox)
     with conn.cursor() as cursor:
-        for col in columns_to_check:
-            report[col] = gather_column_info(cursor, table_name, col)
-    return report
+        # Cheap grouped counts over the status columns when they are maintained
+        if status_columns_enabled(cursor, table_name):
+            code_counts = status_code_counts(cursor, source, columns_to_check)
+            for col in columns_to_check:
+                report[col] = {check_name: count_with_status(code_counts[col], check_name) for check_name in SQL_QUERIES}
+            return report
+    # A sample is read once for all columns; the whole table may be split by column over the pool
+    if db_params and not sample_clause:
+        return run_column_checks(db_params, columns_to_check, lambda cursor, col: gather_column_info(cursor, source, col))
+    with conn.cursor() as cursor:
+        return gather_report_info(cursor, source, columns_to_check)[1]
 
-def display_report_gui(report):
-    window = tk.Tk()
-    window.title("Column Status Report")
-    window.geometry("700x500")
+def wilson_interval(hits, sample_size, z=CONFIDENCE_Z):
+    """Wilson score interval for a proportion observed in a sample"""
+    if sample_size == 0:
+        return 0.0, 0.0
+    p = hits / sample_size
+    denominator = 1 + z * z / sample_size
+    center = (p + z * z / (2 * sample_size)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / sample_size + z * z / (4 * sample_size * sample_size)) / denominator
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+def generate_sampled_report(conn, table_name, sample_percent, method=SAMPLE_METHOD, seed=42, weeks=None, bbox=None):
+    """
+    Estimate the report over a TABLESAMPLE of the table and scale the counts to the whole table.
+    Each column also gets 95% confidence intervals. BERNOULLI samples single rows and gives
+    honest intervals, but it still reads every page. SYSTEM samples whole pages and is the
+    fastest, but its intervals are optimistic when similar rows are stored together, so they
+    are only shown as approximate ranges.
+    The sample is scanned once: its size and every check are counted by the same query.
+    Returns (report, sample_info).
+    """
+    sample_clause = f"TABLESAMPLE {method} ({sample_percent}) REPEATABLE ({seed})"
+    source = filtered_source(table_name, weeks, sample_clause, bbox)
+    with conn.cursor() as cursor:
+        if status_columns_enabled(cursor, table_name):
+            cursor.execute(f"SELECT COUNT(*) FROM {source}")
+            sample_rows = cursor.fetchone()[0]
+            sampled = generate_report(conn, table_name, weeks=weeks, sample_clause=sample_clause, bbox=bbox)
+        else:
+            sample_rows, sampled = gather_report_info(cursor, source, columns_to_check)
+        cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)", (table_name,))
+        estimated_rows = cursor.fetchone()[0]
+        if weeks or bbox or not estimated_rows or estimated_rows < 0:
+            # Filtered or never analyzed: extrapolate from the sample itself
+            estimated_rows = round(sample_rows * 100 / sample_percent)
+
+    report = {}
+    for col, data in sampled.items():
+        report[col] = {}
+        intervals = {}
+        for check_name, hits in data.items():
+            low, high = wilson_interval(hits, sample_rows)
+            report[col][check_name] = round(hits / sample_rows * estimated_rows) if sample_rows else 0
+            intervals[check_name] = (round(low * estimated_rows), round(high * estimated_rows))
+        report[col]["confidence_intervals"] = intervals
+    sample_info = {
+        "percent": sample_percent,
+        "method": method,
+        "sample_rows": sample_rows,
+        "estimated_rows": estimated_rows,
+    }
+    return report, sample_info
+
+def format_figure(data, check_name, sample_info=None):
+    """Format a report figure, with its confidence interval when it was estimated from a sample"""
+    intervals = data.get("confidence_intervals")
+    if not intervals:
+        return f"{data[check_name]}"
+    low, high = intervals[check_name]
+    if sample_info and sample_info["method"] != "BERNOULLI":
+        return f"~{data[check_name]} (approx. range {low} - {high})"
+    return f"~{data[check_name]} (95% CI {low} - {high})"
+
+def describe_sample(sample_info):
+    description = (f"Estimated from a {sample_info['percent']}% {sample_info['method']} sample: "
+                   f"{sample_info['sample_rows']} of ~{sample_info['estimated_rows']} rows\n")
+    if sample_info["method"] != "BERNOULLI":
+        description += "Whole pages were sampled: the ranges are approximate, not confidence intervals\n"
+    return description + "\n"
+
+def display_report_gui(report, sample_info=None, computed_at=None):
+    window = new_window("Column Status Report", "700x500")
 
     # Create a scrolled text area
     text_area = scrolledtext.ScrolledText(window, wrap=tk.WORD, width=90, height=25, font=("Arial", 10))
@@ -97,35 +189,35 @@ def display_report_gui(report):
     text_area.tag_configure("center", justify="center")
     text_area.tag_configure("spacing", spacing1=10, spacing3=10)  # Add spacing before and after lines
 
-    report_text = ""
+    if sample_info:
+        text_area.insert(tk.END, describe_sample(sample_info), ("bold", "spacing"))
+
     for column, data in report.items():
         # Add column name (centered and bold)
         full_name = column_full_names.get(column, column)  # Get the full name, or use the abbreviation if not found
         text_area.insert(tk.END, f"Column: {column} ({full_name})\n", ("bold", "center", "spacing"))
         
         # Add column data
-        text_area.insert(tk.END, f"  Row count missing slash & not empty: {data['no_slash_and_not_empty']}\n", "spacing")
-        text_area.insert(tk.END, f"  Row count Empty or NULL: {data['empty_or_null_count']}\n", "spacing")
-        text_area.insert(tk.END, f"  .jpg count: {data['jpg_count']}\n", "spacing")
-        text_area.insert(tk.END, f"  .jpeg count: {data['jpeg_count']}\n", "spacing")
-        text_area.insert(tk.END, f"  Other extension count: {data['other_extension_count']}\n", "spacing")
-        text_area.insert(tk.END, f"  Missing extension row count: {data['missing_extension_rows']}\n", "spacing")
-        text_area.insert(tk.END, f"  Double extension count: {data['double_extension_rows']}\n", "spacing")
-        text_area.insert(tk.END, f"  Wrong path (files/%) count: {data['wrong_path_count']}\n\n", "spacing")
+        for label, check_name in REPORT_LINES:
+            text_area.insert(tk.END, f"  {label}: {format_figure(data, check_name, sample_info)}\n", "spacing")
+        text_area.insert(tk.END, "\n", "spacing")
 
     # Disable editing
     text_area.config(state=tk.DISABLED)
 
     # Add a save button
-    save_button = tk.Button(window, text="Save Report", command=lambda: save_report(report))
+    save_button = tk.Button(window, text="Save Report", command=lambda: save_report(report, sample_info))
     save_button.pack(side=tk.LEFT, padx=10, pady=10)
+    if computed_at:
+        computed_label = tk.Label(window, text=f"Computed at {computed_at.strftime('%Y-%m-%d %H:%M:%S')}")
+        computed_label.pack(side=tk.RIGHT, padx=10, pady=10)
     def close_window():
         window.destroy()
 
     window.protocol("WM_DELETE_WINDOW", close_window)  # Handle window close event
-    window.mainloop()
+    run()
 
-def save_report(report):
+def save_report(report, sample_info=None):
     # Ask the user for the file path and type
     file_path = filedialog.asksaveasfilename(
         defaultextension=".txt",
@@ -136,31 +228,28 @@ def save_report(report):
         return  # User canceled the save dialog
 
     # Generate the report text
-    report_text = ""
+    report_text = describe_sample(sample_info) if sample_info else ""
     for column, data in report.items():
         full_name = column_full_names.get(column, column)  # Get the full name, or use the abbreviation if not found
         report_text += f"Column: {column} ({full_name})\n"
-        report_text += f"  Row count missing slash & not empty: {data['no_slash_and_not_empty']}\n"
-        report_text += f"  Row count Empty or NULL: {data['empty_or_null_count']}\n"
-        report_text += f"  .jpg count: {data['jpg_count']}\n"
-        report_text += f"  .jpeg count: {data['jpeg_count']}\n"
-        report_text += f"  Other extension count: {data['other_extension_count']}\n"
-        report_text += f"  Missing extension row count: {data['missing_extension_rows']}\n"
-        report_text += f"  Double extension count: {data['double_extension_rows']}\n"
-        report_text += f"  Wrong path (files/%) count: {data['wrong_path_count']}\n\n"
+        for label, check_name in REPORT_LINES:
+            report_text += f"  {label}: {format_figure(data, check_name, sample_info)}\n"
+        report_text += "\n"
 
     # Save the report
     if file_path.endswith(".txt"):
         with open(file_path, "w", encoding="utf-8") as file:
             file.write(report_text)
     elif file_path.endswith(".docx"):
+        from docx import Document  # python-docx is slow to import and only needed here
         doc = Document()
         doc.add_paragraph(report_text)
         doc.save(file_path)
 
     messagebox.showinfo("Success", f"Report saved to {file_path}")
 
-def main(dbname, user, password, host, port, table_name):
+def main(dbname, user, password, host, port, table_name, sample_percent=None, weeks=None, bbox=None,
+         sample_method=SAMPLE_METHOD):
     
     try:
         # Connect to the database
@@ -171,10 +260,25 @@ def main(dbname, user, password, host, port, table_name):
             host=host,
             port=port
         )
-        # Generate the report
-        report = generate_report(conn, table_name)
+        db_params = {'dbname': dbname, 'user': user, 'password': password, 'host': host, 'port': port}
+        # Generate the report (estimated from a sample if requested), unless the table is unchanged since last time
+        if sample_percent:
+            (report, sample_info), computed_at = cached_report(
+                conn, "quick_sample", table_name,
+                lambda: generate_sampled_report(conn, table_name, sample_percent, method=sample_method, weeks=weeks, bbox=bbox),
+                options=(sample_percent, sample_method) + tuple(weeks or ()) + (bbox,)
+            )
+        else:
+            sample_info = None
+            report, computed_at = cached_report(
+                conn, "quick", table_name,
+                recorded("quick_report", db_params, table_name, weeks, bbox,
+                         lambda: generate_report(conn, table_name, db_params=db_params, weeks=weeks, bbox=bbox),
+                         lambda report: report.items()),
+                options=tuple(weeks or ()) + (bbox,)
+            )
         # Display the report in a GUI
-        display_report_gui(report)
+        display_report_gui(report, sample_info, computed_at)
         conn.close()
     except Exception as e:
         messagebox.showerror("Database Error", str(e))
@@ -0,0 +1,103 @@
+import os
+import pickle
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+# Local, bounded cache of computed reports
+cache_directory = "cache"
+cache_filename = os.path.join(cache_directory, "report_cache.pickle")
+MAX_ENTRIES = 32
+
+_lock = threading.Lock()
+_state = None  # {"entries": OrderedDict, "versions": dict}, loaded on first use
+
+
+def _load():
+    global _state
+    if _state is None:
+        try:
+            with open(cache_filename, "rb") as cache_file:
+                _state = pickle.load(cache_file)
+        except FileNotFoundError:
+            _state = {"entries": OrderedDict(), "versions": {}}
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable report cache {cache_filename}: {str(e)}")
+            _state = {"entries": OrderedDict(), "versions": {}}
+    return _state
+
+
+def _save():
+    os.makedirs(cache_directory, exist_ok=True)
+    temp_filename = cache_filename + ".tmp"
+    with open(temp_filename, "wb") as cache_file:
+        pickle.dump(_state, cache_file)
+    os.replace(temp_filename, cache_filename)
+
+
+def connection_key(conn):
+    """Identify the database of a connection (without the password)"""
+    params = conn.get_dsn_parameters()
+    return params.get("host"), params.get("port"), params.get("dbname")
+
+
+def note_table_changed(conn, table_name):
+    """
+    Bump the local change counter of a table. Called after every fixing run and import,
+    because pg_stat_user_tables counters are only published some time after a commit.
+    """
+    with _lock:
+        state = _load()
+        version_key = (connection_key(conn), table_name)
+        state["versions"][version_key] = state["versions"].get(version_key, 0) + 1
+        _save()
+
+
+def change_signature(conn, table_name):
+    """Cheap signature that changes whenever rows of the table are inserted, updated or deleted"""
+    with conn.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT SUM(n_tup_ins), SUM(n_tup_upd), SUM(n_tup_del), SUM(pg_relation_size(relid))
+            FROM pg_stat_user_tables
+            WHERE relid = to_regclass(%s)
+               OR relid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = to_regclass(%s))
+            """,
+            (table_name, table_name)
+        )
+        row = cursor.fetchone()  # Partitioned tables only have statistics on their partitions
+    with _lock:
+        version = _load()["versions"].get((connection_key(conn), table_name), 0)
+    return (tuple(row) if row else None, version)
+
+
+def cached_report(conn, kind, table_name, compute, options=(), valid=None):
+    """
+    Return (report, computed_at) for the table, computing it only when the table changed
+    since the cached copy was made. options distinguishes variants such as sample sizes.
+    valid(report) can reject a cached report whose data is kept elsewhere and is gone.
+    """
+    key = (connection_key(conn), kind, table_name, tuple(options))
+    signature = change_signature(conn, table_name)
+    with _lock:
+        entries = _load()["entries"]
+        entry = entries.get(key)
+        if entry and entry["signature"] == signature and (valid is None or valid(entry["report"])):
+            entries.move_to_end(key)
+            logging.info(f"Using cached {kind} report for {table_name} computed at {entry['computed_at']}")
+            return entry["report"], entry["computed_at"]
+
+    report = compute()
+    computed_at = datetime.now()
+    with _lock:
+        entries = _load()["entries"]
+        entries[key] = {"signature": signature, "report": report, "computed_at": computed_at}
+        entries.move_to_end(key)
+        while len(entries) > MAX_ENTRIES:
+            entries.popitem(last=False)
+        try:
+            _save()
+        except OSError as e:
+            logging.warning(f"Could not save report cache: {str(e)}")
+    return report, computed_at
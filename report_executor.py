@@ -0,0 +1,39 @@
+import psycopg2
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Upper bound of connections opened for one report, so the server is not overloaded
+MAX_REPORT_CONNECTIONS = 4
+
+
+def run_column_checks(db_params, columns, gather, max_workers=MAX_REPORT_CONNECTIONS):
+    """
+    Run gather(cursor, column) for every column concurrently over a small pool of connections.
+    Each worker thread opens its own read-only connection once and reuses it for the columns
+    it picks up. Returns {column: result} in the order of columns.
+    """
+    local = threading.local()
+    connections = []
+    connections_lock = threading.Lock()
+
+    def worker(column):
+        conn = getattr(local, "conn", None)
+        if conn is None:
+            conn = psycopg2.connect(**db_params)
+            conn.set_session(readonly=True, autocommit=True)
+            local.conn = conn
+            with connections_lock:
+                connections.append(conn)
+        with conn.cursor() as cursor:
+            return gather(cursor, column)
+
+    workers = max(1, min(max_workers, len(columns)))
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="report") as executor:
+            results = list(executor.map(worker, columns))
+    finally:
+        for conn in connections:
+            conn.close()
+    logging.info(f"Ran checks for {len(columns)} columns over {len(connections)} connections")
+    return dict(zip(columns, results))
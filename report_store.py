@@ -0,0 +1,204 @@
+import os
+import glob
+import sqlite3
+import uuid
+import hashlib
+import threading
+
+# Full reports are spooled to SQLite files here; the newest MAX_STORES are kept
+store_directory = os.path.join("cache", "reports")
+MAX_STORES = 32
+# Offending rows inserted at a time
+SPOOL_BATCH_ROWS = 5000
+
+OFFENDER_KINDS = {"file_not_found_ids": "file", "link_not_found_ids": "link"}
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS columns (
+        name TEXT PRIMARY KEY,
+        position INTEGER,
+        total_count INTEGER,
+        file_not_found_count INTEGER,
+        link_not_found_count INTEGER
+    );
+    CREATE TABLE IF NOT EXISTS offenders (
+        column_name TEXT,
+        kind TEXT,
+        id,
+        id_troncon,
+        code
+    );
+    CREATE INDEX IF NOT EXISTS offenders_column_idx ON offenders (column_name, kind);
+    CREATE INDEX IF NOT EXISTS offenders_id_idx ON offenders (id);
+"""
+
+
+def store_path(*key):
+    """
+    New file for a store of a report key (connection, table, options, ...). Every computation
+    gets its own file, so a store still open in a viewer is never replaced (Windows refuses that).
+    """
+    digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()[:20]
+    return os.path.join(store_directory, f"full_{digest}_{uuid.uuid4().hex[:12]}.sqlite")
+
+
+def store_key(path):
+    """The key part of a store file name, shared by every computation of the same report"""
+    return os.path.basename(path).rsplit("_", 1)[0]
+
+
+def prune_stores(keep=MAX_STORES, current=None):
+    """Delete the stores superseded by current (same key), then the oldest beyond the newest keep"""
+    paths = sorted(glob.glob(os.path.join(store_directory, "*.sqlite")), key=os.path.getmtime, reverse=True)
+    superseded = [path for path in paths if current and store_key(path) == store_key(current)
+                  and os.path.basename(path) != os.path.basename(current)]
+    kept = [path for path in paths if path not in superseded]
+    for path in superseded + kept[keep:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass  # Still open on Windows, removed next time
+
+
+class ReportStore:
+    """
+    Results of a full report in a local SQLite file: the counts of every column and the
+    offending (id, id_troncon, code) rows, written in batches as they stream from PostgreSQL
+    and read back page by page, so neither side holds every offending row in memory.
+    Writes may come from several report threads; they share one connection behind a lock.
+    """
+
+    def __init__(self, path, create=False):
+        self.path = path
+        if create:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = path + ".tmp"
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            self.conn = sqlite3.connect(temp_path, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode = OFF")
+            self.conn.execute("PRAGMA synchronous = OFF")
+            self.conn.executescript(SCHEMA)
+        else:
+            self.conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.rows_numbered = False
+
+    @classmethod
+    def create(cls, path):
+        """Start a new store, written to a temporary file until finish()"""
+        return cls(path, create=True)
+
+    @classmethod
+    def open(cls, path):
+        return cls(path)
+
+    def add_counts(self, column, position, counts):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO columns VALUES (?, ?, ?, ?, ?)",
+                (column, position, counts["total_count"], counts["file_not_found_count"], counts["link_not_found_count"])
+            )
+
+    def add_offenders(self, column, ids_name, rows):
+        with self.lock:
+            self.conn.executemany(
+                "INSERT INTO offenders VALUES (?, ?, ?, ?, ?)",
+                [(column, OFFENDER_KINDS[ids_name]) + tuple(row) for row in rows]
+            )
+
+    def spool(self, cursor, column, ids_name):
+        """Copy the rows of an executed cursor into the store, a batch at a time"""
+        while True:
+            rows = cursor.fetchmany(SPOOL_BATCH_ROWS)
+            if not rows:
+                break
+            self.add_offenders(column, ids_name, rows)
+
+    def finish(self):
+        """Commit and move the finished store in place, then drop the stores it supersedes and the oldest"""
+        with self.lock:
+            self.conn.commit()
+            self.conn.close()
+        os.replace(self.path + ".tmp", self.path)
+        prune_stores(current=self.path)
+        self.conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+        self.rows_numbered = False
+
+    def close(self):
+        self.conn.close()
+
+    def columns(self):
+        """Return [(column, {count name: value})] in report order"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT name, total_count, file_not_found_count, link_not_found_count FROM columns ORDER BY position"
+            ).fetchall()
+        return [(name, {"total_count": total, "file_not_found_count": files, "link_not_found_count": links})
+                for name, total, files, links in rows]
+
+    def offender_count(self, column, ids_name):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM offenders WHERE column_name = ? AND kind = ?", (column, OFFENDER_KINDS[ids_name])
+            ).fetchone()[0]
+
+    def offenders(self, column, ids_name, limit=-1, offset=0):
+        """Return a page of (id, id_troncon, code) rows of a column"""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT id, id_troncon, code FROM offenders WHERE column_name = ? AND kind = ? ORDER BY rowid LIMIT ? OFFSET ?",
+                (column, OFFENDER_KINDS[ids_name], limit, offset)
+            ).fetchall()
+
+    def iter_offenders(self, column, ids_name, page_rows=SPOOL_BATCH_ROWS):
+        """Yield every (id, id_troncon, code) row of a column, reading a page at a time"""
+        last_rowid = 0
+        while True:
+            with self.lock:
+                rows = self.conn.execute(
+                    "SELECT rowid, id, id_troncon, code FROM offenders WHERE column_name = ? AND kind = ? AND rowid > ? "
+                    "ORDER BY rowid LIMIT ?",
+                    (column, OFFENDER_KINDS[ids_name], last_rowid, page_rows)
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield row[1:]
+            last_rowid = rows[-1][0]
+
+    def _number_offender_rows(self):
+        """
+        Number the distinct offending rows in report order, once, in a temporary table of this
+        connection (the store itself is read-only). Rows are told apart by (id, id_troncon,
+        code), so rows without an id stay separate. Called with the lock held.
+        """
+        if self.rows_numbered:
+            return
+        self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS offender_rows (number INTEGER PRIMARY KEY, id, id_troncon, code, columns TEXT)")
+        self.conn.execute(
+            """
+            INSERT INTO temp.offender_rows (id, id_troncon, code, columns)
+            SELECT o.id, o.id_troncon, o.code, group_concat(DISTINCT o.column_name)
+            FROM offenders o JOIN columns c ON c.name = o.column_name
+            GROUP BY o.id, o.id_troncon, o.code
+            ORDER BY MIN(c.position), MIN(o.rowid)
+            """
+        )
+        self.rows_numbered = True
+
+    def offender_row_count(self):
+        """Number of distinct offending rows, over every column"""
+        with self.lock:
+            self._number_offender_rows()
+            return self.conn.execute("SELECT COUNT(*) FROM temp.offender_rows").fetchone()[0]
+
+    def offender_rows(self, start=0, limit=SPOOL_BATCH_ROWS):
+        """Return a page of (id, id_troncon, code, [flagged columns]) offending rows in report order, from position start"""
+        with self.lock:
+            self._number_offender_rows()
+            rows = self.conn.execute(
+                "SELECT id, id_troncon, code, columns FROM temp.offender_rows WHERE number > ? ORDER BY number LIMIT ?",
+                (start, limit)
+            ).fetchall()
+        return [(row_id, id_troncon, code, columns.split(",")) for row_id, id_troncon, code, columns in rows]
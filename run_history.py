@@ -0,0 +1,307 @@
+import os
+import time
+import logging
+import sqlite3
+from contextlib import closing, contextmanager
+from datetime import datetime
+import tkinter as tk
+from tkinter import ttk
+from app_logging import log_directory
+from app_shell import new_window, run
+from photo_status import columns_to_check
+
+# Structured metrics of every fixing, preview and report run, kept across sessions
+history_filename = os.path.join(log_directory, "run_history.sqlite")
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS runs (
+        id INTEGER PRIMARY KEY,
+        kind TEXT,
+        started_at TEXT,
+        seconds REAL,
+        database TEXT,
+        table_name TEXT,
+        weeks TEXT,
+        area TEXT,
+        status TEXT
+    );
+    CREATE TABLE IF NOT EXISTS run_metrics (run_id INTEGER, name TEXT, value REAL);
+    CREATE TABLE IF NOT EXISTS column_metrics (run_id INTEGER, column_name TEXT, name TEXT, value REAL);
+    CREATE TABLE IF NOT EXISTS phases (run_id INTEGER, name TEXT, seconds REAL);
+    CREATE INDEX IF NOT EXISTS runs_table_idx ON runs (table_name, started_at);
+    CREATE INDEX IF NOT EXISTS run_metrics_run_idx ON run_metrics (run_id);
+    CREATE INDEX IF NOT EXISTS column_metrics_run_idx ON column_metrics (run_id, name);
+    CREATE INDEX IF NOT EXISTS phases_run_idx ON phases (run_id);
+"""
+
+RUN_KINDS = ["fix", "test", "quick_report", "full_report"]
+# Run metrics shown as columns of the trend screen
+RUN_METRIC_COLUMNS = [("rows_updated", "Rows updated"), ("missing_files", "Missing files"), ("duplicate_groups", "Duplicates")]
+CHART_HEIGHT = 220
+CHART_MARGIN = 45
+
+
+def connect():
+    os.makedirs(log_directory, exist_ok=True)
+    conn = sqlite3.connect(history_filename, timeout=10)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+class RunRecorder:
+    """
+    Collects the metrics of one run: run-level values (rows updated, missing files...),
+    per-column counts and phase durations, saved as one history entry by save().
+    """
+
+    def __init__(self, kind, db_params, table_name, weeks=None, bbox=None):
+        self.kind = kind
+        self.database = f"{db_params['dbname']}@{db_params['host']}:{db_params['port']}" if db_params else ""
+        self.table_name = table_name
+        self.weeks = ",".join(weeks or [])
+        self.area = ",".join(str(value) for value in bbox) if bbox else ""
+        self.started_at = datetime.now()
+        self.start = time.perf_counter()
+        self.metrics = {}
+        self.column_metrics = {}  # {column: {metric: value}}
+        self.phases = {}
+
+    @contextmanager
+    def phase(self, name):
+        """Time a phase of the run; a phase entered several times adds up"""
+        phase_start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - phase_start
+
+    def add_column_metrics(self, column, values):
+        self.column_metrics.setdefault(column, {}).update(values)
+
+    def save(self, status="ok"):
+        """Write the run to the history; returns its id. The history never makes a run fail."""
+        try:
+            with closing(connect()) as conn, conn:
+                cursor = conn.execute(
+                    "INSERT INTO runs (kind, started_at, seconds, database, table_name, weeks, area, status) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (self.kind, self.started_at.isoformat(timespec="seconds"), time.perf_counter() - self.start,
+                     self.database, self.table_name, self.weeks, self.area, status)
+                )
+                run_id = cursor.lastrowid
+                conn.executemany("INSERT INTO run_metrics VALUES (?, ?, ?)",
+                                 [(run_id, name, value) for name, value in self.metrics.items() if value is not None])
+                conn.executemany("INSERT INTO column_metrics VALUES (?, ?, ?, ?)",
+                                 [(run_id, column, name, value) for column, values in self.column_metrics.items()
+                                  for name, value in values.items() if isinstance(value, (int, float))])
+                conn.executemany("INSERT INTO phases VALUES (?, ?, ?)",
+                                 [(run_id, name, seconds) for name, seconds in self.phases.items()])
+            return run_id
+        except sqlite3.Error as e:
+            logging.warning(f"Could not record the run in {history_filename}: {str(e)}")
+            return None
+
+
+def recorded(kind, db_params, table_name, weeks, bbox, compute, columns_of):
+    """
+    Wrap a report computation so every computed report is also recorded in the history.
+    columns_of(result) returns the (column, {count name: value}) pairs of the report.
+    """
+    def compute_and_record():
+        recorder = RunRecorder(kind, db_params, table_name, weeks, bbox)
+        with recorder.phase("report"):
+            result = compute()
+        for column, counts in columns_of(result):
+            recorder.add_column_metrics(column, counts)
+        recorder.save()
+        return result
+    return compute_and_record
+
+
+def history_tables():
+    with closing(connect()) as conn:
+        return [row[0] for row in conn.execute("SELECT DISTINCT table_name FROM runs ORDER BY table_name")]
+
+
+def list_runs(table_name=None, kind=None, limit=500):
+    """Return the latest runs, oldest first, as dicts with their metrics and phases"""
+    conditions = []
+    params = []
+    if table_name:
+        conditions.append("table_name = ?")
+        params.append(table_name)
+    if kind:
+        conditions.append("kind = ?")
+        params.append(kind)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    with closing(connect()) as conn:
+        rows = conn.execute(
+            f"SELECT id, kind, started_at, seconds, table_name, weeks, area, status FROM runs {where} "
+            f"ORDER BY started_at DESC, id DESC LIMIT ?",
+            params + [limit]
+        ).fetchall()
+        runs = [{"id": run_id, "kind": kind, "started_at": started_at, "seconds": seconds, "table": table,
+                 "weeks": weeks, "area": area, "status": status, "metrics": {}, "phases": {}}
+                for run_id, kind, started_at, seconds, table, weeks, area, status in reversed(rows)]
+        if not runs:
+            return runs
+        by_id = {entry["id"]: entry for entry in runs}
+        placeholders = ", ".join("?" * len(by_id))
+        for run_id, name, value in conn.execute(
+                f"SELECT run_id, name, value FROM run_metrics WHERE run_id IN ({placeholders})", list(by_id)):
+            by_id[run_id]["metrics"][name] = value
+        for run_id, name, seconds in conn.execute(
+                f"SELECT run_id, name, seconds FROM phases WHERE run_id IN ({placeholders})", list(by_id)):
+            by_id[run_id]["phases"][name] = seconds
+    return runs
+
+
+def column_metric_names(run_ids):
+    if not run_ids:
+        return []
+    with closing(connect()) as conn:
+        return [row[0] for row in conn.execute(
+            f"SELECT DISTINCT name FROM column_metrics WHERE run_id IN ({', '.join('?' * len(run_ids))}) ORDER BY name",
+            list(run_ids)
+        )]
+
+
+def column_trend(run_ids, metric, column=None):
+    """Return {run id: value} of a per-column metric, summed over the columns unless one is given"""
+    if not run_ids:
+        return {}
+    condition = " AND column_name = ?" if column else ""
+    with closing(connect()) as conn:
+        return dict(conn.execute(
+            f"SELECT run_id, SUM(value) FROM column_metrics WHERE run_id IN ({', '.join('?' * len(run_ids))}) "
+            f"AND name = ?{condition} GROUP BY run_id",
+            list(run_ids) + [metric] + ([column] if column else [])
+        ))
+
+
+def draw_trend(canvas, points, title):
+    """Draw a line chart of (label, value) points on the canvas"""
+    canvas.delete("all")
+    width = max(canvas.winfo_width(), 300)
+    canvas.create_text(width // 2, 12, text=title, font=("Arial", 10, "bold"))
+    if not points:
+        canvas.create_text(width // 2, CHART_HEIGHT // 2, text="No data for this selection")
+        return
+    values = [value for _, value in points]
+    low, high = min(values), max(values)
+    span = (high - low) or 1
+    step = (width - 2 * CHART_MARGIN) / max(1, len(points) - 1)
+    coordinates = []
+    for index, (label, value) in enumerate(points):
+        x = CHART_MARGIN + index * step
+        y = CHART_HEIGHT - CHART_MARGIN + 15 - (value - low) / span * (CHART_HEIGHT - 2 * CHART_MARGIN)
+        coordinates.append((x, y))
+        canvas.create_oval(x - 3, y - 3, x + 3, y + 3, fill="steelblue", outline="")
+    if len(coordinates) > 1:
+        canvas.create_line(*[value for point in coordinates for value in point], fill="steelblue", width=2)
+    canvas.create_text(5, CHART_MARGIN - 10, text=f"{high:g}", anchor=tk.W)
+    canvas.create_text(5, CHART_HEIGHT - CHART_MARGIN + 15, text=f"{low:g}", anchor=tk.W)
+    canvas.create_text(CHART_MARGIN, CHART_HEIGHT - 10, text=points[0][0], anchor=tk.W)
+    if len(points) > 1:
+        canvas.create_text(width - CHART_MARGIN, CHART_HEIGHT - 10, text=points[-1][0], anchor=tk.E)
+
+
+def trend_gui(table_name=None):
+    window = new_window("Run History", "980x640")
+
+    # Selection of the runs
+    filter_frame = tk.Frame(window)
+    filter_frame.pack(fill=tk.X, padx=10, pady=(10, 0))
+    tk.Label(filter_frame, text="Table:").pack(side=tk.LEFT)
+    table_var = tk.StringVar(value=table_name or "All")
+    table_box = ttk.Combobox(filter_frame, textvariable=table_var, state="readonly", width=28,
+                             values=["All"] + history_tables())
+    table_box.pack(side=tk.LEFT, padx=(5, 15))
+    tk.Label(filter_frame, text="Run:").pack(side=tk.LEFT)
+    kind_var = tk.StringVar(value="All")
+    kind_box = ttk.Combobox(filter_frame, textvariable=kind_var, state="readonly", width=14, values=["All"] + RUN_KINDS)
+    kind_box.pack(side=tk.LEFT, padx=5)
+
+    # One line per run
+    columns = ["started", "kind", "table", "weeks", "duration"] + [name for name, _ in RUN_METRIC_COLUMNS] + ["phases", "status"]
+    tree = ttk.Treeview(window, columns=columns, show="headings", height=10)
+    for name, heading, width in [("started", "Started", 130), ("kind", "Run", 85), ("table", "Table", 130),
+                                 ("weeks", "Weeks", 70), ("duration", "Duration", 65)] + \
+            [(name, heading, 85) for name, heading in RUN_METRIC_COLUMNS] + [("phases", "Phases", 200), ("status", "Status", 60)]:
+        tree.heading(name, text=heading)
+        tree.column(name, width=width, anchor=tk.W if name in ("started", "kind", "table", "weeks", "phases", "status") else tk.E)
+    tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+    # Trend of a metric across the listed runs
+    chart_frame = tk.Frame(window)
+    chart_frame.pack(fill=tk.X, padx=10)
+    tk.Label(chart_frame, text="Trend of:").pack(side=tk.LEFT)
+    metric_var = tk.StringVar()
+    metric_box = ttk.Combobox(chart_frame, textvariable=metric_var, state="readonly", width=28)
+    metric_box.pack(side=tk.LEFT, padx=5)
+    tk.Label(chart_frame, text="Column:").pack(side=tk.LEFT, padx=(10, 0))
+    column_var = tk.StringVar(value="All columns")
+    column_box = ttk.Combobox(chart_frame, textvariable=column_var, state="readonly", width=16)
+    column_box.pack(side=tk.LEFT, padx=5)
+    canvas = tk.Canvas(window, height=CHART_HEIGHT, bg="white")
+    canvas.pack(fill=tk.X, padx=10, pady=10)
+
+    state = {"runs": []}
+
+    def run_metric_choices():
+        return ["Duration (s)"] + [f"Run: {heading}" for _, heading in RUN_METRIC_COLUMNS] + \
+               [f"Phase: {name}" for name in sorted({name for entry in state["runs"] for name in entry["phases"]})]
+
+    def load_runs(event=None):
+        selected_table = table_var.get()
+        selected_kind = kind_var.get()
+        state["runs"] = list_runs(None if selected_table == "All" else selected_table,
+                                  None if selected_kind == "All" else selected_kind)
+        tree.delete(*tree.get_children())
+        for entry in reversed(state["runs"]):  # Latest first
+            phases = ", ".join(f"{name} {seconds:.1f} s" for name, seconds in entry["phases"].items())
+            tree.insert("", tk.END, values=[entry["started_at"].replace("T", " "), entry["kind"], entry["table"],
+                                            entry["weeks"] or "all", f"{entry['seconds']:.1f} s"] +
+                                           [f"{entry['metrics'][name]:g}" if name in entry["metrics"] else ""
+                                            for name, _ in RUN_METRIC_COLUMNS] + [phases, entry["status"]])
+        choices = run_metric_choices() + [f"Column: {name}" for name in column_metric_names([entry["id"] for entry in state["runs"]])]
+        metric_box["values"] = choices
+        if metric_var.get() not in choices:
+            metric_var.set(choices[0])
+        column_box["values"] = ["All columns"] + columns_to_check
+        draw()
+
+    def draw(event=None):
+        runs = state["runs"]
+        metric = metric_var.get()
+        labels = {entry["id"]: entry["started_at"][:10] for entry in runs}
+        if metric.startswith("Column: "):
+            column = None if column_var.get() == "All columns" else column_var.get()
+            values = column_trend([entry["id"] for entry in runs], metric[len("Column: "):], column)
+            points = [(labels[entry["id"]], values[entry["id"]]) for entry in runs if entry["id"] in values]
+            title = f"{metric[len('Column: '):]} ({column_var.get()})"
+        elif metric.startswith("Phase: "):
+            name = metric[len("Phase: "):]
+            points = [(labels[entry["id"]], entry["phases"][name]) for entry in runs if name in entry["phases"]]
+            title = f"{name} phase (s)"
+        elif metric.startswith("Run: "):
+            name = next(name for name, heading in RUN_METRIC_COLUMNS if heading == metric[len("Run: "):])
+            points = [(labels[entry["id"]], entry["metrics"][name]) for entry in runs if name in entry["metrics"]]
+            title = metric[len("Run: "):]
+        else:
+            points = [(labels[entry["id"]], entry["seconds"]) for entry in runs]
+            title = "Run duration (s)"
+        draw_trend(canvas, points, title)
+
+    table_box.bind("<<ComboboxSelected>>", load_runs)
+    kind_box.bind("<<ComboboxSelected>>", load_runs)
+    metric_box.bind("<<ComboboxSelected>>", draw)
+    column_box.bind("<<ComboboxSelected>>", draw)
+    canvas.bind("<Configure>", draw)
+    load_runs()
+    return window
+
+
+def main(dbname, user, password, host, port, table_name, weeks=None, bbox=None):
+    trend_gui(table_name)
+    run()
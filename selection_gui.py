@@ -1,87 +1,162 @@
 import tkinter as tk
 from tkinter import messagebox, ttk
+import threading
 import psycopg2
-from data_managment import data_management_gui
+from app_shell import new_window, run
+
+# Tables of the public schema with their planner estimates, read from the catalog directly.
+# A partitioned table adds up its partitions, which are not listed on their own.
+CATALOG_QUERY = """
+    SELECT c.relname,
+           GREATEST(c.reltuples, 0) + COALESCE(SUM(GREATEST(p.reltuples, 0)), 0) AS estimated_rows,
+           pg_total_relation_size(c.oid) + COALESCE(SUM(pg_total_relation_size(p.oid)), 0) AS total_bytes,
+           GREATEST(MAX(s.last_analyze), MAX(s.last_autoanalyze), MAX(ps.last_analyze), MAX(ps.last_autoanalyze)) AS last_analyzed
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+    LEFT JOIN pg_inherits i ON i.inhparent = c.oid
+    LEFT JOIN pg_class p ON p.oid = i.inhrelid
+    LEFT JOIN pg_stat_user_tables ps ON ps.relid = p.oid
+    WHERE n.nspname = 'public' AND c.relkind IN ('r', 'p') AND NOT c.relispartition
+    GROUP BY c.oid, c.relname, c.reltuples
+    ORDER BY c.relname
+"""
+
+# Catalogs read during this session, by (dbname, host, port); Refresh reads them again
+_catalogs = {}
+
 
 # Function to fetch existing tables from the database
-def fetch_existing_tables(dbname, user, password, host, port):
+def fetch_table_catalog(dbname, user, password, host, port):
+    """Return [(name, estimated rows, total bytes, last analyzed)] of the tables of the database"""
+    conn = psycopg2.connect(
+        dbname=dbname,
+        user=user,
+        password=password,
+        host=host,
+        port=port
+    )
     try:
-        # Connect to the database
-        conn = psycopg2.connect(
-            dbname=dbname,
-            user=user,
-            password=password,
-            host=host,
-            port=port
-        )
-        cur = conn.cursor()
-
-        # Query to fetch all table names
-        cur.execute("""
-        SELECT table_name
-        FROM information_schema.tables
-        WHERE table_schema = 'public';
-        """)
-        tables = cur.fetchall()
-
-        # Close the connection
-        cur.close()
+        with conn.cursor() as cur:
+            cur.execute(CATALOG_QUERY)
+            return [(name, int(rows), int(size), analyzed) for name, rows, size, analyzed in cur.fetchall()]
+    finally:
         conn.close()
 
-        # Extract table names from the result
-        return [table[0] for table in tables]
-    except Exception as e:
-        messagebox.showerror("Error", f"Failed to fetch tables: {e}")
-        return []
+
+def format_bytes(size):
+    for unit in ["B", "KB", "MB", "GB"]:
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
 
 # Function to handle the selection of an existing table
 def select_existing_table(dbname, user, password, host, port):
     # Create a new window for table selection
-    table_select_window = tk.Tk()
-    table_select_window.title("Select Existing Table")
-    table_select_window.geometry("400x250")
-    # Fetch existing tables
-    tables = fetch_existing_tables(dbname, user, password, host, port)
-
-    if not tables:
-        messagebox.showinfo("Info", "No tables found in the database.")
-        table_select_window.destroy()
-        return
-
-    # Create and place the dropdown for table selection
-    label_table = tk.Label(table_select_window, text="Select Table:")
-    label_table.pack(pady=10)
-
-    table_var = tk.StringVar()
-    table_var.set(tables[0])  # Set the default value to the first table
-    dropdown_tables = ttk.Combobox(table_select_window, textvariable = table_var, state="readonly")
-    def on_selection(event):
-        table_var.set(dropdown_tables.get())
-
-    dropdown_tables.bind("<<ComboboxSelected>>", on_selection)
-    
-    dropdown_tables['values'] = tables
-    dropdown_tables.current(0) # Set the default value to the first table
-    dropdown_tables.pack(pady=10)
+    table_select_window = new_window("Select Existing Table", "640x420")
+    key = (dbname, host, port)
+
+    # Search box filtering the list as the user types
+    search_frame = tk.Frame(table_select_window)
+    search_frame.pack(fill=tk.X, padx=10, pady=(10, 0))
+    label_search = tk.Label(search_frame, text="Search:")
+    label_search.pack(side=tk.LEFT)
+    search_var = tk.StringVar()
+    entry_search = tk.Entry(search_frame, textvariable=search_var)
+    entry_search.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+    status_var = tk.StringVar(value="Loading tables...")
+    label_status = tk.Label(search_frame, textvariable=status_var)
+    label_status.pack(side=tk.RIGHT)
+
+    # Create and place the table list
+    list_frame = tk.Frame(table_select_window)
+    list_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+    tree = ttk.Treeview(list_frame, columns=("rows", "size", "analyzed"), show="tree headings", selectmode="browse")
+    tree.heading("#0", text="Table")
+    tree.column("#0", width=240)
+    for name, heading, width, anchor in [("rows", "Rows (est.)", 110, tk.E), ("size", "Size", 90, tk.E),
+                                         ("analyzed", "Last analyzed", 140, tk.W)]:
+        tree.heading(name, text=heading)
+        tree.column(name, width=width, anchor=anchor)
+    scrollbar = tk.Scrollbar(list_frame, command=tree.yview)
+    tree.configure(yscrollcommand=scrollbar.set)
+    scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+    tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+    def show_tables(*args):
+        catalog = _catalogs.get(key, [])
+        search = search_var.get().strip().lower()
+        tree.delete(*tree.get_children())
+        for name, rows, size, analyzed in catalog:
+            if search in name.lower():
+                tree.insert("", tk.END, iid=name, text=name,
+                            values=(f"{rows:,}", format_bytes(size), analyzed.strftime('%Y-%m-%d %H:%M') if analyzed else "never"))
+        children = tree.get_children()
+        if children:
+            tree.selection_set(children[0])
+        status_var.set(f"{len(children)} of {len(catalog)} tables")
+
+    search_var.trace_add("write", show_tables)
+
+    # The catalog is read in a thread so the window opens at once, then kept for the session
+    def load_catalog():
+        status_var.set("Loading tables...")
+        done = {}
+
+        def worker():
+            try:
+                done["catalog"] = fetch_table_catalog(dbname, user, password, host, port)
+            except Exception as e:
+                done["error"] = e
+
+        def poll():
+            if not table_select_window.winfo_exists():
+                return
+            if "error" in done:
+                status_var.set("")
+                messagebox.showerror("Error", f"Failed to fetch tables: {done['error']}", parent=table_select_window)
+            elif "catalog" in done:
+                _catalogs[key] = done["catalog"]
+                if not done["catalog"]:
+                    messagebox.showinfo("Info", "No tables found in the database.", parent=table_select_window)
+                show_tables()
+            else:
+                table_select_window.after(100, poll)
+
+        threading.Thread(target=worker, name="table-catalog", daemon=True).start()
+        table_select_window.after(100, poll)
+
+    if key in _catalogs:
+        show_tables()
+    else:
+        load_catalog()
 
     # Function to handle the selection and proceed to data management
-    def proceed_to_data_management():
-        selected_table = table_var.get()
-        if not selected_table:
+    def proceed_to_data_management(event=None):
+        selection = tree.selection()
+        if not selection:
             messagebox.showerror("Error", "Please select a table.")
         else:
+            selected_table = selection[0]
             table_select_window.destroy()
+            from data_managment import data_management_gui
             data_management_gui(dbname, user, password, host, port, selected_table)
             return
 
-    # Create the submit button
-    button_submit = tk.Button(table_select_window, text="Submit", command=proceed_to_data_management)
-    button_submit.pack(pady=20)
-    
-    def close_window():
-        table_select_window.destroy()
-        exit()
-    
-    table_select_window.protocol("WM_DELETE_WINDOW", close_window)
-    # Run the table selection window
-    table_select_window.mainloop()  # Run the window
\ No newline at end of file
+    tree.bind("<Double-1>", proceed_to_data_management)
+    entry_search.bind("<Return>", proceed_to_data_management)
+
+    # Create the buttons
+    button_frame = tk.Frame(table_select_window)
+    button_frame.pack(pady=(0, 10))
+    button_refresh = tk.Button(button_frame, text="Refresh", command=load_catalog)
+    button_refresh.pack(side=tk.LEFT, padx=5)
+    button_submit = tk.Button(button_frame, text="Submit", command=proceed_to_data_management)
+    button_submit.pack(side=tk.LEFT, padx=5)
+    entry_search.focus_set()
+
+    # Closing the window goes back to the table selection screen
+    table_select_window.protocol("WM_DELETE_WINDOW", table_select_window.destroy)
+    run()
@@ -2,14 +2,77 @@ import tkinter as tk
 from tkinter import messagebox, filedialog
 import psycopg2
 import csv
-from data_managment import data_management_gui  # Import the function from the third file
+from report_cache import note_table_changed
+from week_partitions import create_partitioned_table, ensure_week_partitions, is_partitioned, is_flat_table
+from merge_import import MERGE_MODES, merge_import
+from bulk_import import bulk_import_gui, expand_sources, is_bulk_source
+from app_logging import setup_logging
+from app_shell import new_window, run
+from gps_index import enable_gps_index
+
+# Predetermined columns of a survey table, in CSV order
+TABLE_COLUMNS = [
+    ("id_troncon", "TEXT"),
+    ("date_viste", "DATE"),
+    ("id", "TEXT"),
+    ("nom_techni", "TEXT"),
+    ("code", "TEXT"),
+    ("id_ch_etiq", "TEXT"),
+    ("cod_gps_x", "TEXT"),
+    ("cod_gps_y", "TEXT"),
+    ("emplac_ch", "TEXT"),
+    ("cmnt_eta_c", "TEXT"),
+    ("type_ch", "TEXT"),
+    ("c_pano_av", "TEXT"),
+    ("pho_fer_av", "TEXT"),
+    ("c_ouv_av_1", "TEXT"),
+    ("boite24fo", "TEXT"),
+    ("boite72fo", "TEXT"),
+    ("boite144fo", "TEXT"),
+    ("cmt_etat_b", "TEXT"),
+    ("exist_ch", "TEXT"),
+    ("asp_exter", "TEXT"),
+    ("sys_fermet", "TEXT"),
+    ("nett_inter", "TEXT"),
+    ("nett_exter", "TEXT"),
+    ("fix_boite", "TEXT"),
+    ("exis_mou", "TEXT"),
+    ("fix_love_c", "TEXT"),
+    ("tampons_ch", "TEXT"),
+    ("logo", "TEXT"),
+    ("position", "TEXT"),
+    ("etiq_cable", "TEXT"),
+    ("entre2ch", "TEXT"),
+    ("syno", "TEXT"),
+    ("pht_mas_a", "TEXT"),
+    ("pht_mas_b", "TEXT"),
+    ("pht_mas_c", "TEXT"),
+    ("pht_mas_d", "TEXT"),
+    ("act_asp_ex", "TEXT"),
+    ("rep_sy_fer", "TEXT"),
+    ("for_sy_fer", "TEXT"),
+    ("betonnage", "TEXT"),
+    ("act_net_in", "TEXT"),
+    ("act_net_ex", "TEXT"),
+    ("act_fixboi", "TEXT"),
+    ("act_fixlov", "TEXT"),
+    ("act_tampch", "TEXT"),
+    ("act_etiq_c", "TEXT"),
+    ("etiq_chbr", "TEXT"),
+    ("cmnt_actio", "TEXT"),
+    ("ch_fer_apr", "TEXT"),
+    ("c_ouv_ap2", "TEXT"),
+    ("c_pano_apr", "TEXT"),
+    ("valider", "TEXT"),
+    ("week", "TEXT"),
+]
 
 # Function to create a new table based on user input and CSV data
 def create_table_gui(dbname, user, password, host, port):
     
+    setup_logging()
     # New window for creating a table
-    table_window = tk.Tk()
-    table_window.title("Create Table and Import CSV")
+    table_window = new_window("Create Table and Import CSV")
 
     # Create and place the labels and entry fields for table creation
     label_table_name = tk.Label(table_window, text="Table Name:")
@@ -24,14 +87,24 @@ def create_table_gui(dbname, user, password, host, port):
         entry_csv_path.delete(0, tk.END)
         entry_csv_path.insert(0, file_path)
 
-    label_csv_path = tk.Label(table_window, text="CSV File:")
+    # Function to select a folder of CSV files (a glob pattern can also be typed in)
+    def browse_folder():
+        folder_path = filedialog.askdirectory()
+        if folder_path:
+            entry_csv_path.delete(0, tk.END)
+            entry_csv_path.insert(0, folder_path)
+
+    label_csv_path = tk.Label(table_window, text="CSV File / Folder:")
     label_csv_path.grid(row=1, column=0, padx=10, pady=10)
 
     entry_csv_path = tk.Entry(table_window)
     entry_csv_path.grid(row=1, column=1, padx=10, pady=10)
 
     button_browse = tk.Button(table_window, text="Browse", command=browse_csv)
-    button_browse.grid(row=1, column=2, padx=10, pady=10)
+    button_browse.grid(row=1, column=2, padx=(10, 0), pady=10)
+
+    button_browse_folder = tk.Button(table_window, text="Folder", command=browse_folder)
+    button_browse_folder.grid(row=1, column=3, padx=10, pady=10)
 
     # Function to create the table and import CSV data
     def create_table_and_import():
@@ -42,6 +115,11 @@ def create_table_gui(dbname, user, password, host, port):
             messagebox.showerror("Error", "Please provide both table name and CSV file.")
             return
 
+        files = expand_sources(csv_file) if is_bulk_source(csv_file) else None
+        if files == []:
+            messagebox.showerror("Error", f"No CSV files found in {csv_file}.")
+            return
+
         try:
             # Database connection
             conn = psycopg2.connect(
@@ -53,93 +131,125 @@ def create_table_gui(dbname, user, password, host, port):
             )
             cur = conn.cursor()
 
-            # Create the table (predetermined columns)
-            create_table_query = f"""
+            # An existing table keeps its layout: offer to import into it unpartitioned
+            partitioned = partition_var.get()
+            if partitioned and is_flat_table(cur, table_name):
+                if not messagebox.askokcancel(
+                        "Existing Table",
+                        f"Table {table_name} already exists and is not partitioned by week.\n\n"
+                        "Import the rows into it without partitions?"):
+                    cur.close()
+                    conn.close()
+                    return
+                partitioned = False
+
+            # Create the table (predetermined columns), partitioned by week if requested
+            if partitioned:
+                create_partitioned_table(cur, table_name, TABLE_COLUMNS)
+            else:
+                column_definitions = ",\n".join(f"                {name} {data_type}" for name, data_type in TABLE_COLUMNS)
+                create_table_query = f"""
             CREATE TABLE IF NOT EXISTS {table_name} (
-                id_troncon TEXT,
-                date_viste DATE,
-                id TEXT,
-                nom_techni TEXT,
-                code TEXT,
-                id_ch_etiq TEXT,
-                cod_gps_x TEXT,
-                cod_gps_y TEXT,
-                emplac_ch TEXT,
-                cmnt_eta_c TEXT,
-                type_ch TEXT,
-                c_pano_av TEXT,
-                pho_fer_av TEXT,
-                c_ouv_av_1 TEXT,
-                boite24fo TEXT,
-                boite72fo TEXT,
-                boite144fo TEXT,
-                cmt_etat_b TEXT,
-                exist_ch TEXT,
-                asp_exter TEXT,
-                sys_fermet TEXT,
-                nett_inter TEXT,
-                nett_exter TEXT,
-                fix_boite TEXT,
-                exis_mou TEXT,
-                fix_love_c TEXT,
-                tampons_ch TEXT,
-                logo TEXT,
-                position TEXT,
-                etiq_cable TEXT,
-                entre2ch TEXT,
-                syno TEXT,
-                pht_mas_a TEXT,
-                pht_mas_b TEXT,
-                pht_mas_c TEXT,
-                pht_mas_d TEXT,
-                act_asp_ex TEXT,
-                rep_sy_fer TEXT,
-                for_sy_fer TEXT,
-                betonnage TEXT,
-                act_net_in TEXT,
-                act_net_ex TEXT,
-                act_fixboi TEXT,
-                act_fixlov TEXT,
-                act_tampch TEXT,
-                act_etiq_c TEXT,
-                etiq_chbr TEXT,
-                cmnt_actio TEXT,
-                ch_fer_apr TEXT,
-                c_ouv_ap2 TEXT,
-                c_pano_apr TEXT,
-                valider TEXT,
-                week TEXT
+{column_definitions}
             );
             """
-            cur.execute(create_table_query)
-
-            # Open the CSV file and insert data
-            with open(csv_file, newline='', encoding='utf-8') as csvfile:
-                reader = csv.reader(csvfile)
-                next(reader)  # Skip the header row
-                for row in reader:
-                    cur.execute(f"""
-                    INSERT INTO {table_name}
-                    VALUES ({', '.join(['%s'] * len(row))});
-                    """, row)
+                cur.execute(create_table_query)
+
+            # Numeric coordinates with a spatial index, for area filters
+            if gps_var.get():
+                enable_gps_index(cur, table_name)
+
+            if files:
+                # Several files: load them concurrently, each over its own connection
+                conn.commit()
+                cur.close()
+                conn.close()
+                start_bulk_import(table_name, files)
+                return
+
+            if import_mode_var.get() in MERGE_MODES:
+                # Merge on id through a staging table, so re-sent rows do not become duplicates
+                result = merge_import(conn, table_name, csv_file, TABLE_COLUMNS, import_mode_var.get())
+                import_summary = (f"{result['inserted']} rows inserted, {result['updated']} updated, "
+                                  f"{result['skipped']} skipped, {result['rejected']} rejected (no id).")
+            else:
+                # Partitioned tables need one partition per week before the rows arrive
+                if is_partitioned(cur, table_name):
+                    week_index = [name for name, _ in TABLE_COLUMNS].index("week")
+                    with open(csv_file, newline='', encoding='utf-8') as csvfile:
+                        reader = csv.reader(csvfile)
+                        next(reader)  # Skip the header row
+                        weeks = {row[week_index] for row in reader if len(row) > week_index}
+                    ensure_week_partitions(cur, table_name, weeks)
+
+                # Open the CSV file and insert data
+                with open(csv_file, newline='', encoding='utf-8') as csvfile:
+                    reader = csv.reader(csvfile)
+                    next(reader)  # Skip the header row
+                    for row in reader:
+                        cur.execute(f"""
+                        INSERT INTO {table_name}
+                        VALUES ({', '.join(['%s'] * len(row))});
+                        """, row)
+                import_summary = "data imported successfully!"
             conn.commit()
+            note_table_changed(conn, table_name)
             cur.close()
             conn.close()
-            messagebox.showinfo("Success", f"Table {table_name} created and data imported successfully!")
+            messagebox.showinfo("Success", f"Table {table_name} created and {import_summary}")
             table_window.destroy()
+            from data_managment import data_management_gui  # Import the function from the third file
             data_management_gui(dbname, user, password, host, port,table_name)# Close the table creation window
         except Exception as e:
             messagebox.showerror("Error", f"An error occurred: {e}")
 
+    # Function to run a bulk import and continue to data management when it is done
+    def start_bulk_import(table_name, files):
+        db_params = {'dbname': dbname, 'user': user, 'password': password, 'host': host, 'port': port}
+        button_create_table.config(state=tk.DISABLED)
+
+        def on_finished(summaries):
+            button_create_table.config(state=tk.NORMAL)
+            if summaries and any(summary["ok"] for summary in summaries):
+                try:
+                    conn = psycopg2.connect(**db_params)
+                    note_table_changed(conn, table_name)
+                    conn.close()
+                except Exception as e:
+                    messagebox.showerror("Error", f"An error occurred: {e}")
+                continue_button = tk.Button(bulk_window, text="Continue to Data Management", command=continue_to_data_management)
+                continue_button.pack(pady=(0, 10))
+
+        def continue_to_data_management():
+            table_window.destroy()
+            from data_managment import data_management_gui
+            data_management_gui(dbname, user, password, host, port, table_name)
+
+        bulk_window = bulk_import_gui(table_window, db_params, table_name, files, TABLE_COLUMNS,
+                                      import_mode_var.get(), on_finished)
+
+    partition_var = tk.BooleanVar(master=table_window, value=False)
+    check_partition = tk.Checkbutton(table_window, text="Partition new table by week", variable=partition_var)
+    check_partition.grid(row=2, column=0, columnspan=4, padx=10, sticky=tk.W)
+
+    gps_var = tk.BooleanVar(master=table_window, value=False)
+    check_gps = tk.Checkbutton(table_window, text="Index GPS coordinates (enables area filters)", variable=gps_var)
+    check_gps.grid(row=3, column=0, columnspan=4, padx=10, sticky=tk.W)
+
+    # Import mode: plain append, or merge on id
+    import_mode_var = tk.StringVar(master=table_window, value="append")
+    mode_frame = tk.LabelFrame(table_window, text="Import mode", padx=10, pady=5)
+    mode_frame.grid(row=4, column=0, columnspan=4, padx=10, sticky=tk.EW)
+    radio_append = tk.Radiobutton(mode_frame, text="Append all rows", variable=import_mode_var, value="append")
+    radio_append.pack(anchor=tk.W)
+    for mode, description in MERGE_MODES.items():
+        radio_merge = tk.Radiobutton(mode_frame, text=description, variable=import_mode_var, value=mode)
+        radio_merge.pack(anchor=tk.W)
+
     # Create the submit button to create the table and import data
     button_create_table = tk.Button(table_window, text="Create Table and Import CSV", command=create_table_and_import)
-    button_create_table.grid(row=2, column=0, columnspan=3, pady=20)
-
-    # Function to close the table creation window
-    def close_window():
-        table_window.destroy()
-        exit()
+    button_create_table.grid(row=5, column=0, columnspan=4, pady=20)
 
-    # Close the window when the X icon is clicked
-    table_window.protocol("WM_DELETE_WINDOW", close_window)
-    table_window.mainloop()
\ No newline at end of file
+    # Close the window when the X icon is clicked, going back to the table selection screen
+    table_window.protocol("WM_DELETE_WINDOW", table_window.destroy)
+    run()
\ No newline at end of file
@@ -0,0 +1,171 @@
+import csv
+import time
+import logging
+import psycopg2
+from tkinter import filedialog, messagebox
+from table_filters import filtered_source
+from change_journal import ROW_ID_COLUMN
+from data_fixing_final import ROW_HASH_COLUMN
+from photo_status import columns_to_check, status_column
+from gps_index import GPS_SOURCE_COLUMNS
+
+# pyarrow is optional: without it only CSV can be exported
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# Rows fetched from the server-side cursor and written at a time
+EXPORT_BATCH_ROWS = 20000
+PARQUET_COMPRESSION = "zstd"
+
+# Bookkeeping columns added by the application, left out of exports
+INTERNAL_COLUMNS = {ROW_ID_COLUMN, ROW_HASH_COLUMN, *GPS_SOURCE_COLUMNS} | {status_column(col) for col in columns_to_check}
+
+# Arrow types of the PostgreSQL types found in survey tables; anything else is exported as text
+ARROW_TYPES = {
+    "bool": lambda: pa.bool_(),
+    "int2": lambda: pa.int16(),
+    "int4": lambda: pa.int32(),
+    "int8": lambda: pa.int64(),
+    "float4": lambda: pa.float32(),
+    "float8": lambda: pa.float64(),
+    "date": lambda: pa.date32(),
+    "timestamp": lambda: pa.timestamp("us"),
+    "timestamptz": lambda: pa.timestamp("us", tz="UTC"),
+}
+
+
+def arrow_available():
+    """Return True if pyarrow is installed"""
+    return pa is not None
+
+
+def export_columns(cursor, table_name):
+    """Return [(name, type name)] of the table's exported columns, in table order"""
+    cursor.execute(
+        """
+        SELECT attname, typname
+        FROM pg_attribute JOIN pg_type ON pg_type.oid = atttypid
+        WHERE attrelid = to_regclass(%s) AND attnum > 0 AND NOT attisdropped
+        ORDER BY attnum
+        """,
+        (table_name,)
+    )
+    return [(name, type_name) for name, type_name in cursor.fetchall() if name not in INTERNAL_COLUMNS]
+
+
+def fetch_batches(conn, table_name, columns, weeks=None, bbox=None, batch_rows=EXPORT_BATCH_ROWS):
+    """
+    Yield lists of rows read through a server-side cursor, so only one batch is ever held
+    in memory whatever the size of the table
+    """
+    with conn.cursor(name="table_export") as cursor:
+        cursor.itersize = batch_rows
+        cursor.execute(f"SELECT {', '.join(name for name, _ in columns)} FROM {filtered_source(table_name, weeks, bbox=bbox)}")
+        while True:
+            rows = cursor.fetchmany(batch_rows)
+            if not rows:
+                break
+            yield rows
+
+
+def write_csv(batches, columns, file_path):
+    rows_written = 0
+    with open(file_path, mode='w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow([name for name, _ in columns])
+        for rows in batches:
+            writer.writerows(rows)
+            rows_written += len(rows)
+    return rows_written
+
+
+def arrow_schema(columns):
+    return pa.schema([(name, ARROW_TYPES.get(type_name, pa.string)()) for name, type_name in columns])
+
+
+def record_batch(rows, schema):
+    """Turn a batch of row tuples into an Arrow record batch, one column at a time"""
+    arrays = []
+    for index, field in enumerate(schema):
+        values = [row[index] for row in rows]
+        if pa.types.is_string(field.type):
+            values = [value if value is None or isinstance(value, str) else str(value) for value in values]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def write_parquet(batches, columns, file_path, compression=PARQUET_COMPRESSION):
+    """Write the batches as row groups of a compressed Parquet file"""
+    schema = arrow_schema(columns)
+    rows_written = 0
+    with pq.ParquetWriter(file_path, schema, compression=compression) as writer:
+        for rows in batches:
+            writer.write_batch(record_batch(rows, schema))
+            rows_written += len(rows)
+    return rows_written
+
+
+def write_arrow(batches, columns, file_path, compression=PARQUET_COMPRESSION):
+    """Write the batches to a compressed Arrow IPC (Feather v2) file"""
+    schema = arrow_schema(columns)
+    rows_written = 0
+    options = pa.ipc.IpcWriteOptions(compression=compression)
+    with pa.OSFile(file_path, "wb") as sink, pa.ipc.new_file(sink, schema, options=options) as writer:
+        for rows in batches:
+            writer.write_batch(record_batch(rows, schema))
+            rows_written += len(rows)
+    return rows_written
+
+
+WRITERS = {".csv": write_csv, ".parquet": write_parquet, ".arrow": write_arrow}
+
+
+def export_table(conn, table_name, file_path, weeks=None, bbox=None):
+    """Export the table (or its filtered rows) to CSV, Parquet or Arrow by file extension; returns the row count"""
+    extension = file_path[file_path.rfind("."):].lower()
+    writer = WRITERS.get(extension)
+    if writer is None:
+        raise ValueError(f"Unsupported export format: {extension}")
+    if writer is not write_csv and not arrow_available():
+        raise ValueError("Parquet and Arrow exports need pyarrow (pip install pyarrow).")
+    with conn.cursor() as cursor:
+        columns = export_columns(cursor, table_name)
+    start = time.perf_counter()
+    rows_written = writer(fetch_batches(conn, table_name, columns, weeks, bbox), columns, file_path)
+    conn.rollback()  # Closes the read transaction of the server-side cursor
+    logging.info(f"Exported {rows_written} rows of {table_name} to {file_path} in {time.perf_counter() - start:.1f} s")
+    return rows_written
+
+
+def main(dbname, user, password, host, port, table_name, weeks=None, bbox=None):
+    filetypes = [("CSV Files", "*.csv")]
+    if arrow_available():
+        filetypes += [("Parquet Files", "*.parquet"), ("Arrow Files", "*.arrow")]
+    file_path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=filetypes)
+
+    if not file_path:
+        return  # User canceled the save dialog
+
+    try:
+        conn = psycopg2.connect(
+            dbname=dbname,
+            user=user,
+            password=password,
+            host=host,
+            port=port
+        )
+        try:
+            rows_written = export_table(conn, table_name, file_path, weeks, bbox)
+        finally:
+            conn.close()
+    except ValueError as e:
+        messagebox.showerror("Export Error", str(e))
+        return
+    except Exception as e:
+        messagebox.showerror("Database Error", str(e))
+        return
+
+    messagebox.showinfo("Success", f"{rows_written} rows exported to {file_path}")
@@ -0,0 +1,82 @@
+import os
+import json
+from gps_index import point_expression
+
+# Optional file of named areas: {"Region name": [min_x, min_y, max_x, max_y], ...}
+REGIONS_FILE = "regions.json"
+
+
+def sql_literal(value):
+    """Quote a value as an SQL string literal (standard_conforming_strings is on by default)"""
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def parse_weeks(text):
+    """Parse a comma separated list of weeks typed by the user; empty means all weeks"""
+    return [week.strip() for week in (text or "").split(",") if week.strip()]
+
+
+def week_condition(weeks):
+    """SQL condition restricting rows to the given weeks, or None for all weeks"""
+    if not weeks:
+        return None
+    return f"week IN ({', '.join(sql_literal(week) for week in weeks)})"
+
+
+def load_regions():
+    """Named areas from regions.json, or an empty dict when the file does not exist"""
+    if not os.path.exists(REGIONS_FILE):
+        return {}
+    with open(REGIONS_FILE, encoding="utf-8") as regions_file:
+        return {name.lower(): tuple(float(value) for value in bbox) for name, bbox in json.load(regions_file).items()}
+
+
+def parse_area(text):
+    """
+    Parse the area typed by the user: "min_x, min_y, max_x, max_y" or a region name from
+    regions.json. Returns a bounding box tuple, or None for everywhere. Raises ValueError.
+    """
+    text = (text or "").strip()
+    if not text:
+        return None
+    parts = [part.strip() for part in text.split(",")]
+    if len(parts) == 4:
+        try:
+            min_x, min_y, max_x, max_y = (float(part) for part in parts)
+        except ValueError:
+            raise ValueError(f"Invalid bounding box: {text}")
+        return min(min_x, max_x), min(min_y, max_y), max(min_x, max_x), max(min_y, max_y)
+    regions = load_regions()
+    if text.lower() not in regions:
+        raise ValueError(f"Unknown region {text}. Use min_x, min_y, max_x, max_y or a name from {REGIONS_FILE}.")
+    return regions[text.lower()]
+
+
+def bbox_condition(bbox):
+    """SQL condition restricting rows to a bounding box (served by the GPS GiST index), or None"""
+    if not bbox:
+        return None
+    min_x, min_y, max_x, max_y = (float(value) for value in bbox)
+    return f"{point_expression()} <@ box(point({min_x}, {min_y}), point({max_x}, {max_y}))"
+
+
+def row_conditions(weeks=None, bbox=None):
+    """All row filter conditions selected by the user"""
+    return [condition for condition in [week_condition(weeks), bbox_condition(bbox)] if condition]
+
+
+def scope_clause(weeks=None, bbox=None):
+    """Extra ' AND ...' predicate appended to UPDATE/SELECT statements on the table"""
+    return "".join(f" AND {condition}" for condition in row_conditions(weeks, bbox))
+
+
+def filtered_source(table_name, weeks=None, sample_clause="", bbox=None):
+    """
+    FROM item for report queries: the table itself, or a filtered (and possibly sampled)
+    subquery aliased to the table name. PostgreSQL flattens the subquery, so a week filter
+    on a partitioned table prunes to the matching partitions and an area uses the GPS index.
+    """
+    conditions = row_conditions(weeks, bbox)
+    if not conditions:
+        return f"{table_name} {sample_clause}".strip()
+    return f"(SELECT * FROM {table_name} {sample_clause} WHERE {' AND '.join(conditions)}) AS {table_name}"
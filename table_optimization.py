@@ -0,0 +1,160 @@
+import psycopg2
+import tkinter as tk
+from tkinter import messagebox, scrolledtext
+import hashlib
+import logging
+import time
+from app_shell import new_window, run
+from quick_report import SQL_QUERIES as QUICK_REPORT_QUERIES
+from full_report import SQL_QUERIES as FULL_REPORT_QUERIES, columns_to_check
+
+# Partial indexes matching the report predicates exactly, so the planner can use them
+PARTIAL_INDEXES = {
+    "fnf": "{col} ILIKE 'File Not Found%'",
+    "lnf": "{col} ILIKE 'Link Not Found%'",
+    "files": "{col} ILIKE 'files/%'",
+}
+
+# Queries timed before and after optimizing (name -> query template)
+BENCHMARK_QUERIES = {
+    "File Not Found ids (full report)": FULL_REPORT_QUERIES["file_not_found_ids"],
+    "Link Not Found ids (full report)": FULL_REPORT_QUERIES["link_not_found_ids"],
+    "Wrong path count (quick report)": QUICK_REPORT_QUERIES["wrong_path_count"],
+    "Double extension count (quick report)": QUICK_REPORT_QUERIES["double_extension_rows"],
+}
+
+
+def index_name(table_name, suffix):
+    """Build an index name that stays within PostgreSQL's 63 character limit"""
+    name = f"{table_name}_{suffix}"
+    if len(name) > 63:
+        digest = hashlib.md5(table_name.encode("utf-8")).hexdigest()[:8]
+        name = f"{table_name[:63 - len(suffix) - 10]}_{digest}_{suffix}"
+    return name
+
+
+def trigram_available(cursor):
+    """Try to enable pg_trgm, returning False if it is not installed or not allowed"""
+    cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+    if not cursor.fetchone():
+        return False
+    cursor.execute("SAVEPOINT enable_trgm")
+    try:
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        cursor.execute("RELEASE SAVEPOINT enable_trgm")
+        return True
+    except psycopg2.Error as e:
+        cursor.execute("ROLLBACK TO SAVEPOINT enable_trgm")
+        logging.warning(f"pg_trgm is available but could not be enabled: {str(e).strip()}")
+        return False
+
+
+def measure_queries(cursor, table_name):
+    """
+    Run EXPLAIN ANALYZE for every benchmark query on every photo column.
+    Returns {query name: (total execution ms, text plan for the first column)}.
+    """
+    results = {}
+    for name, query in BENCHMARK_QUERIES.items():
+        total_ms = 0.0
+        first_plan = None
+        for col in columns_to_check:
+            formatted_query = query.format(col=col, table=table_name).strip().rstrip(";")
+            cursor.execute(f"EXPLAIN (ANALYZE, FORMAT JSON) {formatted_query}")
+            plan = cursor.fetchone()[0][0]
+            total_ms += plan["Execution Time"]
+            if first_plan is None:
+                cursor.execute(f"EXPLAIN {formatted_query}")
+                first_plan = "\n".join(row[0] for row in cursor.fetchall())
+        results[name] = (total_ms, first_plan)
+    return results
+
+
+def create_supporting_indexes(cursor, table_name, use_trigram):
+    """
+    Create the indexes backing the report and fixing predicates.
+    Returns the list of index names that were created or already present.
+    """
+    created = []
+    statements = [(index_name(table_name, "id_idx"), "(id)", "")]
+    for col in columns_to_check:
+        for suffix, predicate in PARTIAL_INDEXES.items():
+            statements.append((
+                index_name(table_name, f"{col}_{suffix}_idx"),
+                "(id, id_troncon, code)",
+                f" WHERE {predicate.format(col=col)}"
+            ))
+        if use_trigram:
+            statements.append((
+                index_name(table_name, f"{col}_trgm_idx"),
+                f"USING gin ({col} gin_trgm_ops)",
+                ""
+            ))
+    for name, definition, where in statements:
+        logging.info(f"Creating index {name}")
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table_name} {definition}{where}")
+        created.append(name)
+    return created
+
+
+def optimize_table(conn, table_name):
+    """
+    Create supporting indexes on the photo columns and id, ANALYZE the table and
+    measure the report queries before and after.
+    """
+    try:
+        with conn.cursor() as cursor:
+            before = measure_queries(cursor, table_name)
+            use_trigram = trigram_available(cursor)
+            indexes = create_supporting_indexes(cursor, table_name, use_trigram)
+            cursor.execute(f"ANALYZE {table_name}")
+            after = measure_queries(cursor, table_name)
+        conn.commit()
+        logging.info(f"Optimized table {table_name}: {len(indexes)} indexes")
+        return {"indexes": indexes, "trigram": use_trigram, "before": before, "after": after}
+    except Exception as e:
+        conn.rollback()
+        logging.error(f"Error optimizing table: {str(e)}")
+        raise e
+
+
+def display_optimization_gui(table_name, result):
+    window = new_window("Table Optimization", "800x600")
+
+    text_area = scrolledtext.ScrolledText(window, wrap=tk.NONE, width=95, height=30, font=("Courier", 9))
+    text_area.pack(padx=10, pady=10, fill=tk.BOTH, expand=True)
+    text_area.tag_configure("bold", font=("Courier", 9, "bold"))
+
+    text_area.insert(tk.END, f"Table {table_name}: {len(result['indexes'])} indexes in place "
+                             f"({'with' if result['trigram'] else 'without'} pg_trgm)\n\n", "bold")
+    for name, (before_ms, before_plan) in result["before"].items():
+        after_ms, after_plan = result["after"][name]
+        text_area.insert(tk.END, f"{name}: {before_ms:.1f} ms -> {after_ms:.1f} ms (all columns)\n", "bold")
+        text_area.insert(tk.END, f"  Plan before:\n{before_plan}\n  Plan after:\n{after_plan}\n\n")
+
+    text_area.config(state=tk.DISABLED)
+
+    def close_window():
+        window.destroy()
+
+    window.protocol("WM_DELETE_WINDOW", close_window)
+    run()
+
+
+def main(dbname, user, password, host, port, table_name):
+    try:
+        conn = psycopg2.connect(
+            dbname=dbname,
+            user=user,
+            password=password,
+            host=host,
+            port=port
+        )
+        start = time.perf_counter()
+        result = optimize_table(conn, table_name)
+        logging.info(f"Optimization took {time.perf_counter() - start:.1f} s")
+        conn.close()
+        display_optimization_gui(table_name, result)
+    except Exception as e:
+        messagebox.showerror("Database Error", str(e))
+        return
@@ -0,0 +1,131 @@
+import os
+import sys
+import pytest
+
+# The modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeCursor:
+    """Cursor of a FakeConnection: records every statement and answers it from the connection's script"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.rows = []
+        self.rowcount = -1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def execute(self, query, params=None):
+        self.connection.queries.append((query, params))
+        self.rows = list(self.connection.answer(query, params))
+        self.rowcount = len(self.rows)
+
+    def fetchone(self):
+        return self.rows.pop(0) if self.rows else None
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def fetchmany(self, size):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """
+    Connection answering queries without a database. answers maps a text found in the query
+    to the rows it returns (the first match wins, other queries return no rows), or is a
+    function of (query, params) returning the rows.
+    """
+
+    def __init__(self, answers=None):
+        self.answers = answers or {}
+        self.queries = []
+        self.commits = 0
+        self.rollbacks = 0
+        self.closed = False
+
+    def answer(self, query, params):
+        if callable(self.answers):
+            return self.answers(query, params)
+        for text, rows in self.answers.items():
+            if text in query:
+                return rows
+        return []
+
+    def cursor(self, name=None):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+    def executed(self, text):
+        """Return True if a statement containing text was executed"""
+        return any(text in query for query, _ in self.queries)
+
+
+@pytest.fixture
+def fake_connection():
+    """Factory of FakeConnection objects: fake_connection({"text in query": rows})"""
+    return FakeConnection
+
+
+@pytest.fixture
+def db(monkeypatch, tmp_path):
+    """
+    Connection to a real PostgreSQL database, given by the TEST_DATABASE_URL environment
+    variable (a libpq connection string); tests using it are skipped without one. Each test
+    works in a schema of its own, dropped afterwards.
+    """
+    dsn = os.environ.get("TEST_DATABASE_URL")
+    if not dsn:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    import uuid
+    import psycopg2
+    import report_cache
+
+    # Fixing runs note the change in the local report cache; keep it out of the working directory
+    monkeypatch.setattr(report_cache, "cache_directory", str(tmp_path / "cache"))
+    monkeypatch.setattr(report_cache, "cache_filename", str(tmp_path / "cache" / "report_cache.pickle"))
+    monkeypatch.setattr(report_cache, "_state", None)
+
+    schema = f"test_{uuid.uuid4().hex[:12]}"
+    conn = psycopg2.connect(dsn)
+    with conn.cursor() as cursor:
+        cursor.execute(f"CREATE SCHEMA {schema}")
+        cursor.execute(f"SET search_path TO {schema}")
+    conn.commit()
+    try:
+        yield conn
+    finally:
+        conn.rollback()
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP SCHEMA {schema} CASCADE")
+        conn.commit()
+        conn.close()
+
+
+@pytest.fixture
+def survey(db):
+    """Empty survey table with the application's columns; returns its name"""
+    from table_creation import TABLE_COLUMNS
+
+    with db.cursor() as cursor:
+        cursor.execute(f"CREATE TABLE survey ({', '.join(f'{name} {data_type}' for name, data_type in TABLE_COLUMNS)})")
+    db.commit()
+    return "survey"
@@ -0,0 +1,58 @@
+import tarfile
+import zipfile
+import pytest
+import audit_bundle
+
+
+@pytest.fixture
+def photos(tmp_path, monkeypatch):
+    """A photo folder and a table of two rows referencing a.jpg twice, b.jpg and a missing file"""
+    folder = tmp_path / "photos"
+    (folder / "DCIM").mkdir(parents=True)
+    (folder / "DCIM" / "a.jpg").write_bytes(b"a" * 100)
+    (folder / "DCIM" / "b.jpg").write_bytes(b"b" * 50)
+    monkeypatch.setattr(audit_bundle, "export_columns", lambda cursor, table: [("id", "text"), ("syno", "text")])
+    monkeypatch.setattr(audit_bundle, "fetch_batches",
+                        lambda conn, table, columns, weeks, bbox: iter([[("1", "DCIM/a.jpg"), ("2", "DCIM/b.jpg")]]))
+    monkeypatch.setattr(audit_bundle, "referenced_photo_paths",
+                        lambda conn, table, weeks, bbox: iter(["DCIM/a.jpg", "DCIM/b.jpg", "DCIM/gone.jpg", "./DCIM/a.jpg"]))
+    return folder
+
+
+def test_member_name_stays_under_photos():
+    assert audit_bundle.member_name("DCIM\\2024\\a.jpg") == "photos/DCIM/2024/a.jpg"
+    assert audit_bundle.member_name("../../etc/passwd") == "photos/etc/passwd"
+    assert audit_bundle.member_name("/./DCIM//a.jpg") == "photos/DCIM/a.jpg"
+
+
+@pytest.mark.parametrize("extension", [".zip", ".tar"])
+def test_bundle_holds_table_photos_and_missing_list(photos, tmp_path, extension, fake_connection):
+    archive_path = str(tmp_path / ("bundle" + extension))
+
+    summary = audit_bundle.build_bundle(fake_connection(), "survey", str(photos), archive_path)
+
+    assert summary == {"rows": 2, "photos": 2, "bytes": 150, "duplicates": 1, "missing": 1}
+    if extension == ".zip":
+        with zipfile.ZipFile(archive_path) as archive:
+            members = {name: archive.read(name) for name in archive.namelist()}
+    else:
+        with tarfile.open(archive_path) as archive:
+            members = {member.name: archive.extractfile(member).read() for member in archive.getmembers()}
+    assert members["survey.csv"] == b"id,syno\r\n1,DCIM/a.jpg\r\n2,DCIM/b.jpg\r\n"
+    assert members["photos/DCIM/a.jpg"] == b"a" * 100
+    assert members["photos/DCIM/b.jpg"] == b"b" * 50
+    assert members[audit_bundle.MISSING_MEMBER] == b"DCIM/gone.jpg\n"
+
+
+@pytest.mark.parametrize("extension", [".zip", ".tar"])
+def test_failed_bundle_leaves_no_archive(photos, tmp_path, monkeypatch, extension, fake_connection):
+    def failing_paths(conn, table, weeks, bbox):
+        yield "DCIM/a.jpg"
+        raise RuntimeError("connection lost")
+
+    monkeypatch.setattr(audit_bundle, "referenced_photo_paths", failing_paths)
+    archive_path = tmp_path / ("bundle" + extension)
+
+    with pytest.raises(RuntimeError, match="connection lost"):
+        audit_bundle.build_bundle(fake_connection(), "survey", str(photos), str(archive_path))
+    assert not archive_path.exists()
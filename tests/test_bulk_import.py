@@ -0,0 +1,16 @@
+import os
+from bulk_import import expand_sources, is_bulk_source
+
+
+def test_folder_and_glob_sources_expand_to_sorted_csv_files(tmp_path):
+    for name in ("week_02.csv", "week_01.csv", "notes.txt", "old.csv.bak"):
+        (tmp_path / name).write_text("id\n")
+    (tmp_path / "sub.csv").mkdir()
+
+    expected = [os.path.join(str(tmp_path), name) for name in ("week_01.csv", "week_02.csv")]
+    assert expand_sources(str(tmp_path)) == expected
+    assert expand_sources(os.path.join(str(tmp_path), "week_*.csv")) == expected
+    assert expand_sources(os.path.join(str(tmp_path), "*.parquet")) == []
+
+    assert is_bulk_source(str(tmp_path)) and is_bulk_source(os.path.join(str(tmp_path), "*.csv"))
+    assert not is_bulk_source(expected[0])
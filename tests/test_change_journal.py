@@ -0,0 +1,42 @@
+import change_journal
+
+
+def test_journaled_update_matches_rows_on_their_physical_address():
+    sql = change_journal.journaled_update_sql("survey", "syno", "{col} || '.jpg'", "{col} NOT ILIKE '%.%'", 7)
+    assert "SELECT tableoid, ctid, syno AS old_value" in sql
+    assert "WHERE t.tableoid = o.tableoid AND t.ctid = o.ctid" in sql
+    assert f"t.{change_journal.ROW_ID_COLUMN} = o." not in sql
+
+
+def test_journaled_update_records_row_key_and_old_value():
+    sql = change_journal.journaled_update_sql("survey", "syno", "{col} || '.jpg'", "{col} NOT ILIKE '%.%'", "7")
+    assert "SET syno = o.old_value || '.jpg'" in sql
+    assert "WHERE syno NOT ILIKE '%.%'" in sql
+    assert f"RETURNING t.{change_journal.ROW_ID_COLUMN}, o.old_value" in sql
+    assert f"SELECT 7, {change_journal.ROW_ID_COLUMN}, 'syno', old_value FROM changed" in sql
+
+
+def test_runs_without_changes_are_not_undone(db, survey):
+    from data_fixing_final import execute_fixing_queries, columns_to_check
+
+    with db.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {survey} (id, syno) VALUES ('1', 'DCIM/a.heic')")
+    db.commit()
+
+    changed_run = change_journal.start_run(db, survey)
+    execute_fixing_queries(db, survey, journal_run_id=changed_run)
+    # Nothing left to fix: the second run journals nothing
+    empty_run = change_journal.start_run(db, survey)
+    execute_fixing_queries(db, survey, journal_run_id=empty_run)
+
+    with db.cursor() as cursor:
+        assert change_journal.last_run(cursor, survey)[0] == changed_run
+    assert change_journal.discard_empty_run(db, empty_run)
+    assert not change_journal.discard_empty_run(db, changed_run)
+
+    assert change_journal.undo_last_run(db, survey, columns_to_check) == (changed_run, 1)
+    with db.cursor() as cursor:
+        cursor.execute(f"SELECT syno FROM {survey}")
+        assert cursor.fetchone()[0] == "DCIM/a.heic"
+        assert change_journal.last_run(cursor, survey) is None
+    db.rollback()
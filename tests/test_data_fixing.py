@@ -0,0 +1,48 @@
+import quick_report
+from data_fixing_final import FIXING_RULES, FILE_NOT_FOUND_PREFIX, execute_fixing_queries, check_file_existence
+
+
+def insert_syno(db, table, values):
+    with db.cursor() as cursor:
+        cursor.executemany(f"INSERT INTO {table} (id, syno) VALUES (%s, %s)", list(enumerate(values)))
+    db.commit()
+
+
+def syno_values(db, table):
+    with db.cursor() as cursor:
+        cursor.execute(f"SELECT syno FROM {table} ORDER BY id::int")
+        values = [row[0] for row in cursor.fetchall()]
+    db.rollback()
+    return values
+
+
+def test_no_fixing_rule_touches_marked_values():
+    for description, new_value, condition in FIXING_RULES:
+        assert "NOT ILIKE 'File Not Found%'" in condition, description
+
+
+def test_marked_values_survive_a_fixing_pass_and_restore(db, survey):
+    insert_syno(db, survey, [FILE_NOT_FOUND_PREFIX + "DCIM/x.heic", FILE_NOT_FOUND_PREFIX + "DCIM/y.jpg.jpg",
+                             "DCIM/z.heic"])
+
+    execute_fixing_queries(db, survey)
+    assert syno_values(db, survey) == [FILE_NOT_FOUND_PREFIX + "DCIM/x.heic", FILE_NOT_FOUND_PREFIX + "DCIM/y.jpg.jpg",
+                                       "DCIM/z.jpg"]
+
+    # x.heic arrives, z.jpg is still missing
+    check_file_existence(db, survey, None, manifest=frozenset({"DCIM/x.heic"}))
+    assert syno_values(db, survey) == ["DCIM/x.heic", FILE_NOT_FOUND_PREFIX + "DCIM/y.jpg.jpg",
+                                       FILE_NOT_FOUND_PREFIX + "DCIM/z.jpg"]
+
+
+def test_marked_values_count_as_the_bare_marker_in_the_quick_report(db, survey):
+    insert_syno(db, survey, ["File Not Found", FILE_NOT_FOUND_PREFIX + "DCIM/x.jpg",
+                             FILE_NOT_FOUND_PREFIX + "DCIM/y.heic", FILE_NOT_FOUND_PREFIX + "DCIM/z.jpg.jpg"])
+
+    counts = quick_report.generate_report(db, survey)["syno"]
+    db.rollback()
+
+    # Every row counts as the bare marker does: under no slash and missing extension only
+    assert counts == {"no_slash_and_not_empty": 4, "empty_or_null_count": 0, "jpg_count": 0, "jpeg_count": 0,
+                      "other_extension_count": 0, "missing_extension_rows": 4, "double_extension_rows": 0,
+                      "wrong_path_count": 0}
@@ -0,0 +1,64 @@
+import os
+import pytest
+import duplicate_photos
+
+
+@pytest.fixture
+def hash_cache(tmp_path, monkeypatch):
+    """Keep the hash cache of the tests out of the working directory"""
+    monkeypatch.setattr(duplicate_photos, "cache_directory", str(tmp_path / "cache"))
+    monkeypatch.setattr(duplicate_photos, "hash_cache_filename", str(tmp_path / "cache" / "photo_hashes.pickle"))
+    monkeypatch.setattr(duplicate_photos, "_hash_cache", None)
+    return tmp_path
+
+
+def file_entry(path):
+    stat = os.stat(path)
+    return str(path), stat.st_size, stat.st_mtime_ns
+
+
+def test_group_candidates_keeps_groups_of_two_or_more():
+    groups = duplicate_photos.group_candidates([1, 2, 3, 11, 12, 5], key=lambda value: value % 10)
+    assert sorted(map(sorted, groups)) == [[1, 11], [2, 12]]
+
+
+def test_group_candidates_ignores_items_without_key():
+    assert duplicate_photos.group_candidates(["a", "b"], key=lambda value: None) == []
+
+
+def test_hash_files_computes_then_reuses_cached_hashes(hash_cache, monkeypatch):
+    photo = hash_cache / "a.jpg"
+    photo.write_bytes(b"x" * 5000)
+    entries = [file_entry(photo)]
+    first = duplicate_photos.hash_files(entries, "full")
+    assert first[str(photo)] == duplicate_photos.full_hash(str(photo))
+
+    monkeypatch.setattr(duplicate_photos, "safe_full_hash", lambda path: pytest.fail("hashed twice"))
+    assert duplicate_photos.hash_files(entries, "full") == first
+
+
+def test_prune_hash_cache_drops_deleted_and_changed_files(hash_cache):
+    kept, deleted, changed = (hash_cache / name for name in ["kept.jpg", "deleted.jpg", "changed.jpg"])
+    for photo in (kept, deleted, changed):
+        photo.write_bytes(b"photo " + photo.name.encode())
+    duplicate_photos.hash_files([file_entry(photo) for photo in (kept, deleted, changed)], "quick")
+    deleted.unlink()
+    changed.write_bytes(b"edited, so the size is different")
+
+    assert duplicate_photos.prune_hash_cache() == 2
+    assert [key[0] for key in duplicate_photos._load_hash_cache()] == [str(kept)]
+
+
+def test_find_duplicate_photos_groups_identical_content(hash_cache, fake_connection):
+    folder = hash_cache / "photos"
+    folder.mkdir()
+    (folder / "a.jpg").write_bytes(b"same bytes" * 100)
+    (folder / "b.jpg").write_bytes(b"same bytes" * 100)
+    (folder / "c.jpg").write_bytes(b"other byte" * 100)  # Same size, different content
+    rows = [(1, "T1", "X", 1, "a.jpg"), (2, "T2", "X", 1, "b.jpg"), (3, "T3", "X", 2, "c.jpg"), (4, "T4", "X", 1, "gone.jpg")]
+
+    duplicates = duplicate_photos.find_duplicate_photos(fake_connection({"SELECT": rows}), "survey", str(folder))
+
+    assert len(duplicates) == 1
+    assert sorted(reference[4] for reference in duplicates[0]["references"]) == ["a.jpg", "b.jpg"]
+    assert duplicates[0]["size"] == 1000
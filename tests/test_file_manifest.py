@@ -0,0 +1,41 @@
+from data_fixing_final import load_file_manifest, normalize_manifest_path, file_exists_in_store
+
+
+def write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def test_normalize_manifest_path():
+    assert normalize_manifest_path(" ./DCIM\\IMG_1.jpg\n") == "DCIM/IMG_1.jpg"
+    assert normalize_manifest_path("/files/a.jpg") == "files/a.jpg"
+
+
+def test_plain_list_and_find_printf_lines(tmp_path):
+    manifest = load_file_manifest(write(tmp_path, "list.txt", "./DCIM/a.jpg\nDCIM/b.jpg\t2048\t1700000000.0\r\n\n"))
+    assert manifest == {"DCIM/a.jpg", "DCIM/b.jpg"}
+
+
+def test_commas_are_part_of_the_path_outside_csv_files(tmp_path):
+    manifest = load_file_manifest(write(tmp_path, "list.txt", "DCIM/left, right.jpg\n"))
+    assert manifest == {"DCIM/left, right.jpg"}
+
+
+def test_csv_manifest_uses_first_column_and_skips_header(tmp_path):
+    manifest = load_file_manifest(write(tmp_path, "list.CSV", 'path,size\nDCIM/a.jpg,10\n"DCIM/b, c.jpg",20\n'))
+    assert manifest == {"DCIM/a.jpg", "DCIM/b, c.jpg"}
+
+
+def test_rsync_listing_keeps_regular_files_only(tmp_path):
+    listing = ("drwxr-xr-x          4,096 2024/05/01 10:00:00 DCIM\n"
+               "-rw-r--r--      1,234,567 2024/05/01 10:00:01 DCIM/IMG 1.jpg\n"
+               "lrwxrwxrwx             10 2024/05/01 10:00:02 DCIM/link.jpg\n")
+    assert load_file_manifest(write(tmp_path, "rsync.txt", listing)) == {"DCIM/IMG 1.jpg"}
+
+
+def test_file_exists_in_store_checks_manifest_or_folder(tmp_path):
+    (tmp_path / "a.jpg").write_bytes(b"")
+    assert file_exists_in_store(".\\DCIM\\a.jpg", None, frozenset({"DCIM/a.jpg"}))[0]
+    assert file_exists_in_store("a.jpg", str(tmp_path))[0]
+    assert not file_exists_in_store("b.jpg", str(tmp_path))[0]
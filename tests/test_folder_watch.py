@@ -0,0 +1,22 @@
+import logging
+import pytest
+import folder_watch
+from folder_watch import FolderWatcher, IN_Q_OVERFLOW, IN_CLOSE_WRITE
+
+pytestmark = pytest.mark.skipif(not folder_watch.inotify_available(), reason="needs Linux inotify")
+
+
+def test_failing_overflow_handler_does_not_stop_the_watcher(tmp_path, caplog):
+    def on_overflow():
+        raise RuntimeError("database is down")
+
+    watcher = FolderWatcher(str(tmp_path), on_batch=lambda *changes: None, on_overflow=on_overflow)
+    watcher._watches[1] = "DCIM"
+
+    with caplog.at_level(logging.ERROR):
+        watcher._handle_event(-1, IN_Q_OVERFLOW, "")
+    assert "database is down" in caplog.text
+
+    # Later events are still handled
+    watcher._handle_event(1, IN_CLOSE_WRITE, "a.jpg")
+    assert watcher._arrived == {"DCIM/a.jpg"}
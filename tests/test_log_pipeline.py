@@ -0,0 +1,24 @@
+import logging
+import threading
+from log_pipeline import QueueLogHandler
+
+
+def test_drain_returns_the_newest_lines_and_counts_the_dropped():
+    handler = QueueLogHandler(max_pending=3)
+    handler.setFormatter(logging.Formatter("%(levelname)s %(message)s"))
+    logger = logging.getLogger("test_log_pipeline")
+    logger.propagate = False
+    logger.addHandler(handler)
+    try:
+        # Records may come from worker threads
+        workers = [threading.Thread(target=logger.warning, args=(f"line {number}",)) for number in range(5)]
+        for worker in workers:
+            worker.start()
+            worker.join()
+
+        assert handler.drain() == (["WARNING line 2", "WARNING line 3", "WARNING line 4"], 2)
+        assert handler.drain() == ([], 0)
+        logger.warning("line 5")
+        assert handler.drain() == (["WARNING line 5"], 0)
+    finally:
+        logger.removeHandler(handler)
@@ -0,0 +1,29 @@
+import merge_import
+
+COLUMNS = [("id", "TEXT"), ("date_viste", "DATE"), ("code", "TEXT")]
+
+
+def test_merge_sql_counts_rows_without_id_separately():
+    sql = merge_import.merge_sql("survey", "survey_staging", COLUMNS, "upsert")
+    assert "WHERE id IS NOT NULL" in sql
+    assert "SELECT COUNT(*) FROM survey_staging WHERE id IS NULL" in sql
+    assert "date_viste > t.date_viste" not in sql
+
+
+def test_merge_sql_newest_mode_only_replaces_older_rows():
+    sql = merge_import.merge_sql("survey", "survey_staging", COLUMNS, "newest")
+    assert "(t.date_viste IS NULL OR i.date_viste > t.date_viste)" in sql
+    assert "(t.id, t.date_viste, t.code) IS DISTINCT FROM (i.id, i.date_viste, i.code)" in sql
+
+
+def test_merge_import_reports_rejected_rows(monkeypatch, fake_connection):
+    monkeypatch.setattr(merge_import, "copy_csv_to_staging", lambda cursor, table, csv_file, columns, staging: "staging")
+    monkeypatch.setattr(merge_import, "is_partitioned", lambda cursor, table: False)
+    # 10 staged rows: 4 inserted, 3 updated, 2 without an id, so 1 skipped
+    conn = fake_connection({"WITH incoming": [(10, 4, 3, 2)]})
+
+    result = merge_import.merge_import(conn, "survey", "rows.csv", COLUMNS)
+
+    assert result == {"inserted": 4, "updated": 3, "skipped": 1, "rejected": 2}
+    assert conn.commits == 1
+    assert conn.executed("DROP TABLE staging")
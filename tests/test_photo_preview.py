@@ -0,0 +1,46 @@
+from concurrent.futures import ThreadPoolExecutor
+import photo_preview
+from photo_preview import PhotoPreviewWindow, PAGE_ROWS
+
+
+def photo_rows(query, params):
+    """Photo column values of the queried ids"""
+    return [(row_id,) + tuple(f"DCIM/{row_id}_{index}.jpg" for index in range(len(photo_preview.columns_to_check)))
+            for row_id in params[0]]
+
+
+def preview(rows, tmp_path, connection):
+    """A preview window without its Tk widgets, for the page logic"""
+    window = PhotoPreviewWindow.__new__(PhotoPreviewWindow)
+    window.table_name = "survey"
+    window.rows = rows
+    window.folder_path = str(tmp_path)
+    window.pages = {}
+    window.conn = connection
+    window.query_executor = ThreadPoolExecutor(max_workers=1)
+    return window
+
+
+def test_is_photo_path():
+    assert photo_preview.is_photo_path("DCIM/a.jpg")
+    assert not photo_preview.is_photo_path("File Not Found: DCIM/a.jpg")
+    assert not photo_preview.is_photo_path("")
+    assert not photo_preview.is_photo_path(None)
+
+
+def test_pages_are_read_once_in_the_query_thread_without_null_ids(tmp_path, fake_connection):
+    rows = [(None, "T0", "X", ["syno"])] + [(str(number), "T", "X", ["syno"]) for number in range(1, PAGE_ROWS + 3)]
+    window = preview(rows, tmp_path, fake_connection(photo_rows))
+
+    window.request_page(0)
+    window.request_page(0)
+    window.request_page(5)  # Past the last row
+    window.pages[0].result()
+    window.query_executor.shutdown()
+
+    assert [params[0] for _, params in window.conn.queries] == [[str(number) for number in range(1, PAGE_ROWS)]]
+    assert window.conn.rollbacks == 1
+    assert window.row_paths(1)["syno"] == f"DCIM/1_{photo_preview.columns_to_check.index('syno')}.jpg"
+    assert window.row_paths(0) == {}
+    assert window.row_paths(PAGE_ROWS) is None  # Its page was never read
+    assert len(window.full_paths(1)) == len(photo_preview.columns_to_check)
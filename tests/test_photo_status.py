@@ -0,0 +1,40 @@
+import photo_status
+import quick_report
+from photo_status import STATUS_BITS, count_with_status, codes_with_status
+
+VALUES = ["DCIM/a.jpg", "DCIM/b.JPEG", "DCIM/c.heic", "DCIM/d", "e.jpg", "", None, "files/f.jpg", "files/g",
+          "DCIM/h.jpg.jpg", "File Not Found", "File Not Found: DCIM/i.jpg", "File Not Found: j.heic.jpg",
+          "Link Not Found", "Link Not Found.jpg"]
+
+
+def test_counts_add_up_every_code_with_the_bit():
+    jpg, wrong_path = STATUS_BITS["jpg_count"][0], STATUS_BITS["wrong_path_count"][0]
+    code_counts = {jpg: 3, jpg | wrong_path: 2, wrong_path: 1}
+
+    assert count_with_status(code_counts, "jpg_count") == 5
+    assert count_with_status(code_counts, "wrong_path_count") == 3
+    assert count_with_status(code_counts, "jpeg_count") == 0
+    assert sorted(codes_with_status(code_counts, "wrong_path_count")) == [wrong_path, jpg | wrong_path]
+
+
+def test_status_counts_match_the_report_queries(db, survey):
+    with db.cursor() as cursor:
+        # Rows present before the status columns are backfilled, the others are set by the trigger
+        cursor.executemany(f"INSERT INTO {survey} (id, syno) VALUES (%s, %s)", list(enumerate(VALUES))[:7])
+    db.commit()
+    photo_status.enable_status_columns(db, survey)
+    with db.cursor() as cursor:
+        cursor.executemany(f"INSERT INTO {survey} (id, syno) VALUES (%s, %s)", list(enumerate(VALUES))[7:])
+        assert photo_status.status_columns_enabled(cursor, survey)
+        code_counts = photo_status.status_code_counts(cursor, survey, ["syno"])["syno"]
+        _, report = quick_report.gather_report_info(cursor, survey, ["syno"])
+        marker_counts = {}
+        for check_name in ("file_not_found_count", "link_not_found_count"):
+            cursor.execute(f"SELECT COUNT(syno) FILTER (WHERE {STATUS_BITS[check_name][1].format(col='syno')}) FROM {survey}")
+            marker_counts[check_name] = cursor.fetchone()[0]
+    db.rollback()
+
+    for check_name in quick_report.CHECK_CONDITIONS:
+        assert count_with_status(code_counts, check_name) == report["syno"][check_name], check_name
+    assert count_with_status(code_counts, "file_not_found_count") == marker_counts["file_not_found_count"] == 3
+    assert count_with_status(code_counts, "link_not_found_count") == marker_counts["link_not_found_count"] == 2
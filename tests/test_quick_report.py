@@ -0,0 +1,68 @@
+import pytest
+import quick_report
+
+
+def test_wilson_interval():
+    assert quick_report.wilson_interval(0, 0) == (0.0, 0.0)
+    low, high = quick_report.wilson_interval(50, 100)
+    assert low == pytest.approx(0.4038, abs=1e-4)
+    assert high == pytest.approx(0.5962, abs=1e-4)
+    low, high = quick_report.wilson_interval(0, 100)
+    assert low == 0.0 and 0 < high < 0.05
+
+
+def test_sampled_report_scans_the_sample_once(fake_connection):
+    # 100 sampled rows of a table of 10000, 10 of them in every check of every column
+    checks = len(quick_report.columns_to_check) * len(quick_report.CHECK_CONDITIONS)
+    conn = fake_connection({"pg_attribute": [(0,)], "reltuples": [(10000,)], "FILTER": [(100,) + (10,) * checks]})
+
+    report, sample_info = quick_report.generate_sampled_report(conn, "survey", 1)
+
+    scans = [query for query, _ in conn.queries if "TABLESAMPLE" in query]
+    assert len(scans) == 1 and "TABLESAMPLE BERNOULLI (1) REPEATABLE (42)" in scans[0]
+    assert sample_info["method"] == "BERNOULLI" and sample_info["sample_rows"] == 100
+    assert report["syno"]["jpg_count"] == 1000
+    low, high = report["syno"]["confidence_intervals"]["jpg_count"]
+    assert low < 1000 < high
+
+
+def test_single_scan_counts_match_the_per_check_queries(db, survey):
+    values = ["DCIM/a.jpg", "DCIM/b.JPEG", "DCIM/c.heic", "DCIM/d", "e.jpg", "", None, "files/f.jpg",
+              "DCIM/g.jpg.jpg", "File Not Found", "File Not Found: DCIM/h.jpg", "Link Not Found"]
+    with db.cursor() as cursor:
+        cursor.executemany(f"INSERT INTO {survey} (id, syno) VALUES (%s, %s)", list(enumerate(values)))
+        expected = {}
+        for check_name, query in quick_report.SQL_QUERIES.items():
+            cursor.execute(query.format(col="syno", table=survey))
+            expected[check_name] = cursor.fetchone()[0]
+        rows, report = quick_report.gather_report_info(cursor, survey, ["syno", "c_pano_av"])
+    db.rollback()
+
+    assert rows == len(values)
+    assert report["syno"] == expected
+    assert report["c_pano_av"] == dict.fromkeys(quick_report.CHECK_CONDITIONS, 0)
+
+
+def test_sampled_report_of_the_whole_table_is_exact(db, survey):
+    with db.cursor() as cursor:
+        cursor.executemany(f"INSERT INTO {survey} (id, syno) VALUES (%s, %s)",
+                           [(n, f"DCIM/{n}.jpg" if n % 4 else f"DCIM/{n}") for n in range(200)])
+    db.commit()
+
+    for method in ("BERNOULLI", "SYSTEM"):
+        report, sample_info = quick_report.generate_sampled_report(db, survey, 100, method=method)
+        assert sample_info["sample_rows"] == 200
+        assert report["syno"]["jpg_count"] == 150 and report["syno"]["missing_extension_rows"] == 50
+    db.rollback()
+
+
+def test_page_sample_intervals_are_labelled_approximate():
+    data = {"file_not_found_count": 1000, "confidence_intervals": {"file_not_found_count": (550, 1750)}}
+    bernoulli = {"percent": 1, "method": "BERNOULLI", "sample_rows": 100, "estimated_rows": 10000}
+    system = dict(bernoulli, method="SYSTEM")
+
+    assert quick_report.format_figure(data, "file_not_found_count", bernoulli) == "~1000 (95% CI 550 - 1750)"
+    assert quick_report.format_figure(data, "file_not_found_count", system) == "~1000 (approx. range 550 - 1750)"
+    assert "approximate" not in quick_report.describe_sample(bernoulli)
+    assert "approximate, not confidence intervals" in quick_report.describe_sample(system)
+    assert quick_report.format_figure({"file_not_found_count": 3}, "file_not_found_count") == "3"
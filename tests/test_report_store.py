@@ -0,0 +1,85 @@
+import os
+import pytest
+import report_store
+from report_store import ReportStore
+
+
+@pytest.fixture
+def store_directory(tmp_path, monkeypatch):
+    monkeypatch.setattr(report_store, "store_directory", str(tmp_path))
+    return tmp_path
+
+
+COUNTS = {"total_count": 10, "file_not_found_count": 2, "link_not_found_count": 1}
+
+
+def build_store(path):
+    store = ReportStore.create(path)
+    store.add_counts("syno", 1, COUNTS)
+    store.add_counts("c_pano_av", 0, COUNTS)
+    store.add_offenders("syno", "file_not_found_ids", [(1, "T1", "a"), (None, 3, "b"), (None, 4, "c")])
+    store.add_offenders("syno", "link_not_found_ids", [(2, "T2", "a")])
+    store.add_offenders("c_pano_av", "file_not_found_ids", [(2, "T2", "a"), (5, "T5", "e")])
+    store.finish()
+    return store
+
+
+def test_round_trip(store_directory):
+    path = report_store.store_path("conn", "survey", ())
+    build_store(path).close()
+
+    store = ReportStore.open(path)
+    try:
+        assert [name for name, _ in store.columns()] == ["c_pano_av", "syno"]
+        assert store.columns()[0][1] == COUNTS
+        assert store.offender_count("syno", "file_not_found_ids") == 3
+        assert store.offenders("syno", "file_not_found_ids", 2, 1) == [(None, 3, "b"), (None, 4, "c")]
+        assert list(store.iter_offenders("syno", "file_not_found_ids", page_rows=2)) == [
+            (1, "T1", "a"), (None, 3, "b"), (None, 4, "c")]
+    finally:
+        store.close()
+
+
+def test_offender_rows_keep_rows_without_id_apart_and_page(store_directory):
+    store = build_store(report_store.store_path("conn", "survey", ("rows",)))
+    try:
+        assert store.offender_row_count() == 5
+        rows = store.offender_rows()
+        # Row 2 is flagged in both columns; group_concat does not order them
+        assert sorted(rows[0][3]) == ["c_pano_av", "syno"]
+        assert [row[:3] for row in rows[:1]] + rows[1:] == [
+            (2, "T2", "a"),
+            (5, "T5", "e", ["c_pano_av"]),
+            (1, "T1", "a", ["syno"]),
+            (None, 3, "b", ["syno"]),
+            (None, 4, "c", ["syno"]),
+        ]
+        assert store.offender_rows(1, 2) == rows[1:3]
+        assert store.offender_rows(5, 2) == []
+    finally:
+        store.close()
+
+
+def test_prune_stores_keeps_the_newest(store_directory):
+    for number in range(3):
+        (store_directory / f"full_{number}.sqlite").write_bytes(b"")
+    report_store.prune_stores(keep=1)
+    assert len(list(store_directory.glob("*.sqlite"))) == 1
+
+
+def test_new_computation_writes_its_own_file_and_supersedes_the_old(store_directory):
+    first_path = report_store.store_path("conn", "survey", ())
+    other_path = report_store.store_path("conn", "other", ())
+    build_store(other_path).close()
+    first = build_store(first_path)
+    try:
+        # Recomputed while the first store is still open in a viewer
+        second_path = report_store.store_path("conn", "survey", ())
+        assert second_path != first_path
+        build_store(second_path).close()
+        assert first.offender_count("syno", "file_not_found_ids") == 3
+    finally:
+        first.close()
+
+    assert sorted(path.name for path in store_directory.glob("*.sqlite")) == sorted(
+        os.path.basename(path) for path in (second_path, other_path))
@@ -0,0 +1,52 @@
+import os
+import pytest
+import run_history
+from run_history import RunRecorder
+
+
+@pytest.fixture(autouse=True)
+def history(tmp_path, monkeypatch):
+    """Keep the run history of the tests out of the logs folder"""
+    monkeypatch.setattr(run_history, "log_directory", str(tmp_path))
+    monkeypatch.setattr(run_history, "history_filename", os.path.join(str(tmp_path), "run_history.sqlite"))
+
+
+DB_PARAMS = {"dbname": "surveys", "host": "localhost", "port": "5432"}
+
+
+def test_recorded_runs_come_back_with_metrics_and_phases():
+    recorder = RunRecorder("fix", DB_PARAMS, "survey", ["w1", "w2"], (1, 2, 3, 4))
+    recorder.metrics.update(rows_updated=12, missing_files=None)
+    with recorder.phase("fixing"):
+        pass
+    recorder.add_column_metrics("syno", {"updates": 7, "note": "ignored"})
+    recorder.add_column_metrics("pht_mas_a", {"updates": 5})
+    run_id = recorder.save()
+
+    runs = run_history.list_runs("survey")
+    assert [entry["id"] for entry in runs] == [run_id]
+    assert runs[0]["kind"] == "fix"
+    assert runs[0]["weeks"] == "w1,w2"
+    assert runs[0]["area"] == "1,2,3,4"
+    assert runs[0]["metrics"] == {"rows_updated": 12}
+    assert list(runs[0]["phases"]) == ["fixing"]
+    assert run_history.history_tables() == ["survey"]
+    assert run_history.column_metric_names([run_id]) == ["updates"]
+    assert run_history.column_trend([run_id], "updates") == {run_id: 12}
+    assert run_history.column_trend([run_id], "updates", "syno") == {run_id: 7}
+
+
+def test_list_runs_filters_and_keeps_the_latest_oldest_first():
+    ids = [RunRecorder(kind, DB_PARAMS, "survey").save() for kind in ["fix", "test", "fix"]]
+    RunRecorder("fix", DB_PARAMS, "other").save()
+
+    assert [entry["id"] for entry in run_history.list_runs("survey", "fix")] == [ids[0], ids[2]]
+    assert [entry["id"] for entry in run_history.list_runs("survey", limit=2)] == ids[1:]
+
+
+def test_recorded_wraps_a_report_computation():
+    compute = run_history.recorded("full_report", DB_PARAMS, "survey", None, None,
+                                   lambda: {"syno": {"total_count": 3}}, lambda report: report.items())
+    assert compute() == {"syno": {"total_count": 3}}
+    run_id = run_history.list_runs("survey", "full_report")[0]["id"]
+    assert run_history.column_trend([run_id], "total_count") == {run_id: 3}
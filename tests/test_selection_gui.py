@@ -0,0 +1,10 @@
+from selection_gui import format_bytes
+
+
+def test_format_bytes():
+    assert format_bytes(0) == "0 B"
+    assert format_bytes(1023) == "1023 B"
+    assert format_bytes(1024) == "1.0 KB"
+    assert format_bytes(1536 * 1024) == "1.5 MB"
+    assert format_bytes(3 * 1024 ** 3) == "3.0 GB"
+    assert format_bytes(2 * 1024 ** 4) == "2.0 TB"
@@ -0,0 +1,34 @@
+import datetime
+import pytest
+import table_export
+
+COLUMNS = [("id", "text"), ("date_viste", "date")]
+BATCHES = [[("1", datetime.date(2024, 5, 1)), ("2", None)], [("3", datetime.date(2024, 5, 3))]]
+
+
+def test_export_columns_leave_out_internal_columns(fake_connection):
+    rows = [("id", "text"), ("fix_row_id", "int8"), ("gps_x", "float8"), ("syno", "text")]
+    assert table_export.export_columns(fake_connection({"pg_attribute": rows}).cursor(), "survey") == [("id", "text"), ("syno", "text")]
+
+
+def test_write_csv(tmp_path):
+    file_path = tmp_path / "export.csv"
+    assert table_export.write_csv(iter(BATCHES), COLUMNS, str(file_path)) == 3
+    assert file_path.read_bytes() == b"id,date_viste\r\n1,2024-05-01\r\n2,\r\n3,2024-05-03\r\n"
+
+
+@pytest.mark.skipif(not table_export.arrow_available(), reason="pyarrow is not installed")
+def test_write_parquet_and_arrow(tmp_path):
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+
+    assert table_export.write_parquet(iter(BATCHES), COLUMNS, str(tmp_path / "export.parquet")) == 3
+    assert table_export.write_arrow(iter(BATCHES), COLUMNS, str(tmp_path / "export.arrow")) == 3
+    for table in (pq.read_table(tmp_path / "export.parquet"), feather.read_table(tmp_path / "export.arrow")):
+        assert table.column_names == ["id", "date_viste"]
+        assert table.column("date_viste").to_pylist() == [datetime.date(2024, 5, 1), None, datetime.date(2024, 5, 3)]
+
+
+def test_export_table_rejects_unknown_formats():
+    with pytest.raises(ValueError, match="Unsupported export format"):
+        table_export.export_table(None, "survey", "export.xlsx")
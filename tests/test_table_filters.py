@@ -0,0 +1,51 @@
+import json
+import pytest
+import gps_index
+import table_filters
+
+
+@pytest.fixture
+def regions(tmp_path, monkeypatch):
+    regions_file = tmp_path / "regions.json"
+    regions_file.write_text(json.dumps({"North Zone": [1, 2, 3, 4]}), encoding="utf-8")
+    monkeypatch.setattr(table_filters, "REGIONS_FILE", str(regions_file))
+
+
+def test_parse_weeks():
+    assert table_filters.parse_weeks(" 2024-W01, ,2024-W02 ") == ["2024-W01", "2024-W02"]
+    assert table_filters.parse_weeks("") == []
+    assert table_filters.parse_weeks(None) == []
+
+
+def test_parse_area_orders_the_corners():
+    assert table_filters.parse_area("") is None
+    assert table_filters.parse_area("3, 4.5, 1, 2") == (1.0, 2.0, 3.0, 4.5)
+
+
+def test_parse_area_accepts_region_names(regions):
+    assert table_filters.parse_area("  north zone ") == (1.0, 2.0, 3.0, 4.0)
+    with pytest.raises(ValueError, match="Unknown region"):
+        table_filters.parse_area("south")
+
+
+def test_parse_area_rejects_invalid_numbers():
+    with pytest.raises(ValueError, match="Invalid bounding box"):
+        table_filters.parse_area("1, 2, x, 4")
+
+
+def test_scope_clause():
+    assert table_filters.scope_clause() == ""
+    assert table_filters.scope_clause(["2024-W01", "O'Brien"]) == " AND week IN ('2024-W01', 'O''Brien')"
+    clause = table_filters.scope_clause(["w1"], (1, 2, 3, 4))
+    assert clause == (" AND week IN ('w1') AND point(gps_x, gps_y) <@ box(point(1.0, 2.0), point(3.0, 4.0))")
+
+
+def test_filtered_source():
+    assert table_filters.filtered_source("survey") == "survey"
+    assert table_filters.filtered_source("survey", sample_clause="TABLESAMPLE SYSTEM (1)") == "survey TABLESAMPLE SYSTEM (1)"
+    assert table_filters.filtered_source("survey", ["w1"]) == "(SELECT * FROM survey  WHERE week IN ('w1')) AS survey"
+
+
+def test_gps_columns_enabled_needs_both_columns(fake_connection):
+    assert gps_index.gps_columns_enabled(fake_connection({"pg_attribute": [(2,)]}).cursor(), "survey")
+    assert not gps_index.gps_columns_enabled(fake_connection({"pg_attribute": [(1,)]}).cursor(), "survey")
@@ -0,0 +1,41 @@
+import pytest
+import week_partitions
+
+
+def test_partition_name_is_sanitized_and_unique():
+    assert week_partitions.partition_name("survey", "w01") == "survey_w_w01"
+    assert week_partitions.partition_name("survey", "2024-W01").startswith("survey_w_2024_w01_")
+    assert week_partitions.partition_name("survey", "W 1") != week_partitions.partition_name("survey", "W_1")
+    assert week_partitions.partition_name("survey", "W01") != week_partitions.partition_name("survey", "w01")
+    assert len(week_partitions.partition_name("t" * 60, "2024-W01")) <= 63
+
+
+def test_new_partition_moves_rows_without_generated_columns(fake_connection):
+    conn = fake_connection({
+        "pg_inherits": [("survey_w_2024_w01", "FOR VALUES IN ('2024-W01')")],
+        "attgenerated": [("id",), ("week",), ("fix_row_id",)],
+    })
+    cursor = conn.cursor()
+
+    created = week_partitions.ensure_week_partitions(cursor, "survey", ["2024-W01", "2024-W02", "", "2024-W02"])
+
+    queries = [query for query, _ in conn.queries]
+    assert created == [week_partitions.partition_name("survey", "2024-W02")]
+    assert any("SELECT id, week, fix_row_id FROM survey_default WHERE week = '2024-W02'" in query for query in queries)
+    assert "INSERT INTO survey (id, week, fix_row_id) SELECT id, week, fix_row_id FROM pending_week_rows" in queries
+    assert not any("SELECT *" in query for query in queries)
+
+
+def test_existing_flat_table_is_not_partitioned(db):
+    with db.cursor() as cursor:
+        cursor.execute("CREATE TABLE flat (id TEXT, week TEXT)")
+        assert week_partitions.is_flat_table(cursor, "flat")
+        assert not week_partitions.is_flat_table(cursor, "missing")
+        with pytest.raises(ValueError, match="not partitioned"):
+            week_partitions.create_partitioned_table(cursor, "flat", [("id", "TEXT"), ("week", "TEXT")])
+
+        week_partitions.create_partitioned_table(cursor, "weekly", [("id", "TEXT"), ("week", "TEXT")])
+        assert week_partitions.is_partitioned(cursor, "weekly") and not week_partitions.is_flat_table(cursor, "weekly")
+        # Creating it again keeps it
+        week_partitions.create_partitioned_table(cursor, "weekly", [("id", "TEXT"), ("week", "TEXT")])
+    db.rollback()
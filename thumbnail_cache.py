@@ -0,0 +1,124 @@
+import os
+import io
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Pillow is optional: without it no thumbnails are drawn (Tk cannot decode JPEG by itself)
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+THUMBNAIL_SIZE = (160, 120)
+# Bytes of PNG thumbnails kept in memory
+MEMORY_CACHE_BYTES = 32 * 1024 * 1024
+# Threads decoding photos; decoding and resizing release the GIL in Pillow
+MAX_THUMBNAIL_WORKERS = 4
+
+cache_directory = os.path.join("cache", "thumbnails")
+
+
+def thumbnails_available():
+    """Return True if Pillow is installed"""
+    return Image is not None
+
+
+class ThumbnailCache:
+    """
+    PNG thumbnails of photo files, made by a small thread pool and kept in a size-capped LRU
+    memory cache and an on-disk cache keyed by (path, size, mtime), so edited photos are redone.
+    """
+
+    def __init__(self, max_bytes=MEMORY_CACHE_BYTES, max_workers=MAX_THUMBNAIL_WORKERS):
+        self.max_bytes = max_bytes
+        self.memory = OrderedDict()
+        self.memory_bytes = 0
+        self.pending = {}     # {full path: future}, kept for thumbnails that failed
+        self.prefetched = []  # Futures of the last prefetch
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="thumbnail")
+
+    def _remember(self, full_path, png):
+        with self.lock:
+            if full_path in self.memory:
+                self.memory_bytes -= len(self.memory.pop(full_path))
+            self.memory[full_path] = png
+            self.memory_bytes += len(png)
+            while self.memory_bytes > self.max_bytes and len(self.memory) > 1:
+                _, evicted = self.memory.popitem(last=False)
+                self.memory_bytes -= len(evicted)
+
+    def cached(self, full_path):
+        """PNG bytes from memory, or None"""
+        with self.lock:
+            png = self.memory.get(full_path)
+            if png is not None:
+                self.memory.move_to_end(full_path)
+            return png
+
+    def _queue(self, full_path):
+        # Caller holds the lock; a cancelled prefetch is queued again
+        future = self.pending.get(full_path)
+        if full_path in self.memory or (future is not None and not future.cancelled()):
+            return None
+        future = self.executor.submit(self._make, full_path)
+        self.pending[full_path] = future
+        return future
+
+    def want(self, full_paths, prefetch_paths=()):
+        """
+        Queue the thumbnails needed now, then the ones likely needed next. Prefetches queued by
+        an earlier call that have not started yet are cancelled first, so moving quickly through
+        many rows never leaves the workers busy with rows already left behind.
+        """
+        if Image is None:
+            return
+        with self.lock:
+            for future in self.prefetched:
+                future.cancel()
+            for full_path in full_paths:
+                self._queue(full_path)
+            self.prefetched = [future for future in map(self._queue, prefetch_paths) if future is not None]
+
+    def failed(self, full_path):
+        """True if the thumbnail of the path could not be made (missing or not an image)"""
+        with self.lock:
+            future = self.pending.get(full_path)
+        return (future is not None and future.done() and not future.cancelled()
+                and future.result() is None)
+
+    def _make(self, full_path):
+        try:
+            stat = os.stat(full_path)
+            key = hashlib.sha1(f"{full_path}|{stat.st_size}|{stat.st_mtime_ns}|{THUMBNAIL_SIZE}".encode("utf-8")).hexdigest()
+            disk_path = os.path.join(cache_directory, key[:2], key + ".png")
+            if os.path.exists(disk_path):
+                with open(disk_path, "rb") as thumbnail_file:
+                    png = thumbnail_file.read()
+            else:
+                with Image.open(full_path) as image:
+                    image.draft("RGB", THUMBNAIL_SIZE)  # Lets the JPEG decoder skip most of the pixels
+                    image = image.convert("RGB")
+                    image.thumbnail(THUMBNAIL_SIZE)
+                    buffer = io.BytesIO()
+                    image.save(buffer, format="PNG")
+                png = buffer.getvalue()
+                os.makedirs(os.path.dirname(disk_path), exist_ok=True)
+                temp_path = disk_path + f".{threading.get_ident()}.tmp"
+                with open(temp_path, "wb") as thumbnail_file:
+                    thumbnail_file.write(png)
+                os.replace(temp_path, disk_path)
+            self._remember(full_path, png)
+            with self.lock:
+                self.pending.pop(full_path, None)
+            return png
+        except Exception as e:
+            logging.info(f"No thumbnail for {full_path}: {str(e)}")
+            return None  # Kept in pending, so failed() can tell it apart from a queued one
+
+    def close(self):
+        """Stop the workers; queued thumbnails that have not started are dropped"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,155 @@
+import psycopg2
+from tkinter import messagebox, simpledialog
+import hashlib
+import logging
+import re
+from table_filters import sql_literal
+
+
+def partition_name(table_name, week):
+    """Name of the partition holding one week of a table"""
+    suffix = re.sub(r"\W", "_", str(week).lower())
+    name = f"{table_name}_w_{suffix}"
+    if len(name) > 63 or suffix != str(week):
+        # Keep names unique when the week had to be sanitized, lowercased or shortened
+        digest = hashlib.md5(str(week).encode("utf-8")).hexdigest()[:8]
+        name = f"{table_name[:40]}_w_{suffix[:10]}_{digest}"
+    return name
+
+
+def is_partitioned(cursor, table_name):
+    """Return True if the table is partitioned"""
+    cursor.execute("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(%s)", (table_name,))
+    row = cursor.fetchone()
+    return bool(row and row[0])
+
+
+def is_flat_table(cursor, table_name):
+    """Return True if the table exists and is not partitioned"""
+    cursor.execute("SELECT relkind <> 'p' FROM pg_class WHERE oid = to_regclass(%s)", (table_name,))
+    row = cursor.fetchone()
+    return bool(row and row[0])
+
+
+def existing_week_partitions(cursor, table_name):
+    """Return {week: partition name} for the attached list partitions of the table"""
+    cursor.execute(
+        """
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+        FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(%s)
+        """,
+        (table_name,)
+    )
+    partitions = {}
+    for name, bound in cursor.fetchall():
+        # Bound looks like: FOR VALUES IN ('2024-W01')
+        for week in re.findall(r"'((?:[^']|'')*)'", bound or ""):
+            partitions[week.replace("''", "'")] = name
+    return partitions
+
+
+def insertable_columns(cursor, table_name):
+    """Return the columns of the table that accept values, in table order (generated columns are computed)"""
+    cursor.execute(
+        """
+        SELECT attname FROM pg_attribute
+        WHERE attrelid = to_regclass(%s) AND attnum > 0 AND NOT attisdropped AND attgenerated = ''
+        ORDER BY attnum
+        """,
+        (table_name,)
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def create_partitioned_table(cursor, table_name, columns):
+    """Create a table list-partitioned by week, with a default partition for rows without a known week"""
+    # An existing table cannot be turned into a partitioned one in place
+    if is_flat_table(cursor, table_name):
+        raise ValueError(f"Table {table_name} already exists and is not partitioned by week.")
+    column_definitions = ",\n".join(f"    {name} {data_type}" for name, data_type in columns)
+    cursor.execute(f"""
+    CREATE TABLE IF NOT EXISTS {table_name} (
+{column_definitions}
+    ) PARTITION BY LIST (week);
+    """)
+    cursor.execute(f"CREATE TABLE IF NOT EXISTS {table_name}_default PARTITION OF {table_name} DEFAULT")
+
+
+def ensure_week_partitions(cursor, table_name, weeks):
+    """
+    Create the missing partitions for the given weeks. Rows of those weeks already sitting in
+    the default partition are moved into the new partition.
+    """
+    existing = existing_week_partitions(cursor, table_name)
+    columns = None
+    created = []
+    for week in sorted({week for week in weeks if week}):
+        if week in existing:
+            continue
+        name = partition_name(table_name, week)
+        default_partition = f"{table_name}_default"
+        if columns is None:
+            # Generated columns (the GPS coordinates) cannot be inserted; PostgreSQL recomputes them
+            columns = ", ".join(insertable_columns(cursor, table_name))
+        # A new partition cannot be attached while the default partition holds its rows
+        cursor.execute(f"CREATE TEMP TABLE pending_week_rows ON COMMIT DROP AS "
+                       f"SELECT {columns} FROM {default_partition} WHERE week = {sql_literal(week)}")
+        cursor.execute(f"DELETE FROM {default_partition} WHERE week = {sql_literal(week)}")
+        cursor.execute(f"CREATE TABLE {name} PARTITION OF {table_name} FOR VALUES IN ({sql_literal(week)})")
+        cursor.execute(f"INSERT INTO {table_name} ({columns}) SELECT {columns} FROM pending_week_rows")
+        cursor.execute("DROP TABLE pending_week_rows")
+        created.append(name)
+    if created:
+        logging.info(f"Created week partitions: {', '.join(created)}")
+    return created
+
+
+def archive_week(conn, table_name, week):
+    """
+    Detach the partition of a week, keeping it as a standalone archive table.
+    Returns the name of the archive table.
+    """
+    try:
+        with conn.cursor() as cursor:
+            partition = existing_week_partitions(cursor, table_name).get(week)
+            if partition is None:
+                raise ValueError(f"Table {table_name} has no partition for week {week}.")
+            archive = f"{partition}_archive"[:63]
+            cursor.execute(f"ALTER TABLE {table_name} DETACH PARTITION {partition}")
+            cursor.execute(f"ALTER TABLE {partition} RENAME TO {archive}")
+        conn.commit()
+        logging.info(f"Week {week} of {table_name} archived as {archive}")
+        return archive
+    except Exception as e:
+        conn.rollback()
+        logging.error(f"Error archiving week: {str(e)}")
+        raise e
+
+
+def main(dbname, user, password, host, port, table_name):
+    try:
+        conn = psycopg2.connect(
+            dbname=dbname,
+            user=user,
+            password=password,
+            host=host,
+            port=port
+        )
+        with conn.cursor() as cursor:
+            partitioned = is_partitioned(cursor, table_name)
+            weeks = sorted(existing_week_partitions(cursor, table_name)) if partitioned else []
+        conn.rollback()
+        if not partitioned:
+            messagebox.showinfo("Archive Week", f"Table {table_name} is not partitioned by week.")
+            conn.close()
+            return
+
+        week = simpledialog.askstring("Archive Week", "Week to detach and archive:\n\n" + ", ".join(weeks))
+        if week:
+            archive = archive_week(conn, table_name, week.strip())
+            messagebox.showinfo("Success", f"Week {week.strip()} detached into table {archive}.")
+        conn.close()
+    except Exception as e:
+        messagebox.showerror("Database Error", str(e))
+        return